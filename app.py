@@ -11,25 +11,43 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import warnings
 import io
 
 from scipy import stats
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
-from sklearn.decomposition import PCA
-from scipy.cluster.hierarchy import dendrogram, linkage
 from statsmodels.tsa.seasonal import seasonal_decompose
 from collections import Counter, defaultdict
 
-from src.download import download_csv_from_url
-from src.create_plot import create_plot
+from src.download import (load_csv_from_url, download_many_csv, build_batch_targets,
+                          season_codes, FOOTBALL_DATA_BASE_URL, FOOTBALL_DATA_LEAGUES)
+from src.cache import get_default_cache
+from src.schema import read_csv_with_schema, CSV_ENGINES
+from src.memory import optimize_memory
+from src.history import DataHistory
+from src.pipeline import Pipeline
+from src.expressions import parse_assignments, ALLOWED_FUNCTIONS
+from src.stats import StatsCache, general_info, describe_numeric
+from src.correlation import CorrelationService
+from src.segmentation import SegmentationService
+from src.pca import fit_pca, pca_csv_in_chunks, MAX_COMPONENTS
+from src.modeling import cross_validate_models, REGRESSORS, CV_FOLDS
+from src.football import walk_forward_validation, train_result_model, score_fixtures, CLASSIFIERS, MIN_TRAIN_SEASONS
+from src.team_form import team_form, current_form, FORM_WINDOW, FORM_WINDOWS
+from src.profiler import profile_numeric, profile_categorical, outlier_summary, outlier_bounds, OUTLIER_METHODS
+from src.sketches import profile_csv_in_chunks
+from src.create_plot import create_plot, figure_cache_stats, dendrogram_figure
+from src.downsample import DOWNSAMPLE_THRESHOLD
 from src.advanced import create_advanced_plot, advanced_statistical_analysis
 warnings.filterwarnings('ignore')
 
+# Copy-on-write: las operaciones comparten las columnas que no modifican
+pd.set_option('mode.copy_on_write', True)
+
+# Ayuda común para las fórmulas de columnas calculadas
+FORMULA_HELP = ("Operadores aritméticos y comparaciones sobre columnas. Los nombres con espacios o símbolos "
+                "van entre comillas invertidas (`B365>2.5`). Funciones: " + ", ".join(ALLOWED_FUNCTIONS) + ".")
+
 # Configurar tema oscuro y responsive
 st.markdown("""
 <style>
@@ -120,9 +138,41 @@ option = st.sidebar.selectbox(
     key="main_navigation"
 )
 
+auto_optimize = st.sidebar.checkbox(
+    "⚡ Optimizar memoria automáticamente",
+    value=True,
+    help="Reduce tipos numéricos, convierte texto repetido en categorías y detecta booleanos tras cada carga o cambio",
+    key="auto_optimize"
+)
+
 # Inicializar session state
 if 'df' not in st.session_state:
     st.session_state.df = None
+if 'memory_report' not in st.session_state:
+    st.session_state.memory_report = None
+# Versión de los datos: cambia con cada carga o manipulación e invalida los resultados en caché
+if 'data_version' not in st.session_state:
+    st.session_state.data_version = 0
+if 'stats_cache' not in st.session_state:
+    st.session_state.stats_cache = StatsCache()
+if 'correlation_service' not in st.session_state:
+    st.session_state.correlation_service = CorrelationService()
+if 'segmentation_service' not in st.session_state:
+    st.session_state.segmentation_service = SegmentationService()
+
+# Función para guardar el DataFrame de la sesión, optimizando su memoria si está activado
+def set_session_df(df):
+    if auto_optimize and df is not None:
+        df, st.session_state.memory_report = optimize_memory(df)
+    else:
+        st.session_state.memory_report = None
+    st.session_state.df = df
+    st.session_state.data_version += 1
+    return df
+
+# Función para calcular (o recuperar de la caché) un resultado sobre los datos actuales
+def cached_stat(name, compute, *args):
+    return st.session_state.stats_cache.get(st.session_state.data_version, name, compute, *args)
 
 # ========== SECCIÓN DE DESCARGA ==========
 if option == "🔗 Descargar CSV desde URL":
@@ -150,13 +200,32 @@ if option == "🔗 Descargar CSV desde URL":
             help="Para URLs relativas"
         )
     
+    with st.expander("⚙️ Opciones de lectura", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            read_in_chunks = st.checkbox("Leer por bloques (archivos muy grandes)", value=False, key="read_in_chunks")
+            chunk_rows = st.number_input("Filas por bloque:", min_value=1000, value=100000, step=10000,
+                                         key="chunk_rows", disabled=not read_in_chunks)
+        with col2:
+            measure_memory = st.checkbox("Medir memoria pico durante la carga", value=False, key="measure_memory")
+            use_schema = st.checkbox("Aplicar esquema football-data (tipos compactos y fechas)", value=True, key="use_schema",
+                                     help="Goles como int8, equipos/resultados como categorías, cuotas como float32 y Date como fecha")
+            csv_engine = st.selectbox("Motor de lectura:", CSV_ENGINES, key="csv_engine",
+                                      help="pyarrow es multihilo y suele ser más rápido; no admite lectura por bloques")
+    
     if st.button("🔽 Descargar CSV", type="primary"):
         if url_input:
             with st.spinner("Descargando archivo..."):
-                df, error = download_csv_from_url(url_input, base_url)
+                df, load_report, error = load_csv_from_url(
+                    url_input, base_url,
+                    chunksize=int(chunk_rows) if read_in_chunks else None,
+                    measure_memory=measure_memory,
+                    engine=csv_engine,
+                    use_schema=use_schema
+                )
                 
                 if df is not None:
-                    st.session_state.df = df
+                    df = set_session_df(df)
                     st.success("✅️ ¡Archivo descargado exitosamente!")
                     
                     # Mostrar información básica
@@ -170,6 +239,20 @@ if option == "🔗 Descargar CSV desde URL":
                     with col3:
                         st.metric("Tamaño", f"{df.memory_usage(deep=True).sum() / 1024:.1f} KB")
                     
+                    # Informe de la carga
+                    source_labels = {'network': 'Red', 'cache': 'Caché', 'revalidated': 'Caché (304)'}
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("Origen", source_labels.get(load_report['source'], load_report['source']))
+                    with col2:
+                        st.metric("Tiempo", f"{load_report['seconds'] * 1000:.0f} ms")
+                    with col3:
+                        throughput = load_report['throughput_mb_s']
+                        st.metric("Throughput", f"{throughput:.1f} MB/s" if throughput else "N/A")
+                    with col4:
+                        peak = load_report['peak_memory_mb']
+                        st.metric("Memoria pico", f"{peak:.1f} MB" if peak is not None else "N/A")
+                    
                     # Vista previa
                     st.subheader("Vista Previa de los Datos")
                     st.dataframe(df.head(10), use_container_width=True)
@@ -179,6 +262,124 @@ if option == "🔗 Descargar CSV desde URL":
         else:
             st.warning("⚠️ Por favor, ingresa una URL válida")
     
+    # Descarga por lotes de varias temporadas y ligas
+    with st.expander("📦 Descarga por lotes (varias temporadas y ligas)", expanded=False):
+        batch_mode = st.radio("Modo:", ["Temporadas × Ligas", "Lista de URLs"], horizontal=True, key="batch_mode")
+        
+        if batch_mode == "Temporadas × Ligas":
+            col1, col2 = st.columns(2)
+            with col1:
+                first_season = st.number_input("Año inicial de temporada:", min_value=1993, max_value=2100, value=2019, key="batch_first_season")
+                last_season = st.number_input("Año final de temporada:", min_value=1993, max_value=2100, value=2023, key="batch_last_season")
+            with col2:
+                batch_leagues = st.multiselect("Ligas (código Div):", FOOTBALL_DATA_LEAGUES,
+                                               default=['E0', 'E1', 'SP1', 'D1', 'I1'], key="batch_leagues")
+                batch_pattern = st.text_input("Patrón de URL:", value="mmz4281/{season}/{league}.csv", key="batch_pattern")
+            batch_targets = build_batch_targets(season_codes(first_season, last_season), batch_leagues, batch_pattern)
+        else:
+            batch_urls = st.text_area("URLs (una por línea):", placeholder="mmz4281/2324/E0.csv\nmmz4281/2223/E0.csv", key="batch_urls")
+            batch_targets = [u.strip() for u in batch_urls.splitlines() if u.strip()]
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            batch_base_url = st.text_input("URL base:", value=FOOTBALL_DATA_BASE_URL, key="batch_base_url")
+        with col2:
+            batch_workers = st.slider("Descargas simultáneas:", 1, 32, 8, key="batch_workers")
+        
+        st.caption(f"Se descargarán {len(batch_targets)} archivos")
+        
+        if st.button("📦 Descargar Lote", disabled=not batch_targets):
+            with st.spinner(f"Descargando {len(batch_targets)} archivos..."):
+                df, batch_errors = download_many_csv(batch_targets, batch_base_url, max_workers=batch_workers,
+                                                     engine=csv_engine, use_schema=use_schema)
+            
+            if df is not None:
+                df = set_session_df(df)
+                st.success(f"✅️ {len(batch_targets) - len(batch_errors)} archivos combinados: {df.shape[0]:,} filas")
+                st.dataframe(df.head(10), use_container_width=True)
+            if batch_errors:
+                st.warning(f"⚠️ {len(batch_errors)} archivos no se pudieron descargar")
+                st.dataframe(pd.DataFrame(batch_errors, columns=['URL', 'Error']), use_container_width=True)
+    
+    # Perfil por bloques de archivos que no caben en memoria
+    with st.expander("🌊 Perfil de archivos grandes (sin cargarlos en memoria)", expanded=False):
+        st.caption("Lee cada archivo por bloques y mantiene resúmenes de tamaño fijo (momentos, cuantiles KLL, "
+                   "HyperLogLog y count-min). Los resultados son aproximados y se combinan entre archivos.")
+        streaming_sources = st.text_area("Rutas locales o URLs (una por línea):",
+                                         placeholder="/datos/historico.csv\nmmz4281/2324/E0.csv", key="streaming_sources")
+        col1, col2 = st.columns(2)
+        with col1:
+            streaming_base_url = st.text_input("URL base:", value=FOOTBALL_DATA_BASE_URL, key="streaming_base_url")
+        with col2:
+            streaming_chunksize = st.number_input("Filas por bloque:", min_value=1_000, max_value=1_000_000,
+                                                  value=100_000, step=10_000, key="streaming_chunksize")
+        
+        sources = [s.strip() for s in streaming_sources.splitlines() if s.strip()]
+        if st.button("🌊 Perfilar por bloques", disabled=not sources):
+            with st.spinner(f"Perfilando {len(sources)} archivos..."):
+                st.session_state.streaming_profile, streaming_errors = profile_csv_in_chunks(
+                    sources, streaming_base_url, int(streaming_chunksize))
+            for source, error in streaming_errors:
+                st.warning(f"⚠️ {source}: {error}")
+        
+        streaming_profile = st.session_state.get('streaming_profile')
+        if streaming_profile is not None and streaming_profile.rows:
+            st.write(f"**{streaming_profile.files} archivos · {streaming_profile.rows:,} filas · "
+                     f"{streaming_profile.chunks} bloques**")
+            st.write("**Estadísticas Descriptivas (aprox.)**")
+            st.dataframe(streaming_profile.describe(), use_container_width=True)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Outliers por IQR (aprox.)**")
+                st.dataframe(streaming_profile.outliers(), use_container_width=True)
+            with col2:
+                st.write("**Valores más frecuentes (aprox.)**")
+                frequent_col = st.selectbox("Columna:", list(streaming_profile.columns), key="streaming_value_counts")
+                st.dataframe(streaming_profile.value_counts(frequent_col), use_container_width=True)
+            st.dataframe(streaming_profile.summary(), use_container_width=True)
+            
+            # PCA por bloques: medias y desviaciones del perfil y una segunda lectura con IncrementalPCA
+            st.write("**PCA por bloques (IncrementalPCA)**")
+            streaming_pca_columns = st.multiselect("Columnas:", streaming_profile.numeric_columns(),
+                                                   key="streaming_pca_columns")
+            if st.button("🧭 Calcular PCA por bloques", disabled=len(streaming_pca_columns) < 2 or not sources):
+                moments = streaming_profile.describe()
+                with st.spinner("Leyendo los archivos por bloques..."):
+                    loadings, explained, pca_rows, pca_errors = pca_csv_in_chunks(
+                        sources, streaming_pca_columns, moments.loc['mean', streaming_pca_columns],
+                        moments.loc['std', streaming_pca_columns], base_url=streaming_base_url,
+                        chunksize=int(streaming_chunksize))
+                st.session_state.streaming_pca = (loadings, explained, pca_rows)
+                for source, error in pca_errors:
+                    st.warning(f"⚠️ {source}: {error}")
+            
+            streaming_pca = st.session_state.get('streaming_pca')
+            if streaming_pca is not None and streaming_pca[2]:
+                loadings, explained, pca_rows = streaming_pca
+                st.write(f"{pca_rows:,} filas completas")
+                st.dataframe(explained, use_container_width=True)
+                st.dataframe(loadings, use_container_width=True)
+                st.download_button("📥 Cargas (CSV)", loadings.to_csv(), file_name="pca_cargas.csv", mime="text/csv",
+                                   key="streaming_pca_loadings")
+    
+    # Estado de la caché de descargas en disco
+    download_cache = get_default_cache()
+    if download_cache is not None:
+        with st.expander("🗄️ Caché de descargas", expanded=False):
+            cache_stats = download_cache.stats()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Archivos en caché", cache_stats['entries'])
+            with col2:
+                st.metric("Tamaño", f"{cache_stats['bytes'] / 1024 / 1024:.1f} MB")
+            with col3:
+                st.metric("Aciertos / Fallos", f"{cache_stats['hits']} / {cache_stats['misses']}")
+            st.caption(f"TTL: {cache_stats['ttl']} s · Límite: {cache_stats['max_bytes'] / 1024 / 1024:.0f} MB · "
+                       f"Revalidaciones (304): {cache_stats['revalidations']}")
+            if st.button("🧹 Vaciar caché"):
+                download_cache.clear()
+                st.success("Caché vaciada")
+    
     # Opción para subir archivo local
     st.divider()
     st.subheader("💻 O sube un archivo CSV local")
@@ -186,8 +387,8 @@ if option == "🔗 Descargar CSV desde URL":
     
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
-            st.session_state.df = df
+            df = read_csv_with_schema(uploaded_file, engine=csv_engine, use_schema=use_schema)
+            df = set_session_df(df)
             st.success("✅️ ¡Archivo cargado exitosamente!")
             st.dataframe(df.head(), use_container_width=True)
         except Exception as e:
@@ -198,7 +399,103 @@ elif option == "🛠️ Manipulación de Datos":
     st.header("Manipulación de Datos")
     
     if st.session_state.df is not None:
-        df = st.session_state.df.copy()
+        # Historial de operaciones: se reinicia si se cargó un archivo nuevo
+        history = st.session_state.get('history')
+        if history is None or history.current is not st.session_state.df:
+            history = DataHistory(st.session_state.df)
+            st.session_state.history = history
+        
+        # Con copy-on-write no hace falta copiar el DataFrame en cada recarga
+        df = history.current
+        
+        if 'pending_pipeline' not in st.session_state:
+            st.session_state.pending_pipeline = Pipeline()
+        pending_pipeline = st.session_state.pending_pipeline
+        
+        lazy_mode = st.toggle(
+            "⚡ Modo pipeline (acumular operaciones y ejecutarlas juntas)",
+            value=False,
+            help="Las operaciones se registran sin ejecutarse; al ejecutar el pipeline se fusionan y se aplican en una sola pasada",
+            key="lazy_pipeline_mode"
+        )
+        
+        # Función para aplicar una operación registrándola en el historial (o en el pipeline)
+        def apply_change(op, label, **params):
+            if lazy_mode:
+                pending_pipeline.add(op, label, **params)
+            else:
+                history.apply(op, label, **params)
+                history.amend(set_session_df(history.current))
+        
+        # Función para ejecutar un pipeline completo como un único paso del historial
+        def run_pipeline(pipeline, label):
+            history.record(pipeline.run(history.current),
+                           {'op': 'recipe', 'params': pipeline.to_dict(), 'label': label})
+            history.amend(set_session_df(history.current))
+        
+        if lazy_mode or len(pending_pipeline):
+            with st.container(border=True):
+                st.write(f"**⏳ Pipeline pendiente ({len(pending_pipeline)} pasos)**")
+                for i, step in enumerate(pending_pipeline.steps, 1):
+                    st.write(f"{i}. {step['label']}")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("▶️ Ejecutar Pipeline", type="primary", disabled=not len(pending_pipeline)):
+                        try:
+                            run_pipeline(pending_pipeline, f"Pipeline ({len(pending_pipeline)} pasos)")
+                            st.session_state.pending_pipeline = Pipeline()
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error al ejecutar el pipeline: {str(e)}")
+                with col2:
+                    if st.button("🗑️ Descartar Pipeline", disabled=not len(pending_pipeline)):
+                        st.session_state.pending_pipeline = Pipeline()
+                        st.rerun()
+        
+        with st.expander("📋 Recetas (exportar / importar)", expanded=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Exportar**")
+                st.caption("Guarda las operaciones aplicadas para repetirlas sobre otros archivos "
+                           "(por ejemplo: `python -m src.pipeline receta.json mmz4281/2324/E0.csv -o salida/`).")
+                st.download_button(
+                    label="📤 Descargar Receta",
+                    data=Pipeline().extend(history.steps()).to_json(),
+                    file_name="receta.json",
+                    mime="application/json",
+                    disabled=not history.steps()
+                )
+            with col2:
+                st.write("**Importar**")
+                recipe_file = st.file_uploader("Selecciona una receta", type=['json'], key="recipe_uploader")
+                if recipe_file is not None and st.button("▶️ Aplicar Receta"):
+                    try:
+                        recipe = Pipeline.from_json(recipe_file.getvalue().decode('utf-8'))
+                        run_pipeline(recipe, f"Receta '{recipe_file.name}' ({len(recipe)} pasos)")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error al aplicar la receta: {str(e)}")
+        
+        col1, col2, col3 = st.columns([1, 1, 4])
+        with col1:
+            if st.button("↩️ Deshacer", disabled=not history.can_undo, use_container_width=True):
+                set_session_df(history.undo())
+                history.amend(st.session_state.df)
+                st.rerun()
+        with col2:
+            if st.button("↪️ Rehacer", disabled=not history.can_redo, use_container_width=True):
+                set_session_df(history.redo())
+                history.amend(st.session_state.df)
+                st.rerun()
+        with col3:
+            with st.expander(f"📜 Historial de operaciones ({len(history.steps())})", expanded=False):
+                if history.steps() or history.pending_steps():
+                    for i, step in enumerate(history.steps(), 1):
+                        st.write(f"{i}. {step['label']}")
+                    for step in history.pending_steps():
+                        st.write(f"~~{step['label']}~~ (deshecha)")
+                else:
+                    st.write("Aún no se han aplicado operaciones")
         
         # Pestañas para diferentes operaciones
         tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🗑️ Eliminar", "➕ Agregar", "🔄 Ordenar", "🔍 Valores Nulos", "✏️ Renombrar y Formatear", "🔄 Buscar y Reemplazar"])
@@ -216,8 +513,7 @@ elif option == "🛠️ Manipulación de Datos":
                 )
                 
                 if cols_to_delete and st.button("Eliminar Columnas Seleccionadas"):
-                    df = df.drop(columns=cols_to_delete)
-                    st.session_state.df = df
+                    apply_change('drop_columns', f"Eliminar columnas: {', '.join(cols_to_delete)}", columns=cols_to_delete)
                     st.success(f"Columnas eliminadas: {', '.join(cols_to_delete)}")
                     st.rerun()
             
@@ -233,8 +529,7 @@ elif option == "🛠️ Manipulación de Datos":
                 if row_indices and st.button("Eliminar Filas por Índice"):
                     try:
                         indices = [int(x.strip()) for x in row_indices.split(',')]
-                        df = df.drop(index=indices)
-                        st.session_state.df = df
+                        apply_change('drop_rows', f"Eliminar filas: {row_indices}", indices=indices)
                         st.success(f"Filas eliminadas: {row_indices}")
                         st.rerun()
                     except Exception as e:
@@ -243,9 +538,8 @@ elif option == "🛠️ Manipulación de Datos":
                 # Eliminar duplicados
                 if st.button("Eliminar Filas Duplicadas"):
                     initial_rows = len(df)
-                    df = df.drop_duplicates()
-                    final_rows = len(df)
-                    st.session_state.df = df
+                    apply_change('drop_duplicates', "Eliminar filas duplicadas")
+                    final_rows = len(st.session_state.df)
                     st.success(f"Se eliminaron {initial_rows - final_rows} filas duplicadas")
                     st.rerun()
         
@@ -258,37 +552,50 @@ elif option == "🛠️ Manipulación de Datos":
                 new_col_name = st.text_input("Nombre de la nueva columna:")
                 new_col_type = st.selectbox(
                     "Tipo de columna:",
-                    ["Valor constante", "Cálculo basado en otras columnas", "Secuencia numérica"]
+                    ["Valor constante", "Cálculo basado en otras columnas", "Varias columnas calculadas", "Secuencia numérica"]
                 )
             
             with col2:
                 if new_col_type == "Valor constante":
                     const_value = st.text_input("Valor constante:")
                     if st.button("Agregar Columna Constante") and new_col_name:
-                        df[new_col_name] = const_value
-                        st.session_state.df = df
+                        apply_change('add_constant', f"Agregar columna constante '{new_col_name}'", name=new_col_name, value=const_value)
                         st.success(f"Columna '{new_col_name}' agregada")
                         st.rerun()
                 
                 elif new_col_type == "Cálculo basado en otras columnas":
                     col_calc = st.text_input(
                         "Fórmula (usa nombres de columnas):",
-                        placeholder="columna1 + columna2"
+                        placeholder="columna1 + columna2",
+                        help=FORMULA_HELP
                     )
                     if st.button("Agregar Columna Calculada") and new_col_name and col_calc:
                         try:
-                            df[new_col_name] = eval(col_calc, {"__builtins__": {}}, df.to_dict('series'))
-                            st.session_state.df = df
+                            apply_change('add_computed', f"Agregar columna '{new_col_name}' = {col_calc}", name=new_col_name, expression=col_calc)
                             st.success(f"Columna '{new_col_name}' agregada")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error en la fórmula: {str(e)}")
+
+                elif new_col_type == "Varias columnas calculadas":
+                    formulas_text = st.text_area(
+                        "Una definición por línea (nombre = fórmula):",
+                        placeholder="GD = FTHG - FTAG\nMargen = 1/B365H + 1/B365D + 1/B365A\nPuntos = where(FTR == 'H', 3, where(FTR == 'D', 1, 0))",
+                        help=FORMULA_HELP + " Cada fórmula puede usar las columnas definidas en líneas anteriores."
+                    )
+                    if st.button("Agregar Columnas Calculadas") and formulas_text.strip():
+                        try:
+                            definitions = parse_assignments(formulas_text)
+                            apply_change('add_computed_columns', f"Agregar columnas calculadas: {', '.join(definitions)}", definitions=definitions)
+                            st.success(f"{len(definitions)} columnas agregadas")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error en las fórmulas: {str(e)}")
                 
                 elif new_col_type == "Secuencia numérica":
                     start_val = st.number_input("Valor inicial:", value=1)
                     if st.button("Agregar Secuencia") and new_col_name:
-                        df[new_col_name] = range(start_val, start_val + len(df))
-                        st.session_state.df = df
+                        apply_change('add_sequence', f"Agregar secuencia '{new_col_name}' desde {start_val}", name=new_col_name, start=int(start_val))
                         st.success(f"Columna '{new_col_name}' agregada")
                         st.rerun()
         
@@ -306,8 +613,7 @@ elif option == "🛠️ Manipulación de Datos":
                 )
                 
                 if st.button("Aplicar Nuevo Orden") and len(new_order) == len(df.columns):
-                    df = df[new_order]
-                    st.session_state.df = df
+                    apply_change('reorder_columns', "Reordenar columnas", order=new_order)
                     st.success("Orden de columnas actualizado")
                     st.rerun()
             
@@ -320,8 +626,8 @@ elif option == "🛠️ Manipulación de Datos":
                 sort_ascending = st.checkbox("Orden ascendente", value=True)
                 
                 if sort_cols and st.button("Ordenar Datos"):
-                    df = df.sort_values(sort_cols, ascending=sort_ascending)
-                    st.session_state.df = df
+                    apply_change('sort_rows', f"Ordenar por {', '.join(sort_cols)} ({'asc' if sort_ascending else 'desc'})",
+                                 by=sort_cols, ascending=sort_ascending)
                     st.success("Datos ordenados")
                     st.rerun()
         
@@ -358,31 +664,24 @@ elif option == "🛠️ Manipulación de Datos":
                     if action == "Rellenar con valor":
                         fill_value = st.text_input("Valor para rellenar:")
                         if st.button("Aplicar Relleno") and fill_value:
-                            df[selected_col] = df[selected_col].fillna(fill_value)
-                            st.session_state.df = df
+                            apply_change('fill_value', f"Rellenar nulos de '{selected_col}' con '{fill_value}'",
+                                         column=selected_col, value=fill_value)
                             st.success(f"Valores nulos rellenados en '{selected_col}'")
                             st.rerun()
                     
                     elif action == "Rellenar con media/moda":
-                        if df[selected_col].dtype in ['int64', 'float64']:
-                            fill_val = df[selected_col].mean()
-                            method = "media"
-                        else:
-                            fill_val = df[selected_col].mode().iloc[0] if not df[selected_col].mode().empty else "N/A"
-                            method = "moda"
+                        method = "media" if pd.api.types.is_numeric_dtype(df[selected_col]) else "moda"
                         
                         if st.button(f"Rellenar con {method}"):
-                            df[selected_col] = df[selected_col].fillna(fill_val)
-                            st.session_state.df = df
+                            apply_change('fill_statistic', f"Rellenar nulos de '{selected_col}' con {method}", column=selected_col)
                             st.success(f"Valores nulos rellenados con {method} en '{selected_col}'")
                             st.rerun()
                     
                     elif action == "Eliminar filas con nulos":
                         if st.button("Eliminar Filas"):
                             initial_rows = len(df)
-                            df = df.dropna(subset=[selected_col])
-                            final_rows = len(df)
-                            st.session_state.df = df
+                            apply_change('drop_null_rows', f"Eliminar filas con nulos en '{selected_col}'", column=selected_col)
+                            final_rows = len(st.session_state.df)
                             st.success(f"Se eliminaron {initial_rows - final_rows} filas")
                             st.rerun()
                 else:
@@ -399,15 +698,15 @@ elif option == "🛠️ Manipulación de Datos":
                 new_name = st.text_input("Nuevo nombre para la columna:")
                 
                 if st.button("Renombrar Columna") and new_name:
-                    df = df.rename(columns={selected_col: new_name})
-                    st.session_state.df = df
+                    apply_change('rename_column', f"Renombrar '{selected_col}' a '{new_name}'", column=selected_col, new_name=new_name)
                     st.success(f"Columna '{selected_col}' renombrada a '{new_name}'")
                     st.rerun()
             
             with col2:
                 st.write("**Formatear Fechas**")
                 # Filtramos columnas que podrían contener fechas (object o string)
-                date_cols = [col for col in df.columns if df[col].dtype in ['object', 'string']]
+                date_cols = [col for col in df.columns if df[col].dtype in ['object', 'string', 'category']
+                             or pd.api.types.is_datetime64_any_dtype(df[col])]
                 selected_date_col = st.selectbox("Selecciona columna de fecha:", date_cols, key="date_column_select")
 
                 # Opciones de formatos de entrada comunes
@@ -451,24 +750,9 @@ elif option == "🛠️ Manipulación de Datos":
                         # Usamos 'dayfirst' si el formato de entrada es DD/MM/YYYY o DD-MM-YYYY
                         dayfirst_flag = True if "Día" in selected_input_format_name else False
                         
-                        if input_format_str == "mixed":
-                             df[selected_date_col] = pd.to_datetime(
-                                df[selected_date_col],
-                                errors='coerce',
-                                dayfirst=dayfirst_flag # Ayuda a inferir correctamente
-                            )
-                        else:
-                            df[selected_date_col] = pd.to_datetime(
-                                df[selected_date_col],
-                                format=input_format_str,
-                                errors='coerce' # Convierte valores inválidos a NaT (Not a Time)
-                            )
-
-                        # Luego, formateamos la columna para mostrarla en el formato deseado
-                        # Solo aplicamos strftime a los valores que no son NaT
-                        df[selected_date_col] = df[selected_date_col].dt.strftime(output_format_str)
-
-                        st.session_state.df = df
+                        apply_change('format_dates', f"Formatear fecha '{selected_date_col}' a {selected_output_format_name}",
+                                     column=selected_date_col, input_format=input_format_str,
+                                     output_format=output_format_str, dayfirst=dayfirst_flag)
                         st.success(f"Columna '{selected_date_col}' formateada a '{selected_output_format_name}' y convertida a tipo de fecha.")
                         st.rerun()
                     except Exception as e:
@@ -490,14 +774,10 @@ elif option == "🛠️ Manipulación de Datos":
             if st.button("Buscar y Reemplazar") and search_value and replace_value:
                 try:
                     # Contar ocurrencias antes del reemplazo
-                    if case_sensitive:
-                        matches = df[search_col].astype(str).str.contains(search_value, regex=False, na=False).sum()
-                        df[search_col] = df[search_col].astype(str).str.replace(search_value, replace_value, regex=False)
-                    else:
-                        matches = df[search_col].astype(str).str.contains(search_value, case=False, regex=False, na=False).sum()
-                        df[search_col] = df[search_col].astype(str).str.replace(search_value, replace_value, case=False, regex=False)
-                    
-                    st.session_state.df = df
+                    matches = df[search_col].astype(str).str.contains(search_value, case=case_sensitive, regex=False, na=False).sum()
+                    apply_change('replace_values', f"Reemplazar '{search_value}' por '{replace_value}' en '{search_col}'",
+                                 column=search_col, search=search_value, replacement=replace_value,
+                                 case_sensitive=case_sensitive)
                     st.toast(f"🔄 {matches} ocurrencias reemplazadas", icon="✅")
                     st.success(f"Se reemplazaron {matches} ocurrencias de '{search_value}' por '{replace_value}'")
                     st.rerun()
@@ -524,24 +804,48 @@ elif option == "📈 Análisis de Datos":
         
         col1, col2 = st.columns(2)
         
+        info = cached_stat('general_info', lambda: general_info(df))
+        
         with col1:
             st.write("**Información General**")
-            st.write(f"- **Filas:** {df.shape[0]:,}")
-            st.write(f"- **Columnas:** {df.shape[1]}")
-            st.write(f"- **Memoria:** {df.memory_usage(deep=True).sum() / 1024:.1f} KB")
-            st.write(f"- **Duplicados:** {df.duplicated().sum()}")
+            st.write(f"- **Filas:** {info['rows']:,}")
+            st.write(f"- **Columnas:** {info['columns']}")
+            st.write(f"- **Memoria:** {info['memory_bytes'] / 1024:.1f} KB")
+            memory_report = st.session_state.memory_report
+            if memory_report and memory_report['converted']:
+                st.write(f"- **Memoria sin optimizar:** {memory_report['before_bytes'] / 1024:.1f} KB "
+                         f"(ahorro {memory_report['saved_pct']:.1f}%)")
+            st.write(f"- **Duplicados:** {info['duplicates']}")
         
         with col2:
             st.write("**Tipos de Datos**")
-            type_counts = df.dtypes.value_counts()
-            for dtype, count in type_counts.items():
+            for dtype, count in info['dtype_counts'].items():
                 st.write(f"- **{dtype}:** {count} columnas")
         
         # Mostrar estadísticas descriptivas
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        if len(numeric_cols) > 0:
+        numeric_description = cached_stat('describe_numeric', lambda: describe_numeric(df))
+        if numeric_description is not None:
             st.subheader("Estadísticas de Columnas Numéricas")
-            st.dataframe(df[numeric_cols].describe(), use_container_width=True)
+            st.dataframe(numeric_description, use_container_width=True)
+        
+        with st.expander("🧾 Perfil completo de columnas", expanded=False):
+            st.caption("Todas las columnas en una sola pasada: momentos, cuantiles y moda de las numéricas; únicos y moda del resto")
+            if st.button("Calcular perfil", key="profile_frame_button"):
+                st.session_state.show_profile = True
+            if st.session_state.get('show_profile'):
+                numeric_profile = cached_stat('numeric_profile', lambda: profile_numeric(df))
+                categorical_profile = cached_stat('categorical_profile', lambda: profile_categorical(
+                    df, [col for col in df.columns if col not in set(numeric_profile.index)]))
+                if len(numeric_profile):
+                    st.write("**Columnas numéricas**")
+                    st.dataframe(numeric_profile, use_container_width=True)
+                if len(categorical_profile):
+                    st.write("**Columnas categóricas y de texto**")
+                    st.dataframe(categorical_profile, use_container_width=True)
+        
+        cache_stats = st.session_state.stats_cache.stats()
+        st.caption(f"🗃️ Caché de estadísticas: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos, "
+                   f"{cache_stats['entries']} resultados guardados")
         
         # Sección de visualización
         st.divider()
@@ -671,6 +975,35 @@ elif option == "📈 Análisis de Datos":
                 
                 # Mostrar valores en el gráfico
                 show_values = st.checkbox("Mostrar valores en el gráfico", value=False)
+                
+                # Límite de filas: por encima se resumen o muestrean los datos del gráfico
+                max_points = st.number_input(
+                    "Máximo de filas en el gráfico (0 = sin límite):",
+                    min_value=0, max_value=1_000_000, value=DOWNSAMPLE_THRESHOLD, step=1000,
+                    help="Con más filas se usa LTTB (área), rejilla 2D o muestra estratificada (burbujas, violín) "
+                         "y cuartiles precalculados (box plot)",
+                    key="max_points"
+                )
+                
+                # Heatmap: agrupar variables parecidas y etiquetar solo correlaciones relevantes
+                if plot_type == "Heatmap":
+                    cluster_heatmap = st.checkbox(
+                        "Agrupar variables por similitud", value=False,
+                        help="Reordena filas y columnas con un clustering jerárquico sobre 1 - |r|",
+                        key="cluster_heatmap"
+                    )
+                    label_threshold = st.slider(
+                        "Etiquetar solo celdas con |r| ≥", 0.0, 1.0, 0.0, 0.05,
+                        key="label_threshold"
+                    )
+                
+                # Box y violín con estadísticas calculadas en el servidor
+                if plot_type in ["Box Plot", "Violin Plot"]:
+                    precomputed_stats = st.checkbox(
+                        "Estadísticas precalculadas", value=False,
+                        help="Envía cuartiles, bigotes, muescas y densidad por categoría en lugar de todas las filas",
+                        key="precomputed_stats"
+                    )
         
         # Crear gráfico
         if st.button("🎯 Generar Gráfico", type="primary"):
@@ -705,18 +1038,34 @@ elif option == "📈 Análisis de Datos":
                     (plot_data[y_column] <= y_range[1])
                 ]
 
-            fig = create_plot(
-                df=plot_data,
-                plot_type=plot_type,
-                x_col=x_column,
-                y_col=y_column,
-                color_col=color_column,
-                marker_size=marker_size if 'marker_size' in locals() else 10,
-                orientation='h' if 'orientation' in locals() and orientation == "Horizontal" else 'v',
-                show_values='show_values' in locals() and show_values
-            )
+            # El gráfico se guarda para volver a mostrarlo en cada recarga sin reconstruirlo
+            st.session_state.plot_request = {
+                'version': st.session_state.data_version,
+                'args': dict(
+                    df=plot_data,
+                    plot_type=plot_type,
+                    x_col=x_column,
+                    y_col=y_column,
+                    color_col=color_column,
+                    marker_size=marker_size if 'marker_size' in locals() else 10,
+                    orientation='h' if 'orientation' in locals() and orientation == "Horizontal" else 'v',
+                    show_values='show_values' in locals() and show_values,
+                    max_points=int(max_points),
+                    precomputed='precomputed_stats' in locals() and precomputed_stats,
+                    cluster='cluster_heatmap' in locals() and cluster_heatmap,
+                    label_threshold=label_threshold if 'label_threshold' in locals() else 0.0
+                )
+            }
+        
+        # Mostrar el último gráfico generado (sale de la caché de figuras si nada cambió)
+        plot_request = st.session_state.get('plot_request')
+        if plot_request and plot_request['version'] == st.session_state.data_version:
+            fig = create_plot(**plot_request['args'])
             if fig:
                 st.plotly_chart(fig, use_container_width=True)
+                figure_stats = figure_cache_stats()
+                st.caption(f"🖼️ Caché de gráficos: {figure_stats['hits']} aciertos, {figure_stats['misses']} fallos, "
+                           f"{figure_stats['entries']} figuras ({figure_stats['bytes'] / 1024 ** 2:.1f} MB)")
         
         # Análisis rápido adicional
         st.divider()
@@ -726,30 +1075,21 @@ elif option == "📈 Análisis de Datos":
         
         with col1:
             if st.button("Ver Valores Únicos por Columna"):
-                unique_info = pd.DataFrame({
+                unique_info = cached_stat('unique_info', lambda: pd.DataFrame({
                     'Columna': df.columns,
                     'Valores Únicos': [df[col].nunique() for col in df.columns],
                     'Tipo': [str(df[col].dtype) for col in df.columns]
-                })
+                }))
                 st.dataframe(unique_info, use_container_width=True)
         
         with col2:
             if st.button("Detectar Outliers (Columnas Numéricas)"):
                 if len(numeric_cols) > 0:
-                    outlier_info = []
-                    for col in numeric_cols:
-                        Q1 = df[col].quantile(0.25)
-                        Q3 = df[col].quantile(0.75)
-                        IQR = Q3 - Q1
-                        outliers = df[(df[col] < Q1 - 1.5*IQR) | (df[col] > Q3 + 1.5*IQR)]
-                        outlier_info.append({
-                            'Columna': col,
-                            'Outliers': len(outliers),
-                            'Porcentaje': f"{len(outliers)/len(df)*100:.2f}%"
-                        })
-                    
-                    outlier_df = pd.DataFrame(outlier_info)
+                    # Cuantiles compartidos con el perfil de columnas y la detección de anomalías
+                    numeric_profile = cached_stat('numeric_profile', lambda: profile_numeric(df))
+                    outlier_df = cached_stat('outlier_summary', lambda: outlier_summary(df, numeric_profile))
                     st.dataframe(outlier_df, use_container_width=True)
+                    st.caption("IQR: fuera de [Q1 - 1.5·IQR, Q3 + 1.5·IQR] · z-score: |z| > 3 · MAD: z robusto > 3.5")
                 else:
                     st.info("❌ No hay columnas numéricas para análisis de outliers")
         
@@ -814,29 +1154,73 @@ elif option == "📊 Análisis Avanzado":
                 st.write("**Estadísticas de Tendencia:**")
                 st.write(f"- Tendencia general: {'Creciente' if df[trend_col].corr(pd.Series(range(len(df)))) > 0 else 'Decreciente'}")
                 st.write(f"- Variación total: {df[trend_col].max() - df[trend_col].min():.2f}")
-        
+
+            # Forma de cada equipo en datos de football-data.co.uk (una fila por equipo y partido)
+            if all(col in df.columns for col in ['HomeTeam', 'AwayTeam', 'Date']):
+                st.markdown("---")
+                st.subheader("Forma de los Equipos")
+                st.info("Medias móviles por equipo de los partidos anteriores (sin incluir el propio partido): "
+                        "puntos, goles, tiros, córners y xG aproximado con tiros y tiros a puerta, además de rachas.")
+                col1, col2 = st.columns(2)
+                with col1:
+                    windows = st.multiselect("Ventanas (partidos):", FORM_WINDOWS, default=[FORM_WINDOW],
+                                             key="form_windows_select")
+                with col2:
+                    form_stat = st.selectbox("Estadística:", ['Puntos', 'GF', 'GA', 'xG', 'xGA', 'Tiros',
+                                                              'Tiros a puerta', 'Córners'], key="form_stat_select")
+
+                if st.button("Calcular Forma", disabled=not windows):
+                    st.session_state.form_request = {'version': st.session_state.data_version,
+                                                     'windows': tuple(sorted(windows))}
+
+                request = st.session_state.get('form_request')
+                if request and request['version'] == st.session_state.data_version:
+                    try:
+                        form = cached_stat('team_form', lambda: team_form(df, request['windows']), request['windows'])
+                        window = request['windows'][0] if FORM_WINDOW not in request['windows'] else FORM_WINDOW
+                        table = cached_stat('current_form', lambda: current_form(df, window), window)
+
+                        st.write(f"**Forma actual (últimos {window} partidos):**")
+                        st.dataframe(table.round(2), use_container_width=True)
+
+                        teams = st.multiselect("Equipos:", sorted(form['Team'].unique()), default=list(table.index[:5]),
+                                               key="form_teams_select")
+                        columns = [f'{form_stat} ({w})' for w in request['windows'] if f'{form_stat} ({w})' in form.columns]
+                        if not columns:
+                            st.warning(f"Los datos no tienen la estadística {form_stat}.")
+                        elif teams:
+                            selected = form[form['Team'].isin(teams)]
+                            fig = px.line(selected, x='Date', y=columns[0], color='Team',
+                                          title=f'{columns[0]} por equipo', labels={'Team': 'Equipo', 'Date': 'Fecha'})
+                            st.plotly_chart(fig)
+
+                        st.download_button("📥 Descargar variables de forma", form.to_csv(index=False),
+                                           file_name="forma_equipos.csv", mime="text/csv")
+                    except Exception as e:
+                        st.error(f"Error al calcular la forma de los equipos: {str(e)}")
+
         elif analysis_type == "🔍 Detección de Anomalías":
             st.subheader("Detección de Anomalías")
             
             # Selección de columna para anomalías
             numeric_cols = df.select_dtypes(include=[np.number]).columns
             anomaly_col = st.selectbox("Selecciona la columna para detectar anomalías:", numeric_cols, key="anomaly_column_select")
+            anomaly_method = st.selectbox("Método:", OUTLIER_METHODS, key="anomaly_method_select",
+                                          help="IQR (Tukey), z-score (|z| > 3) o z robusto con la desviación absoluta mediana (> 3.5)")
             
             if st.button("Detectar Anomalías"):
-                # Calcular estadísticas para anomalías
-                Q1 = df[anomaly_col].quantile(0.25)
-                Q3 = df[anomaly_col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
+                # Límites a partir del perfil en caché (mismos cuantiles que el resto de análisis)
+                numeric_profile = cached_stat('numeric_profile', lambda: profile_numeric(df))
+                lower_bound, upper_bound = outlier_bounds(numeric_profile, anomaly_col, anomaly_method)
                 
-                # Identificar anomalías
-                anomalies = df[(df[anomaly_col] < lower_bound) | (df[anomaly_col] > upper_bound)]
+                # Identificar anomalías (solo la columna analizada)
+                values = df[anomaly_col]
+                anomalies = values[(values < lower_bound) | (values > upper_bound)]
                 
                 # Crear gráfico de anomalías
                 fig = go.Figure()
-                fig.add_trace(go.Box(y=df[anomaly_col], name="Distribución"))
-                fig.add_trace(go.Scatter(y=anomalies[anomaly_col], mode='markers', 
+                fig.add_trace(go.Box(y=values, name="Distribución"))
+                fig.add_trace(go.Scatter(y=anomalies, mode='markers', 
                                        name="Anomalías", marker=dict(color='red', size=10)))
                 fig.update_layout(title=f"Detección de Anomalías - {anomaly_col}")
                 st.plotly_chart(fig)
@@ -918,8 +1302,9 @@ elif option == "📊 Análisis Avanzado":
             if len(numeric_cols) < 2:
                 st.warning("Se necesitan al menos 2 columnas numéricas para el análisis de correlaciones.")
             else:
-                # Matriz de correlación
-                corr_matrix = df[numeric_cols].corr()
+                # Matriz de correlación (compartida con el resto de la aplicación)
+                correlation_service = st.session_state.correlation_service
+                corr_matrix = correlation_service.matrix(df, st.session_state.data_version, 'pearson', numeric_cols)
                 
                 # Crear heatmap
                 fig = px.imshow(corr_matrix,
@@ -934,17 +1319,23 @@ elif option == "📊 Análisis Avanzado":
                 # Análisis detallado de correlaciones
                 st.write("**Correlaciones más Fuertes:**")
                 # Obtener correlaciones más fuertes (excluyendo la diagonal)
-                correlations = []
-                for i in range(len(numeric_cols)):
-                    for j in range(i+1, len(numeric_cols)):
-                        correlations.append({
-                            'Variables': f"{numeric_cols[i]} vs {numeric_cols[j]}",
-                            'Correlación': corr_matrix.iloc[i,j]
-                        })
-                
-                correlations_df = pd.DataFrame(correlations)
-                correlations_df = correlations_df.sort_values('Correlación', key=abs, ascending=False)
+                pairs = correlation_service.pairs(df, st.session_state.data_version, 'pearson', numeric_cols)
+                alpha = st.select_slider("Nivel de significación (FDR):", [0.001, 0.01, 0.05, 0.1], value=0.05,
+                                         key="correlation_alpha")
+                only_significant = st.checkbox("Mostrar solo pares significativos (Benjamini-Hochberg)",
+                                               key="correlation_only_significant")
+                if only_significant:
+                    pairs = pairs[pairs['p ajustado (BH)'] < alpha]
+                correlations_df = pd.DataFrame({
+                    'Variables': pairs['Variable 1'].astype(str) + " vs " + pairs['Variable 2'].astype(str),
+                    'Correlación': pairs['Correlación'],
+                    'IC 95%': [f"[{low:.3f}, {high:.3f}]" for low, high in zip(pairs['IC inferior'], pairs['IC superior'])],
+                    'n': pairs['n'],
+                    'p-valor': pairs['p-valor'],
+                    'p ajustado (BH)': pairs['p ajustado (BH)']
+                })
                 st.dataframe(correlations_df)
+                st.caption(f"{int((pairs['p ajustado (BH)'] < alpha).sum())} pares significativos con FDR < {alpha}")
 
         elif analysis_type == "🎯 Segmentación de Datos":
             st.subheader("Segmentación de Datos (Clustering)")
@@ -954,84 +1345,63 @@ elif option == "📊 Análisis Avanzado":
             if len(numeric_cols) < 2:
                 st.warning("Se necesitan al menos 2 columnas numéricas para la segmentación.")
             else:
-                col1, col2 = st.columns(2)
-                with col1:
-                    var1 = st.selectbox("Primera variable:", numeric_cols, key="segmentation_var1_select")
-                with col2:
-                    var2 = st.selectbox("Segunda variable:", numeric_cols, key="segmentation_var2_select")
-                
+                features = st.multiselect("Variables para segmentar:", list(numeric_cols),
+                                          default=list(numeric_cols[:2]), key="segmentation_features_select")
                 n_clusters = st.slider("Número de segmentos:", 2, 10, 3)
+                segmentation_service = st.session_state.segmentation_service
                 
-                if st.button("Realizar Segmentación"):
-                    # Preparar datos para clustering
-                    X = df[[var1, var2]].dropna()
-                    
-                    # Normalizar datos
-                    scaler = StandardScaler()
-                    X_scaled = scaler.fit_transform(X)
-                    
-                    # Realizar clustering
-                    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-                    clusters = kmeans.fit_predict(X_scaled)
+                if len(features) < 2:
+                    st.info("Selecciona al menos 2 variables.")
+                else:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("Realizar Segmentación"):
+                            # La segmentación se guarda para que los análisis de abajo sobrevivan a cada recarga
+                            st.session_state.segmentation = {'version': st.session_state.data_version,
+                                                             'features': features, 'k': n_clusters}
+                    with col2:
+                        if st.button("Evaluar k de 2 a 10 (codo y silueta)"):
+                            sweep = segmentation_service.sweep(df, st.session_state.data_version, features)
+                            fig_sweep = make_subplots(specs=[[{"secondary_y": True}]])
+                            fig_sweep.add_trace(go.Scatter(x=sweep['k'], y=sweep['Inercia'], name='Inercia (codo)',
+                                                           mode='lines+markers'))
+                            fig_sweep.add_trace(go.Scatter(x=sweep['k'], y=sweep['Silueta'], name='Silueta',
+                                                           mode='lines+markers'), secondary_y=True)
+                            fig_sweep.update_layout(title='Elección del número de segmentos', xaxis_title='k')
+                            st.plotly_chart(fig_sweep)
+                            best_k = int(sweep.loc[sweep['Silueta'].idxmax(), 'k']) if sweep['Silueta'].notna().any() else None
+                            if best_k:
+                                st.write(f"Mayor silueta con k = {best_k}")
+                
+                segmentation = st.session_state.get('segmentation')
+                if segmentation and segmentation['version'] == st.session_state.data_version \
+                        and all(col in df.columns for col in segmentation['features']):
+                    features, n_clusters = segmentation['features'], segmentation['k']
+                    var1, var2 = features[0], features[1]
+                    X, X_scaled = segmentation_service.features(df, st.session_state.data_version, features)
+                    result = segmentation_service.segment(df, st.session_state.data_version, features, n_clusters)
+                    clusters = result['labels']
                     
-                    # Visualizar resultados
-                    fig = px.scatter(x=X[var1], y=X[var2], color=clusters.astype(str),
+                    # Visualizar resultados (las dos primeras variables)
+                    fig = px.scatter(x=X[var1], y=X[var2], color=(clusters + 1).astype(str),
                                     title=f"Segmentación de Datos - {var1} vs {var2}",
                                     labels={"x": var1, "y": var2, "color": "Segmento"})
                     st.plotly_chart(fig)
                     
-                    # Análisis de clusters
+                    # Análisis de clusters: tamaño y centro de cada segmento en todas las variables
                     st.write("**Análisis de Segmentos:**")
-                    for i in range(n_clusters):
-                        segment_data = X[clusters == i]
-                        st.write(f"Segmento {i+1}:")
-                        st.write(f"- Tamaño: {len(segment_data)} ({len(segment_data)/len(X)*100:.1f}%)")
-                        st.write(f"- Centro: {var1}={segment_data[var1].mean():.2f}, {var2}={segment_data[var2].mean():.2f}")
+                    st.dataframe(result['centers'])
+                    if result['minibatch']:
+                        st.caption(f"MiniBatchKMeans sobre {len(X):,} filas")
                     
                     # Clustering Jerárquico
                     st.subheader("Análisis de Clustering Jerárquico")
                     if st.button("Realizar Clustering Jerárquico"):
-                        # Crear dendrograma
-                        Z = linkage(X_scaled, method='ward')
-                        fig_dendrogram = go.Figure()
-                        
-                        # Convertir el dendrograma a formato plotly
-                        dn = dendrogram(Z, no_plot=True)
-                        
-                        # Crear trazas para las líneas del dendrograma
-                        for i, d in zip(dn['icoord'], dn['dcoord']):
-                            fig_dendrogram.add_trace(go.Scatter(x=i, y=d, mode='lines', line=dict(color='blue')))
-                        
-                        fig_dendrogram.update_layout(title='Dendrograma del Clustering Jerárquico',
-                                                    showlegend=False)
-                        st.plotly_chart(fig_dendrogram)
-                    
-                    # Análisis de Componentes Principales (PCA)
-                    st.subheader("Análisis de Componentes Principales (PCA)")
-                    if st.button("Realizar PCA"):
-                        # Aplicar PCA
-                        pca = PCA()
-                        pca_result = pca.fit_transform(X_scaled)
-                        
-                        # Visualizar varianza explicada
-                        explained_variance = pca.explained_variance_ratio_ * 100
-                        fig_pca = go.Figure(data=[
-                            go.Bar(x=[f'PC{i+1}' for i in range(len(explained_variance))],
-                                  y=explained_variance)
-                        ])
-                        fig_pca.update_layout(title='Varianza Explicada por Componente Principal',
-                                             xaxis_title='Componente Principal',
-                                             yaxis_title='Varianza Explicada (%)')
-                        st.plotly_chart(fig_pca)
-                        
-                        # Mostrar contribuciones de variables
-                        loadings = pd.DataFrame(
-                            pca.components_.T,
-                            columns=[f'PC{i+1}' for i in range(len(pca.components_))],
-                            index=[var1, var2]
-                        )
-                        st.write("**Contribución de Variables a los Componentes Principales:**")
-                        st.dataframe(loadings)
+                        # Ward sobre micro-clusters: memoria acotada sea cual sea el número de filas
+                        Z, leaf_sizes, _ = segmentation_service.hierarchy(df, st.session_state.data_version, features)
+                        st.plotly_chart(dendrogram_figure(Z, leaf_sizes))
+                        if len(leaf_sizes) < len(X):
+                            st.caption(f"{len(X):,} filas resumidas en {len(leaf_sizes)} micro-clusters antes de aplicar Ward")
                     
                     # Análisis de Series Temporales con Descomposición
                     st.subheader("Descomposición de Series Temporales")
@@ -1065,27 +1435,63 @@ elif option == "📊 Análisis Avanzado":
                                                     xaxis_title='Fecha',
                                                     yaxis_title='Valor')
                             st.plotly_chart(fig_decomp)
+                
+                # Análisis de Componentes Principales (PCA) sobre cualquier conjunto de columnas
+                st.subheader("Análisis de Componentes Principales (PCA)")
+                pca_columns = st.multiselect("Columnas para el PCA:", list(numeric_cols), default=list(numeric_cols),
+                                             key="pca_columns_select")
+                pca_components = st.slider("Número de componentes:", 1, max(min(MAX_COMPONENTS, len(pca_columns)), 2),
+                                           min(3, max(len(pca_columns), 1)), key="pca_components")
+                if st.button("Realizar PCA", disabled=len(pca_columns) < 2):
+                    st.session_state.pca_request = {'version': st.session_state.data_version,
+                                                    'columns': pca_columns, 'k': pca_components}
+                
+                pca_request = st.session_state.get('pca_request')
+                if pca_request and pca_request['version'] == st.session_state.data_version \
+                        and all(col in df.columns for col in pca_request['columns']):
+                    # Modelo en caché por versión de los datos, columnas y número de componentes
+                    try:
+                        pca_result = cached_stat('pca', lambda: fit_pca(df, pca_request['columns'], pca_request['k']),
+                                                 pca_request['columns'], pca_request['k'])
+                    except ValueError as e:
+                        st.warning(str(e))
+                        pca_result = None
+                    if pca_result is not None:
+                        explained = pca_result['explained']
                     
-                    # Aplicar K-means
-                    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-                    clusters = kmeans.fit_predict(X_scaled)
+                        # Visualizar varianza explicada
+                        fig_pca = go.Figure(data=[
+                            go.Bar(x=explained['Componente'], y=explained['Varianza explicada (%)'], name='Componente'),
+                            go.Scatter(x=explained['Componente'], y=explained['Acumulada (%)'], name='Acumulada',
+                                       mode='lines+markers')
+                        ])
+                        fig_pca.update_layout(title='Varianza Explicada por Componente Principal',
+                                             xaxis_title='Componente Principal',
+                                             yaxis_title='Varianza Explicada (%)')
+                        st.plotly_chart(fig_pca)
+                        st.caption(f"{pca_result['rows']:,} filas completas · método: {pca_result['solver']}")
                     
-                    # Visualizar resultados
-                    fig = px.scatter(x=X[var1], y=X[var2], color=clusters,
-                                    labels={'x': var1, 'y': var2, 'color': 'Segmento'},
-                                    title=f'Segmentación de Datos: {var1} vs {var2}')
-                    st.plotly_chart(fig)
+                        # Mostrar contribuciones de variables
+                        st.write("**Contribución de Variables a los Componentes Principales:**")
+                        st.dataframe(pca_result['loadings'])
                     
-                    # Análisis de segmentos
-                    st.write("**Análisis de Segmentos:**")
-                    for i in range(n_clusters):
-                        segment_data = X[clusters == i]
-                        st.write(f"**Segmento {i+1}:**")
-                        st.write(f"- Tamaño: {len(segment_data)} ({len(segment_data)/len(X)*100:.1f}%)")
-                        st.write(f"- Centro: {var1}={segment_data[var1].mean():.2f}, {var2}={segment_data[var2].mean():.2f}")
+                        scores = pca_result['scores']
+                        if scores.shape[1] >= 2:
+                            st.plotly_chart(px.scatter(scores.iloc[:DOWNSAMPLE_THRESHOLD], x='PC1', y='PC2',
+                                                       title='Proyección sobre los dos primeros componentes'))
+                    
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.download_button("📥 Scores (CSV)", scores.to_csv(), file_name="pca_scores.csv", mime="text/csv")
+                        with col2:
+                            st.download_button("📥 Cargas (CSV)", pca_result['loadings'].to_csv(),
+                                               file_name="pca_cargas.csv", mime="text/csv")
+                        with col3:
+                            st.download_button("📥 Varianza explicada (CSV)", explained.to_csv(index=False),
+                                               file_name="pca_varianza.csv", mime="text/csv")
 
         elif analysis_type == "🔮 Análisis Predictivo":
-            st.subheader("Análisis Predictivo Simple")
+            st.subheader("Análisis Predictivo")
             
             numeric_cols = df.select_dtypes(include=[np.number]).columns
             if len(numeric_cols) < 2:
@@ -1095,47 +1501,122 @@ elif option == "📊 Análisis Avanzado":
                 with col1:
                     target = st.selectbox("Variable objetivo:", numeric_cols, key="predictive_target_select")
                 with col2:
-                    feature = st.selectbox("Variable predictora:", [col for col in numeric_cols if col != target], key="predictive_feature_select")
+                    candidates = [col for col in numeric_cols if col != target]
+                    features = st.multiselect("Variables predictoras:", candidates, default=candidates[:1],
+                                              key="predictive_features_select")
+                col1, col2 = st.columns(2)
+                with col1:
+                    models = st.multiselect("Modelos:", list(REGRESSORS), default=list(REGRESSORS),
+                                            key="predictive_models_select")
+                with col2:
+                    folds = st.slider("Folds de validación cruzada:", 2, 10, CV_FOLDS, key="predictive_folds")
                 
-                if st.button("Realizar Predicción"):
-                    # Preparar datos
-                    X = df[feature].values.reshape(-1, 1)
-                    y = df[target].values
-                    mask = ~np.isnan(X.flatten()) & ~np.isnan(y)
-                    X = X[mask]
-                    y = y[mask]
-                    
-                    # Dividir datos
-                    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+                if st.button("Realizar Predicción", disabled=not features or not models):
+                    st.session_state.prediction_request = {'version': st.session_state.data_version, 'target': target,
+                                                           'features': features, 'models': models, 'folds': folds}
+                
+                request = st.session_state.get('prediction_request')
+                if request and request['version'] == st.session_state.data_version \
+                        and all(col in df.columns for col in request['features'] + [request['target']]):
+                    # Modelos en caché por versión de los datos, objetivo, variables, modelos y folds
+                    try:
+                        with st.spinner("Entrenando modelos..."):
+                            results = cached_stat('cross_validation', lambda: cross_validate_models(
+                                df, request['target'], request['features'], request['models'], request['folds']),
+                                request['target'], request['features'], request['models'], request['folds'])
+                    except ValueError as e:
+                        st.warning(str(e))
+                        results = None
+                    if results is not None:
+                        target = request['target']
+                        summary = results['summary']
+                        best_model = summary.index[0]
                     
-                    # Entrenar modelo
-                    model = LinearRegression()
-                    model.fit(X_train, y_train)
+                        # Métricas de rendimiento
+                        st.write(f"**Métricas de Rendimiento ({request['folds']} folds, {results['rows']:,} filas):**")
+                        st.dataframe(summary.round(4), use_container_width=True)
                     
-                    # Realizar predicciones
-                    y_pred = model.predict(X_test)
+                        # Valores reales frente a predicciones fuera de muestra del mejor modelo
+                        predictions = results['predictions'].iloc[:DOWNSAMPLE_THRESHOLD]
+                        fig = px.scatter(predictions, x='Real', y=best_model, opacity=0.6,
+                                         title=f'Predicción de {target} ({best_model}, fuera de muestra)',
+                                         labels={'Real': f'{target} real', best_model: f'{target} predicho'})
+                        low, high = predictions['Real'].min(), predictions['Real'].max()
+                        fig.add_trace(go.Scatter(x=[low, high], y=[low, high], mode='lines', name='Ideal',
+                                                 line=dict(color='red', dash='dash')))
+                        st.plotly_chart(fig)
                     
-                    # Visualizar resultados
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatter(x=X_test.flatten(), y=y_test, mode='markers',
-                                            name='Datos reales', marker=dict(color='blue')))
-                    fig.add_trace(go.Scatter(x=X_test.flatten(), y=y_pred, mode='lines',
-                                            name='Predicción', line=dict(color='red')))
-                    fig.update_layout(title=f'Predicción de {target} usando {feature}',
-                                    xaxis_title=feature, yaxis_title=target)
-                    st.plotly_chart(fig)
-                    
-                    # Métricas de rendimiento
-                    st.write("**Métricas de Rendimiento:**")
-                    st.write(f"- R² Score: {r2_score(y_test, y_pred):.3f}")
-                    st.write(f"- Error Cuadrático Medio: {mean_squared_error(y_test, y_pred):.3f}")
-                    st.write(f"- Error Absoluto Medio: {mean_absolute_error(y_test, y_pred):.3f}")
+                        # Tiempos por fold para ver dónde se va el entrenamiento
+                        st.write("**Tiempos por fold:**")
+                        fold_table = results['folds']
+                        fig_times = px.bar(fold_table, x='Fold', y='Entrenamiento (s)', color='Modelo', barmode='group',
+                                           title='Tiempo de entrenamiento por fold')
+                        st.plotly_chart(fig_times)
+                        st.dataframe(fold_table.round(4), use_container_width=True)
+
+            # Clasificación del resultado (FTR) para datos de football-data.co.uk
+            if all(col in df.columns for col in ['HomeTeam', 'AwayTeam', 'Date', 'FTR']):
+                st.markdown("---")
+                st.subheader("Predicción de Resultados (H/D/A)")
+                st.info("Variables: probabilidad implícita de las cuotas y forma reciente de cada equipo. "
+                        "Validación walk-forward: cada temporada se predice con un modelo entrenado solo con las anteriores.")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    classifier = st.selectbox("Clasificador:", list(CLASSIFIERS), key="ftr_classifier_select")
+                with col2:
+                    form_window = st.slider("Partidos de forma:", 3, 10, FORM_WINDOW, key="ftr_form_window")
+                with col3:
+                    min_seasons = st.number_input("Temporadas mínimas de entrenamiento:", 1, 10, MIN_TRAIN_SEASONS,
+                                                  key="ftr_min_seasons")
+
+                if st.button("Validar Modelo de Resultados"):
+                    st.session_state.ftr_request = {'version': st.session_state.data_version, 'model': classifier,
+                                                    'window': form_window, 'min_seasons': int(min_seasons)}
+
+                request = st.session_state.get('ftr_request')
+                if request and request['version'] == st.session_state.data_version:
+                    with st.spinner("Validando temporada a temporada..."):
+                        season_table, season_predictions = cached_stat('ftr_walk_forward', lambda: walk_forward_validation(
+                            df, request['model'], request['min_seasons'], request['window']),
+                            request['model'], request['min_seasons'], request['window'])
+                    if season_table.empty:
+                        st.warning("No hay suficientes temporadas para la validación walk-forward.")
+                    else:
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("Log-loss medio", f"{season_table['Log-loss'].mean():.4f}")
+                        with col2:
+                            st.metric("Brier medio", f"{season_table['Brier'].mean():.4f}")
+                        with col3:
+                            st.metric("Acierto medio", f"{season_table['Acierto (%)'].mean():.1f}%")
+
+                        metric_columns = [col for col in ['Log-loss', 'Log-loss mercado'] if col in season_table.columns]
+                        fig = px.line(season_table, x='Temporada', y=metric_columns, markers=True,
+                                      title='Log-loss por temporada (modelo frente al mercado)')
+                        st.plotly_chart(fig)
+                        st.dataframe(season_table.round(4), use_container_width=True)
+
+                        # Puntuación de una lista de próximos partidos con el modelo entrenado con todo el histórico
+                        st.write("**Puntuar próximos partidos:**")
+                        fixtures_file = st.file_uploader("CSV de partidos (HomeTeam, AwayTeam, Date y cuotas opcionales)",
+                                                         type=['csv'], key="ftr_fixtures_uploader")
+                        if fixtures_file is not None:
+                            try:
+                                fixtures = read_csv_with_schema(fixtures_file)
+                                trained = cached_stat('ftr_model', lambda: train_result_model(
+                                    df, request['model'], request['window']), request['model'], request['window'])
+                                scored = score_fixtures(trained, df, fixtures)
+                                st.dataframe(scored.round(4), use_container_width=True)
+                                st.download_button("📥 Descargar predicciones", scored.to_csv(index=False),
+                                                   file_name="predicciones_partidos.csv", mime="text/csv")
+                            except Exception as e:
+                                st.error(f"Error al puntuar los partidos: {str(e)}")
 
         elif analysis_type == "🔄 Análisis de Secuencias":
             st.subheader("Análisis de Patrones Secuenciales")
             
             # Seleccionar columna para análisis de secuencias
-            categorical_cols = df.select_dtypes(include=['object']).columns
+            categorical_cols = df.select_dtypes(include=['object', 'category']).columns
             if len(categorical_cols) == 0:
                 st.warning("No se encontraron columnas categóricas para el análisis de secuencias.")
             else:
@@ -1208,7 +1689,8 @@ elif option == "📊 Análisis Avanzado":
                 
                 # Análisis estadístico
                 if st.button("📊 Análisis Estadístico Completo"):
-                    stats_result = advanced_statistical_analysis(df, selected_column)
+                    numeric_profile = cached_stat('numeric_profile', lambda: profile_numeric(df))
+                    stats_result = advanced_statistical_analysis(df, selected_column, profile=numeric_profile)
                     
                     st.write("**Estadísticas Avanzadas**")
                     for key, value in stats_result.items():
@@ -1222,7 +1704,7 @@ elif option == "📊 Análisis Avanzado":
                     # Distribución de valores
                     st.write("**Distribución de Valores**")
                     
-                    if df[selected_column].dtype in ['int64', 'float64']:
+                    if pd.api.types.is_numeric_dtype(df[selected_column]):
                         # Para columnas numéricas
                         fig_hist = px.histogram(df, x=selected_column, nbins=30, 
                                               title=f"Distribución de {selected_column}")
@@ -1244,7 +1726,7 @@ elif option == "📊 Análisis Avanzado":
                     
                     # Tabla de valores únicos
                     st.write("**Valores Únicos (Top 10)**")
-                    if df[selected_column].dtype in ['int64', 'float64']:
+                    if pd.api.types.is_numeric_dtype(df[selected_column]):
                         unique_stats = df[selected_column].describe()
                         st.dataframe(unique_stats.to_frame().T, use_container_width=True)
                     else:
@@ -1302,7 +1784,7 @@ elif option == "📊 Análisis Avanzado":
                     )
                     if len(selected_x_values) < len(unique_x_values):
                         filter_values[x_column] = selected_x_values
-                elif df[x_column].dtype in ['int64', 'float64']:
+                elif pd.api.types.is_numeric_dtype(df[x_column]):
                     # Para columnas numéricas, usar slider
                     min_val, max_val = float(df[x_column].min()), float(df[x_column].max())
                     if min_val != max_val:
@@ -1314,12 +1796,19 @@ elif option == "📊 Análisis Avanzado":
                             filtered_df = df[(df[x_column] >= range_values[0]) & (df[x_column] <= range_values[1])]
                             filter_values = {'range_filter': filtered_df}
             
+            advanced_precomputed = False
+            if plot_type in ["Box Plot", "Violin Plot"]:
+                advanced_precomputed = st.checkbox("Estadísticas precalculadas (cuartiles y densidad en el servidor)",
+                                                   value=len(df) > DOWNSAMPLE_THRESHOLD, key="advanced_precomputed_stats")
+            
             # Crear gráfico
             if st.button("🎯 Generar Visualización Avanzada", type="primary"):
                 if 'range_filter' in filter_values:
-                    fig = create_advanced_plot(filter_values['range_filter'], plot_type, x_column, y_column, color_column)
+                    fig = create_advanced_plot(filter_values['range_filter'], plot_type, x_column, y_column, color_column,
+                                               precomputed=advanced_precomputed)
                 else:
-                    fig = create_advanced_plot(df, plot_type, x_column, y_column, color_column, filter_values)
+                    fig = create_advanced_plot(df, plot_type, x_column, y_column, color_column, filter_values,
+                                               precomputed=advanced_precomputed)
                 
                 if fig:
                     st.plotly_chart(fig, use_container_width=True)
@@ -1356,7 +1845,7 @@ elif option == "📊 Análisis Avanzado":
                 for col in filter_columns:
                     st.write(f"**Filtro para {col}:**")
                     
-                    if df[col].dtype in ['int64', 'float64']:
+                    if pd.api.types.is_numeric_dtype(df[col]):
                         # Filtro numérico
                         min_val, max_val = float(df[col].min()), float(df[col].max())
                         if min_val != max_val:
@@ -1437,7 +1926,8 @@ elif option == "📊 Análisis Avanzado":
                     key="correlation_method_select"
                 )
                 
-                correlation_matrix = df[numeric_cols].corr(method=corr_method)
+                correlation_service = st.session_state.correlation_service
+                correlation_matrix = correlation_service.matrix(df, st.session_state.data_version, corr_method, numeric_cols)
                 
                 # Heatmap de correlación
                 fig_corr = px.imshow(
@@ -1452,22 +1942,17 @@ elif option == "📊 Análisis Avanzado":
                 # Correlaciones más fuertes
                 st.write("**💪 Correlaciones Más Fuertes**")
                 
-                # Obtener correlaciones sin la diagonal
-                corr_pairs = []
-                for i in range(len(correlation_matrix.columns)):
-                    for j in range(i+1, len(correlation_matrix.columns)):
-                        col1 = correlation_matrix.columns[i]
-                        col2 = correlation_matrix.columns[j]
-                        corr_value = correlation_matrix.iloc[i, j]
-                        corr_pairs.append({
-                            'Variable 1': col1,
-                            'Variable 2': col2,
-                            'Correlación': corr_value,
-                            'Correlación Abs': abs(corr_value)
-                        })
-                
-                corr_df = pd.DataFrame(corr_pairs).sort_values('Correlación Abs', ascending=False)
-                st.dataframe(corr_df.head(10), use_container_width=True)
+                # Pares más fuertes sin la diagonal, con p-valores ajustados por Benjamini-Hochberg
+                corr_df = correlation_service.pairs(df, st.session_state.data_version, corr_method, numeric_cols)
+                col1, col2 = st.columns(2)
+                with col1:
+                    top_k = st.number_input("Pares a mostrar:", min_value=1, max_value=max(len(corr_df), 1),
+                                            value=min(10, max(len(corr_df), 1)), key="correlation_top_k")
+                with col2:
+                    max_adjusted_p = st.number_input("p ajustado (BH) máximo:", min_value=0.0, max_value=1.0,
+                                                     value=1.0, step=0.01, key="correlation_max_adjusted_p")
+                corr_df = corr_df[~(corr_df['p ajustado (BH)'] > max_adjusted_p)]
+                st.dataframe(corr_df.head(int(top_k)), use_container_width=True)
                 
                 # Análisis de regresión simple
                 st.divider()
@@ -0,0 +1 @@
+# Configuración de pytest: la raíz del repositorio va en sys.path para importar ``src.*`` desde las pruebas
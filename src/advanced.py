@@ -2,40 +2,47 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+import pandas as pd
+
+from src.profiler import profile_numeric, profile_categorical
+from src.correlation import correlation_matrix
+from src.create_plot import (summary_box_figure, summary_violin_figure, count_summary_groups,
+                             MAX_SUMMARY_GROUPS)
+
+# Campos del análisis por columna (en el orden en que se muestran)
+NUMERIC_ANALYSIS_FIELDS = ['Media', 'Mediana', 'Moda', 'Desviación Estándar', 'Varianza', 'Asimetría (Skewness)',
+                           'Curtosis', 'Rango', 'Q1 (25%)', 'Q3 (75%)', 'IQR']
+
 
 # Función para análisis estadístico avanzado
-def advanced_statistical_analysis(df, column):
-    """Realiza análisis estadístico avanzado de una columna"""
-    if df[column].dtype in ['int64', 'float64']:
-        # Estadísticas básicas
-        stats_dict = {
-            'Media': df[column].mean(),
-            'Mediana': df[column].median(),
-            'Moda': df[column].mode().iloc[0] if not df[column].mode().empty else 'N/A',
-            'Desviación Estándar': df[column].std(),
-            'Varianza': df[column].var(),
-            'Asimetría (Skewness)': df[column].skew(),
-            'Curtosis': df[column].kurtosis(),
-            'Rango': df[column].max() - df[column].min(),
-            'Q1 (25%)': df[column].quantile(0.25),
-            'Q3 (75%)': df[column].quantile(0.75),
-            'IQR': df[column].quantile(0.75) - df[column].quantile(0.25)
-        }
-        
+def advanced_statistical_analysis(df, column, profile=None):
+    """Realiza análisis estadístico avanzado de una columna.
+
+    Si se pasa ``profile`` (tabla de ``profile_numeric`` con todas las columnas),
+    se reutiliza en lugar de recorrer la columna de nuevo.
+    """
+    if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]):
+        if profile is None or column not in profile.index:
+            profile = profile_numeric(df, [column])
+        row = profile.loc[column]
+        stats_dict = {key: row[key] for key in NUMERIC_ANALYSIS_FIELDS}
+        if pd.isna(stats_dict['Moda']):
+            stats_dict['Moda'] = 'N/A'
         return stats_dict
     else:
         # Para columnas categóricas
+        row = profile_categorical(df, [column]).loc[column]
         stats_dict = {
-            'Valores únicos': df[column].nunique(),
-            'Valor más frecuente': df[column].mode().iloc[0] if not df[column].mode().empty else 'N/A',
-            'Frecuencia del más común': df[column].value_counts().iloc[0] if not df[column].empty else 0,
-            'Valores nulos': df[column].isnull().sum(),
-            'Porcentaje nulos': f"{df[column].isnull().sum() / len(df) * 100:.2f}%"
+            'Valores únicos': row['Valores únicos'],
+            'Valor más frecuente': row['Valor más frecuente'],
+            'Frecuencia del más común': row['Frecuencia del más común'],
+            'Valores nulos': row['Nulos'],
+            'Porcentaje nulos': row['Porcentaje nulos']
         }
         return stats_dict
 
 # Función para crear gráficos avanzados
-def create_advanced_plot(df, plot_type, x_col, y_col=None, color_col=None, filter_values=None):
+def create_advanced_plot(df, plot_type, x_col, y_col=None, color_col=None, filter_values=None, precomputed=False):
     try:
         # Aplicar filtros si se proporcionan
         filtered_df = df.copy()
@@ -72,20 +79,31 @@ def create_advanced_plot(df, plot_type, x_col, y_col=None, color_col=None, filte
         elif plot_type == "Heatmap":
             numeric_df = filtered_df.select_dtypes(include=[np.number])
             if len(numeric_df.columns) > 1:
-                correlation_matrix = numeric_df.corr()
-                fig = px.imshow(correlation_matrix, text_auto=True, aspect="auto", 
+                fig = px.imshow(correlation_matrix(numeric_df), text_auto=True, aspect="auto", 
                                title="Matriz de Correlación (Heatmap)")
             else:
                 st.error("Se necesitan al menos 2 columnas numéricas para crear un heatmap")
                 return None
         
         elif plot_type == "Box Plot":
-            fig = px.box(filtered_df, x=x_col, y=y_col, color=color_col,
-                        title=f"Box Plot: {x_col} vs {y_col}")
+            groups = count_summary_groups(filtered_df, x_col, y_col, color_col) if precomputed else None
+            if groups is not None and groups <= MAX_SUMMARY_GROUPS:
+                # Cuartiles, bigotes, muescas y media calculados en el servidor
+                fig = summary_box_figure(filtered_df, x_col, y_col, color_col, px.colors.qualitative.Plotly,
+                                         f"Box Plot: {x_col} vs {y_col}")
+            else:
+                fig = px.box(filtered_df, x=x_col, y=y_col, color=color_col,
+                            title=f"Box Plot: {x_col} vs {y_col}")
         
         elif plot_type == "Violin Plot":
-            fig = px.violin(filtered_df, x=x_col, y=y_col, color=color_col,
-                           title=f"Violin Plot: {x_col} vs {y_col}")
+            groups = count_summary_groups(filtered_df, x_col, y_col, color_col) if precomputed else None
+            if groups is not None and groups <= MAX_SUMMARY_GROUPS:
+                # Densidad en rejilla fija por categoría calculada en el servidor
+                fig = summary_violin_figure(filtered_df, x_col, y_col, color_col, px.colors.qualitative.Plotly,
+                                            f"Violin Plot: {x_col} vs {y_col}")
+            else:
+                fig = px.violin(filtered_df, x=x_col, y=y_col, color=color_col,
+                               title=f"Violin Plot: {x_col} vs {y_col}")
         
         elif plot_type == "Histograma":
             fig = px.histogram(filtered_df, x=x_col, color=color_col, nbins=30,
@@ -0,0 +1,235 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+import pandas as pd
+
+# Configuración por defecto de la caché en disco
+DEFAULT_CACHE_DIR = os.environ.get(
+    'DATA_ANALYTICS_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'data-analytics')
+)
+DEFAULT_TTL = int(os.environ.get('DATA_ANALYTICS_CACHE_TTL', 3600))
+DEFAULT_MAX_BYTES = int(os.environ.get('DATA_ANALYTICS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+
+# Caché en disco direccionada por contenido para archivos descargados
+class DiskCache:
+    """Caché LRU en disco con TTL y validadores HTTP (ETag / Last-Modified).
+
+    El índice asocia cada URL resuelta con el hash SHA-256 de su contenido.
+    Los objetos (CSV original y DataFrame ya parseado) se guardan una sola
+    vez por hash, de modo que dos URLs con el mismo contenido comparten disco.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._objects_dir = os.path.join(directory, 'objects')
+        self._index_path = os.path.join(directory, 'index.json')
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        os.makedirs(self._objects_dir, exist_ok=True)
+
+    # ---------- Índice ----------
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        # Escritura atómica para no corromper el índice con escrituras concurrentes
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _object_path(self, digest, suffix):
+        return os.path.join(self._objects_dir, f"{digest}.{suffix}")
+
+    def _object_files(self, digest):
+        """CSV original y todas las variantes parseadas de un mismo contenido"""
+        return glob.glob(os.path.join(self._objects_dir, f"{digest}.*"))
+
+    # ---------- Consulta ----------
+    def lookup(self, url):
+        """Devuelve la entrada de la URL (o None) y actualiza su último acceso"""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(url)
+            if entry is None or not os.path.exists(self._object_path(entry['digest'], 'csv')):
+                return None
+            entry['last_access'] = time.time()
+            self._save_index(index)
+            return dict(entry)
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def is_fresh(self, entry):
+        return self.ttl > 0 and time.time() - entry['fetched_at'] < self.ttl
+
+    def validators(self, entry):
+        """Cabeceras para una petición condicional"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def content_path(self, entry):
+        return self._object_path(entry['digest'], 'csv')
+
+    def read_frame(self, entry, variant='raw'):
+        """Carga el DataFrame ya parseado, evitando volver a leer el CSV"""
+        try:
+            return pd.read_pickle(self._object_path(entry['digest'], f'{variant}.pkl'))
+        except Exception:
+            return None
+
+    # ---------- Escritura ----------
+    def temp_path(self):
+        """Ruta temporal dentro de la caché, para poder moverla con os.replace"""
+        fd, tmp_path = tempfile.mkstemp(dir=self._objects_dir, suffix='.tmp')
+        os.close(fd)
+        return tmp_path
+
+    def store(self, url, content, df=None, etag=None, last_modified=None, encoding=None, variant='raw'):
+        tmp_path = self.temp_path()
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        digest = hashlib.sha256(content).hexdigest()
+        return self.store_file(url, tmp_path, digest, df, etag, last_modified, encoding, variant)
+
+    def store_file(self, url, path, digest, df=None, etag=None, last_modified=None, encoding=None, variant='raw'):
+        """Registra un archivo ya escrito en disco (se mueve dentro de la caché).
+
+        Con path=None solo se añade una nueva variante parseada de un contenido existente.
+        """
+        csv_path = self._object_path(digest, 'csv')
+        pkl_path = self._object_path(digest, f'{variant}.pkl')
+        with self._lock:
+            if path is not None:
+                if os.path.exists(csv_path):
+                    os.remove(path)
+                else:
+                    os.replace(path, csv_path)
+            if df is not None and not os.path.exists(pkl_path):
+                tmp_path = self.temp_path()
+                df.to_pickle(tmp_path)
+                os.replace(tmp_path, pkl_path)
+
+            size = sum(os.path.getsize(path) for path in self._object_files(digest))
+
+            now = time.time()
+            index = self._load_index()
+            previous = index.get(url)
+            index[url] = {
+                'digest': digest,
+                'etag': etag,
+                'last_modified': last_modified,
+                'encoding': encoding,
+                'size': size,
+                'fetched_at': now,
+                'last_access': now
+            }
+            # Contenido nuevo para la URL (200 tras un ETag caducado): el anterior queda huérfano
+            if previous and previous['digest'] != digest \
+                    and not any(e['digest'] == previous['digest'] for e in index.values()):
+                self._remove_objects(previous['digest'])
+            self._evict(index)
+            self._save_index(index)
+            return dict(index[url])
+
+    def revalidate(self, url, etag=None, last_modified=None):
+        """Marca la entrada como fresca tras una respuesta 304 Not Modified"""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(url)
+            if entry is None:
+                return None
+            entry['fetched_at'] = time.time()
+            if etag:
+                entry['etag'] = etag
+            if last_modified:
+                entry['last_modified'] = last_modified
+            self._save_index(index)
+            self.revalidations += 1
+            return dict(entry)
+
+    # ---------- Expulsión ----------
+    def _evict(self, index):
+        """Elimina las URLs menos usadas recientemente hasta respetar max_bytes"""
+        sizes = {}
+        for entry in index.values():
+            sizes[entry['digest']] = entry['size']
+        total = sum(sizes.values())
+
+        for url in sorted(index, key=lambda u: index[u]['last_access']):
+            if total <= self.max_bytes or len(index) <= 1:
+                break
+            digest = index.pop(url)['digest']
+            # Solo se borra el objeto si ninguna otra URL lo referencia
+            if any(e['digest'] == digest for e in index.values()):
+                continue
+            total -= sizes[digest]
+            self._remove_objects(digest)
+
+    def _remove_objects(self, digest):
+        for path in self._object_files(digest):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self._objects_dir):
+                try:
+                    os.remove(os.path.join(self._objects_dir, name))
+                except OSError:
+                    pass
+            self._save_index({})
+
+    def stats(self):
+        index = self._load_index()
+        total = sum({e['digest']: e['size'] for e in index.values()}.values())
+        return {
+            'entries': len(index),
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations
+        }
+
+
+_default_cache = None
+
+
+# Función para obtener la caché compartida del proceso
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        try:
+            _default_cache = DiskCache()
+        except OSError:
+            # Sistema de archivos de solo lectura: se trabaja sin caché
+            return None
+    return _default_cache
@@ -0,0 +1,464 @@
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, t as student_t
+
+from src.profiler import numeric_columns
+from src.stats import StatsCache, frame_fingerprint
+
+CORRELATION_METHODS = ['pearson', 'spearman', 'kendall']
+# Filas procesadas a la vez al acumular las sumas cruzadas
+ROW_BLOCK = 65536
+# Kendall: celdas máximas de la tabla de contingencia (por encima se usa merge sort)
+KENDALL_TABLE_CELLS = 1_000_000
+# Error estándar de atanh(r) por método (Fisher; Fieller et al. para Spearman y Kendall): (factor, filas restadas)
+FISHER_SE = {'pearson': (1.0, 3), 'spearman': (1.06, 3), 'kendall': (0.437, 4)}
+# Kendall: trabajo mínimo (pares × filas) para repartir los pares entre procesos
+KENDALL_PARALLEL_WORK = 20_000_000
+
+
+# Función para calcular una huella del contenido de cada columna (el índice se hashea una vez)
+def _column_keys(df, columns):
+    index_hash = frame_fingerprint(df, [])
+    return [(index_hash, col, str(df[col].dtype),
+             hashlib.blake2b(pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes(),
+                             digest_size=16).hexdigest())
+            for col in columns]
+
+
+# Función para acumular las sumas cruzadas de todas las columnas con las nuevas, por bloques de filas
+def _cross_sums(values, centers, added, kept):
+    """Para x_i (todas) y x_j (nuevas) devuelve N = filas con ambas observadas,
+    S = suma de x_i donde hay x_j, Q = suma de x_i² donde hay x_j y P = suma de x_i · x_j;
+    y, como S y Q no son simétricas, también S y Q de las nuevas donde hay cada conservada."""
+    n, s, q, p = (np.zeros((values.shape[1], len(added))) for _ in range(4))
+    s_row, q_row = (np.zeros((len(added), len(kept))) for _ in range(2))
+    for start in range(0, len(values), ROW_BLOCK):
+        block = values[start:start + ROW_BLOCK]
+        mask = ~np.isnan(block)
+        a = np.where(mask, block - centers, 0.0)
+        a_mask = mask.astype(np.float64)
+        a2 = a * a
+        b, b_mask = a[:, added], a_mask[:, added]
+        n += a_mask.T @ b_mask
+        s += a.T @ b_mask
+        q += a2.T @ b_mask
+        p += a.T @ b
+        if kept:
+            s_row += b.T @ a_mask[:, kept]
+            q_row += a2[:, added].T @ a_mask[:, kept]
+    return n, s, q, p, s_row, q_row
+
+
+# Sumas cruzadas de Pearson reutilizables al añadir o quitar columnas
+class PearsonGram:
+    """Guarda, por columna, una huella de su contenido y las sumas cruzadas con las demás.
+
+    Al pedir otro conjunto de columnas solo se calculan los bloques de las columnas
+    nuevas (coste O(filas · columnas · nuevas)) y las eliminadas simplemente se
+    descartan. Con observaciones por pares, igual que ``DataFrame.corr``.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.centers = np.empty(0)
+        self.sums = tuple(np.empty((0, 0)) for _ in range(4))
+
+    def update(self, df, columns):
+        keys = _column_keys(df, columns)
+        position = {key: i for i, key in enumerate(self.keys)}
+        kept = [i for i, key in enumerate(keys) if key in position]
+        added = [i for i, key in enumerate(keys) if key not in position]
+        old = np.array([position[keys[i]] for i in kept], dtype=np.intp)
+
+        centers = np.empty(len(columns))
+        centers[kept] = self.centers[old]
+        sums = [np.empty((len(columns), len(columns))) for _ in range(4)]
+        for full, previous in zip(sums, self.sums):
+            full[np.ix_(kept, kept)] = previous[np.ix_(old, old)]
+
+        if added:
+            values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            centers[added] = np.nanmean(values[:, added], axis=0) if len(values) else 0.0
+            n, s, q, p, s_row, q_row = _cross_sums(values, centers, added, kept)
+            # Bloque (todas × nuevas); el bloque (nuevas × conservadas) es el traspuesto en N y P
+            for full, block in zip(sums, (n, s, q, p)):
+                full[:, added] = block
+            for full, block in zip(sums, (n.T[:, kept], s_row, q_row, p.T[:, kept])):
+                full[np.ix_(added, kept)] = block
+
+        self.keys, self.centers, self.sums = keys, centers, tuple(sums)
+        return self.matrix(columns)
+
+    def matrix(self, columns):
+        n, s, q, p = self.sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = p - s * s.T / n
+            variance_left = q - s * s / n
+            variance_right = q.T - s.T * s.T / n
+            corr = covariance / np.sqrt(variance_left * variance_right)
+        corr[(n < 2) | (variance_left <= 0) | (variance_right <= 0)] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        diagonal = np.diag_indices_from(corr)
+        corr[diagonal] = np.where(np.isnan(corr[diagonal]), np.nan, 1.0)
+        return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+# Función para contar inversiones (i < j con v_i > v_j) con un merge sort vectorizado
+def _count_inversions(values):
+    """``values`` son rangos enteros no negativos. En cada nivel se fusionan a la vez todos
+    los pares de bloques vecinos ya ordenados con una ordenación estable por (bloque, valor);
+    un elemento de la mitad derecha que avanza de la posición p a la r salta p - r elementos
+    mayores de la izquierda, que son sus inversiones."""
+    values = np.asarray(values, dtype=np.int64)
+    n = len(values)
+    span = int(values.max()) + 1 if n else 1
+    positions = np.arange(n)
+    merged_position = np.empty(n, dtype=np.intp)
+    total = 0
+    width = 1
+    while width < n:
+        block_offset = positions // (2 * width) * span
+        is_right = (positions // width) % 2 == 1
+        order = np.argsort(block_offset + values, kind='stable')
+        merged_position[order] = positions
+        total += int((positions[is_right] - merged_position[is_right]).sum())
+        values = values[order]
+        width *= 2
+    return total
+
+
+# Función para calcular tau-b de Kendall entre dos columnas ya convertidas en rangos densos
+def kendall_tau(x_rank, y_rank, x_levels=None, y_levels=None):
+    """Rangos enteros desde 0 y -1 para los nulos (observaciones por pares, como pandas).
+
+    Con pocos valores distintos (cuotas, goles) cuenta pares discordantes sobre la tabla de
+    contingencia en O(n + celdas); si no, ordena por (x, y) y cuenta inversiones en O(n log n).
+    """
+    valid = (x_rank >= 0) & (y_rank >= 0)
+    x, y = x_rank[valid], y_rank[valid]
+    n = len(x)
+    if n < 2:
+        return np.nan
+    x_levels = int(x.max()) + 1 if x_levels is None else x_levels
+    y_levels = int(y.max()) + 1 if y_levels is None else y_levels
+
+    if x_levels * y_levels <= KENDALL_TABLE_CELLS:
+        table = np.bincount(x * y_levels + y, minlength=x_levels * y_levels).reshape(x_levels, y_levels)
+        # below[i, j] = filas con x' > x_i e y' < y_j
+        below = np.zeros((x_levels + 1, y_levels + 1), dtype=np.int64)
+        below[:x_levels, 1:] = table[::-1].cumsum(axis=0)[::-1].cumsum(axis=1)
+        discordant = int((table * below[1:, :y_levels]).sum())
+        x_counts, y_counts, joint_counts = table.sum(axis=1), table.sum(axis=0), table.ravel()
+    else:
+        order = np.lexsort((y, x))
+        x, y = x[order], y[order]
+        # Con los empates de x ordenados por y, cada inversión es un par estrictamente discordante
+        discordant = _count_inversions(y)
+        x_counts = np.bincount(x)
+        y_counts = np.bincount(y)
+        runs = np.flatnonzero(np.r_[True, (x[1:] != x[:-1]) | (y[1:] != y[:-1]), True])
+        joint_counts = np.diff(runs)
+
+    def tied(counts):
+        counts = counts.astype(np.int64)
+        return int((counts * (counts - 1) // 2).sum())
+
+    total = n * (n - 1) // 2
+    x_ties, y_ties = tied(x_counts), tied(y_counts)
+    denominator = (total - x_ties) * (total - y_ties)
+    if denominator <= 0:
+        return np.nan
+    return (total - x_ties - y_ties + tied(joint_counts) - 2 * discordant) / np.sqrt(float(denominator))
+
+
+# Función para convertir cada columna en rangos densos una sola vez (-1 para los nulos)
+def dense_ranks(df, columns):
+    ranks = np.full((len(df), len(columns)), -1, dtype=np.int64)
+    levels = np.zeros(len(columns), dtype=np.int64)
+    for i, col in enumerate(columns):
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        observed = ~np.isnan(values)
+        unique, inverse = np.unique(values[observed], return_inverse=True)
+        ranks[observed, i] = inverse.ravel()
+        levels[i] = len(unique)
+    return ranks, levels
+
+
+# Estado de cada proceso del pool: rangos compartidos una vez por proceso
+_KENDALL_RANKS = None
+
+
+def _init_kendall_worker(ranks, levels):
+    global _KENDALL_RANKS
+    _KENDALL_RANKS = (ranks, levels)
+
+
+def _kendall_pairs(pairs):
+    ranks, levels = _KENDALL_RANKS
+    return [kendall_tau(ranks[:, i], ranks[:, j], levels[i], levels[j]) for i, j in pairs]
+
+
+# Función para calcular la matriz de Kendall repartiendo los pares entre procesos
+def kendall_matrix(df, columns=None, workers=None):
+    columns = numeric_columns(df) if columns is None else list(columns)
+    ranks, levels = dense_ranks(df, columns)
+    rows, cols = np.triu_indices(len(columns), k=1)
+    pairs = list(zip(rows.tolist(), cols.tolist()))
+    workers = (os.cpu_count() or 1) if workers is None else workers
+
+    if workers > 1 and len(pairs) > 1 and len(pairs) * len(df) >= KENDALL_PARALLEL_WORK:
+        # Varios lotes por proceso para repartir bien pares de coste desigual
+        chunks = [pairs[start::workers * 4] for start in range(workers * 4)]
+        with ProcessPoolExecutor(workers, initializer=_init_kendall_worker, initargs=(ranks, levels)) as pool:
+            results = list(pool.map(_kendall_pairs, chunks))
+    else:
+        _init_kendall_worker(ranks, levels)
+        chunks, results = [pairs], [_kendall_pairs(pairs)]
+
+    matrix = np.eye(len(columns))
+    for chunk, taus in zip(chunks, results):
+        for (i, j), tau in zip(chunk, taus):
+            matrix[i, j] = matrix[j, i] = tau
+    # Como pandas: 1 en la diagonal salvo en columnas sin datos
+    matrix[np.diag_indices_from(matrix)] = np.where(levels > 0, 1.0, np.nan)
+    return pd.DataFrame(matrix, index=columns, columns=columns)
+
+
+# Función para correlacionar por Pearson dos bloques de columnas sin nulos
+def _pearson_block(left, right):
+    left = left - left.mean(axis=0)
+    right = right - right.mean(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (left.T @ right) / np.outer(np.sqrt((left * left).sum(axis=0)), np.sqrt((right * right).sum(axis=0)))
+
+
+# Función para obtener rangos promedio de varias columnas en un subconjunto de filas
+def _average_ranks(ranks, levels, rows, members):
+    """A partir de los rangos densos globales basta contar cada nivel en las filas elegidas
+    (un único ``bincount`` para todas las columnas); sin volver a ordenar. Cada columna queda
+    desplazada por una constante, que no cambia la correlación."""
+    offsets = np.r_[0, np.cumsum(levels[members])[:-1]]
+    flat = ranks[np.ix_(rows, members)] + offsets
+    counts = np.bincount(flat.ravel(), minlength=int(levels[members].sum()))
+    average = np.cumsum(counts) - (counts - 1) / 2.0
+    return average[flat]
+
+
+# Función para calcular Spearman ordenando cada columna una sola vez
+def spearman_matrix(df, columns=None):
+    """Rangos densos por columna (una ordenación) y después un producto de matrices.
+
+    Los rangos de pandas son por pares (solo filas con ambas columnas), así que las
+    columnas se agrupan por patrón de nulos y, para cada par de patrones, los rangos
+    promedio de sus filas comunes se obtienen contando, no ordenando.
+    """
+    columns = numeric_columns(df) if columns is None else list(columns)
+    ranks, levels = dense_ranks(df, columns)
+    observed = ranks >= 0
+    patterns, group = np.unique(observed.T, axis=0, return_inverse=True)
+    group = group.ravel()
+    matrix = np.full((len(columns), len(columns)), np.nan)
+    for a in range(len(patterns)):
+        for b in range(a, len(patterns)):
+            rows = np.flatnonzero(patterns[a] & patterns[b])
+            if len(rows) < 2:
+                continue
+            left, right = np.flatnonzero(group == a), np.flatnonzero(group == b)
+            members = np.concatenate([left, right]) if a != b else left
+            ranked = _average_ranks(ranks, levels, rows, members)
+            block = _pearson_block(ranked[:, :len(left)], ranked[:, len(left):] if a != b else ranked)
+            matrix[np.ix_(left, right)] = block
+            matrix[np.ix_(right, left)] = block.T
+    matrix = np.clip(matrix, -1.0, 1.0)
+    diagonal = np.diag_indices_from(matrix)
+    matrix[diagonal] = np.where(np.isnan(matrix[diagonal]), np.nan, 1.0)
+    return pd.DataFrame(matrix, index=columns, columns=columns)
+
+
+# Función para calcular una matriz de correlación sin caché
+def correlation_matrix(df, method='pearson', columns=None):
+    columns = numeric_columns(df) if columns is None else list(columns)
+    if method == 'pearson':
+        return PearsonGram().update(df, columns)
+    if method == 'spearman':
+        return spearman_matrix(df, columns)
+    return kendall_matrix(df, columns)
+
+
+# Función para contar, por pares de columnas, las filas con ambas observadas
+def pair_counts(df, columns=None):
+    columns = numeric_columns(df) if columns is None else list(columns)
+    observed = df[columns].notna().to_numpy(dtype=np.float64)
+    return pd.DataFrame(observed.T @ observed, index=columns, columns=columns).astype(np.int64)
+
+
+# Función para ajustar p-valores por Benjamini-Hochberg (los NaN no cuentan)
+def benjamini_hochberg(p_values):
+    p_values = np.asarray(p_values, dtype=np.float64)
+    adjusted = np.full(p_values.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if len(valid) == 0:
+        return adjusted
+    order = valid[np.argsort(p_values[valid], kind='stable')]
+    scaled = p_values[order] * len(valid) / np.arange(1, len(valid) + 1)
+    # Mínimo acumulado desde el p-valor más grande hacia el más pequeño
+    adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    return adjusted
+
+
+# Función para calcular p-valores e intervalos de confianza de muchos coeficientes a la vez
+def correlation_significance(r, n, method='pearson', confidence=0.95):
+    """Devuelve (p-valor, IC inferior, IC superior) vectorizados a partir de r y n.
+
+    Pearson y Spearman usan la t de Student con n - 2 grados de libertad; Kendall, la
+    aproximación normal de tau. Los intervalos transforman r con atanh (Fisher).
+    """
+    r = np.asarray(r, dtype=np.float64)
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == 'kendall':
+            z = 3 * r * np.sqrt(n * (n - 1)) / np.sqrt(2 * (2 * n + 5))
+            p_value = 2 * norm.sf(np.abs(z))
+        else:
+            dof = n - 2
+            statistic = r * np.sqrt(dof / np.maximum(1 - r * r, 0))
+            p_value = np.where(dof > 0, 2 * student_t.sf(np.abs(statistic), np.maximum(dof, 1)), np.nan)
+        factor, offset = FISHER_SE[method]
+        spread = norm.ppf(0.5 + confidence / 2) * np.sqrt(factor / (n - offset))
+        center = np.arctanh(np.clip(r, -1 + 1e-15, 1 - 1e-15))
+        valid = n > offset
+        lower = np.where(valid, np.tanh(center - spread), np.nan)
+        upper = np.where(valid, np.tanh(center + spread), np.nan)
+    p_value = np.where(np.isnan(r), np.nan, p_value)
+    return p_value, lower, upper
+
+
+# Función para listar los pares de variables ordenados por |correlación|
+def top_pairs(matrix, k=None, counts=None, method='pearson', confidence=0.95):
+    """Recorre el triángulo superior con ``np.triu_indices`` y devuelve los ``k`` pares más fuertes.
+
+    Con ``counts`` (filas por par) añade n, p-valor, intervalo de confianza y el p-valor
+    ajustado por Benjamini-Hochberg, calculado sobre todos los pares antes de recortar.
+    """
+    rows, cols = np.triu_indices(len(matrix), k=1)
+    values = matrix.to_numpy()[rows, cols]
+    strength = np.abs(values)
+    names = np.asarray(matrix.columns, dtype=object)
+    pairs = pd.DataFrame({
+        'Variable 1': names[rows],
+        'Variable 2': names[cols],
+        'Correlación': values,
+        'Correlación Abs': strength
+    })
+    if counts is not None:
+        n = counts.loc[matrix.index, matrix.columns].to_numpy()[rows, cols]
+        p_value, lower, upper = correlation_significance(values, n, method, confidence)
+        pairs['n'] = n
+        pairs['IC inferior'] = lower
+        pairs['IC superior'] = upper
+        pairs['p-valor'] = p_value
+        pairs['p ajustado (BH)'] = benjamini_hochberg(p_value)
+    # Los NaN van al final
+    order = np.argsort(-np.nan_to_num(strength, nan=-1.0), kind='stable')
+    if k is not None:
+        order = order[:k]
+    return pairs.iloc[order].reset_index(drop=True)
+
+
+# Servicio de correlaciones de la sesión
+class CorrelationService:
+    """Matrices y pares más fuertes memorizados por (versión de los datos, método, columnas).
+
+    Pearson se apoya en ``PearsonGram``, que sobrevive a los cambios de versión:
+    si solo se añadieron o quitaron columnas, las sumas del resto se reutilizan.
+    """
+
+    def __init__(self):
+        self.cache = StatsCache()
+        self.pearson = PearsonGram()
+
+    def matrix(self, df, version, method='pearson', columns=None):
+        columns = numeric_columns(df) if columns is None else list(columns)
+        return self.cache.get(version, 'correlation_matrix', lambda: self._compute(df, method, columns),
+                              method, columns)
+
+    def pairs(self, df, version, method='pearson', columns=None, k=None):
+        columns = numeric_columns(df) if columns is None else list(columns)
+        return self.cache.get(version, 'correlation_pairs',
+                              lambda: top_pairs(self.matrix(df, version, method, columns), k,
+                                                self.counts(df, version, columns), method),
+                              method, columns, k)
+
+    def counts(self, df, version, columns=None):
+        columns = numeric_columns(df) if columns is None else list(columns)
+        return self.cache.get(version, 'pair_counts', lambda: pair_counts(df, columns), columns)
+
+    def _compute(self, df, method, columns):
+        if method == 'pearson':
+            return self.pearson.update(df, columns)
+        return correlation_matrix(df, method, columns)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+# Función para generar datos de prueba parecidos a un CSV de football-data (goles y cuotas)
+def _benchmark_frame(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(size=rows)
+    data = {}
+    for i in range(columns):
+        if i % 2 == 0:
+            data[f'goles_{i}'] = rng.poisson(np.exp(0.3 + 0.2 * strength)).astype(np.float64)
+        else:
+            odds = np.round(np.exp(0.8 - 0.3 * strength + rng.normal(scale=0.2, size=rows)), 2)
+            odds[rng.random(rows) < 0.02] = np.nan
+            data[f'cuota_{i}'] = odds
+    return pd.DataFrame(data)
+
+
+# Función para comparar los tiempos con DataFrame.corr
+def benchmark(df, methods=CORRELATION_METHODS):
+    rows = []
+    for method in methods:
+        start = time.perf_counter()
+        expected = df.corr(method=method)
+        pandas_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        result = correlation_matrix(df, method)
+        service_seconds = time.perf_counter() - start
+        rows.append({
+            'método': method,
+            'pandas (s)': round(pandas_seconds, 3),
+            'servicio (s)': round(service_seconds, 3),
+            'aceleración': round(pandas_seconds / service_seconds, 1) if service_seconds else np.inf,
+            'diferencia máx.': float(np.nanmax(np.abs(expected.to_numpy() - result.to_numpy())))
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara las matrices de correlación con DataFrame.corr")
+    parser.add_argument('source', nargs='?', help="CSV opcional (por defecto, datos sintéticos)")
+    parser.add_argument('--rows', type=int, default=5000, help="Filas de los datos sintéticos")
+    parser.add_argument('--columns', type=int, default=12, help="Columnas de los datos sintéticos")
+    parser.add_argument('--methods', nargs='+', default=CORRELATION_METHODS, choices=CORRELATION_METHODS)
+    args = parser.parse_args(argv)
+
+    if args.source:
+        df = pd.read_csv(args.source)
+        df = df[numeric_columns(df)]
+    else:
+        df = _benchmark_frame(args.rows, args.columns)
+    print(f"{len(df):,} filas × {df.shape[1]} columnas numéricas")
+    print(benchmark(df, args.methods).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
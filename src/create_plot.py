@@ -1,158 +1,449 @@
+import threading
+from collections import OrderedDict
+
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, leaves_list, dendrogram
+from scipy.spatial.distance import squareform
+
+from src.downsample import (DOWNSAMPLE_THRESHOLD, downsample_lines, stratified_sample, bin_2d, box_summary,
+                            violin_summary)
+from src.stats import frame_fingerprint
+from src.correlation import correlation_matrix
+
+# Máximo de grupos para dibujar cajas precalculadas (con más, se muestrea)
+MAX_SUMMARY_GROUPS = 200
+# Hojas que se muestran como máximo en un dendrograma (truncate_mode='lastp')
+DENDROGRAM_LEAVES = 30
+# Límites de la caché de figuras serializadas (compartida por todas las sesiones)
+FIGURE_CACHE_ENTRIES = 32
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Configuración del tema oscuro para los gráficos (se construye una sola vez)
+DARK_TEMPLATE = go.layout.Template()
+DARK_TEMPLATE.layout.plot_bgcolor = '#1e1e1e'
+DARK_TEMPLATE.layout.paper_bgcolor = '#1e1e1e'
+DARK_TEMPLATE.layout.font.color = '#ffffff'
+DARK_TEMPLATE.layout.xaxis.gridcolor = '#333333'
+DARK_TEMPLATE.layout.yaxis.gridcolor = '#333333'
+DARK_TEMPLATE.layout.xaxis.linecolor = '#444444'
+DARK_TEMPLATE.layout.yaxis.linecolor = '#444444'
+
+# Diseño general con tema oscuro que se aplica a todos los gráficos
+DARK_AXIS = dict(
+    gridcolor='#333333',
+    linecolor='#444444',
+    zerolinecolor='#444444',
+    title_font=dict(color='#ffffff'),
+    tickfont=dict(color='#ffffff')
+)
+DARK_LAYOUT = dict(
+    template=DARK_TEMPLATE,
+    plot_bgcolor='#1e1e1e',
+    paper_bgcolor='#1e1e1e',
+    font=dict(color='#ffffff'),
+    xaxis=DARK_AXIS,
+    yaxis=DARK_AXIS,
+    margin=dict(t=50, l=50, r=50, b=50),
+    hoverlabel=dict(
+        bgcolor='#2b2b2b',
+        font_color='#ffffff'
+    )
+)
+
+# Paleta de colores para tema oscuro
+DEFAULT_COLORS = ['#00ff00', '#00ccff', '#ff3366', '#ffcc00', '#9933ff', '#ff9933', '#33ff33', '#ff99cc']
+HEATMAP_COLORS = ['#053061', '#2166ac', '#4393c3', '#92c5de', '#d1e5f0', '#f7f7f7', '#fddbc7', '#f4a582', '#d6604d', '#b2182b', '#67001f']
+BUBBLE_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+# Descripción que se muestra sobre cada tipo de gráfico
+PLOT_DESCRIPTIONS = {
+    "Gráfico de Barras": ("🔹 El gráfico de barras muestra la comparación de valores entre diferentes categorías. "
+        "Si no se indica la columna Y, se genera un gráfico de frecuencias de la columna categórica."),
+    "Gráfico Circular": ("🔸 El gráfico circular (pie chart) muestra la proporción de cada categoría en relación al total. "
+        "Utiliza los valores de la Columna Categórica (X) para agrupar y contar frecuencias."),
+    "Heatmap": ("🟠 El heatmap muestra una matriz de correlación entre columnas numéricas. "
+        "Se requiere al menos 2 columnas numéricas en el DataFrame para generar este gráfico."),
+    "Violin Plot": ("🟣 El gráfico violin combina un box plot y una distribución de datos. "
+        "Columna Categórica (X) define las categorías, Columna Numérica (Y) representa los valores numéricos."),
+    "Box Plot": ("🟢 El box plot (diagrama de caja) muestra la distribución de los datos numéricos de Columna Numérica (Y) "
+        "agrupados por categorías de Columna Categórica (X). Incluye mediana, cuartiles y posibles valores atípicos."),
+    "Área": ("🔵 El gráfico de área es útil para visualizar tendencias acumulativas en el tiempo o por categorías. "
+        "Se requiere Columna Categórica (X) como eje base y Columna Numérica (Y) como valores numéricos."),
+    "Burbujas": ("🟡 El gráfico de burbujas es una variante del scatter plot. "
+        "Columna Categórica (X) y Columna Numérica (Y) definen la posición, y se define el color de las burbujas.")
+}
+
+
+# Caché LRU de figuras serializadas en JSON
+class FigureCache:
+    """Guarda cada figura como JSON bajo una huella de los datos y los argumentos.
+
+    Se guarda el JSON y no el objeto para que ninguna sesión pueda modificar la
+    figura de otra; deserializar es mucho más barato que volver a construirla.
+    Se descartan las menos usadas al superar el número de entradas o de bytes.
+    """
+
+    def __init__(self, max_entries=FIGURE_CACHE_ENTRIES, max_bytes=FIGURE_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Compartida por los hilos de todas las sesiones de Streamlit
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        # Deserializar fuera del candado: el JSON es inmutable
+        return pio.from_json(payload)
+
+    def put(self, key, fig):
+        payload = fig.to_json()
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total * 100 if total else 0.0
+            }
+
+
+FIGURE_CACHE = FigureCache()
+
+
+# Función para consultar los contadores de la caché de figuras
+def figure_cache_stats():
+    return FIGURE_CACHE.stats()
+
+
+# Función para elegir las columnas por las que estratificar (las continuas no sirven como grupo)
+def _strata(df, *columns):
+    strata = [col for col in columns if col is not None and not pd.api.types.is_float_dtype(df[col])]
+    return strata or None
+
+
+# Función para contar los grupos de un box/violín precalculado (None si Y no es numérica)
+def count_summary_groups(df, x_col, y_col, color_col):
+    if y_col is None or not pd.api.types.is_numeric_dtype(df[y_col]):
+        return None
+    keys = [col for col in (x_col, color_col) if col is not None]
+    return df.groupby(keys, observed=True).ngroups if keys else 1
+
+
+# Función para dibujar cajas a partir de cuartiles calculados en el servidor
+def summary_box_figure(df, x_col, y_col, color_col, colors, title, notched=True):
+    fig = go.Figure()
+    summary = box_summary(df, y_col, by=[x_col, color_col])
+    groups = [(None, summary)] if color_col is None else list(summary.groupby(color_col, observed=True, sort=False))
+    for i, (name, part) in enumerate(groups):
+        fig.add_trace(go.Box(
+            x=part[x_col] if x_col is not None else None,
+            q1=part['q1'], median=part['median'], q3=part['q3'],
+            lowerfence=part['lowerfence'], upperfence=part['upperfence'],
+            mean=part['mean'], sd=part['sd'], notchspan=part['notchspan'], notched=notched,
+            name=str(name) if name is not None else y_col,
+            marker_color=colors[i % len(colors)]
+        ))
+    fig.update_layout(title=title, xaxis_title=x_col, yaxis_title=y_col, boxmode='group')
+    return fig
+
+
+# Función para dibujar violines a partir de densidades calculadas en el servidor
+def summary_violin_figure(df, x_col, y_col, color_col, colors, title):
+    summary, grid, density = violin_summary(df, y_col, by=[x_col, color_col])
+    categories = list(pd.unique(summary[x_col])) if x_col is not None else [y_col]
+    color_values = list(pd.unique(summary[color_col])) if color_col is not None else [None]
+    # Como en violinmode='group': cada color ocupa una franja dentro de su categoría
+    slot = 0.8 / len(color_values)
+    half_width = slot * 0.45
+
+    fig = go.Figure()
+    in_legend = set()
+    for i, values in enumerate(summary.to_dict('records')):
+        category = values[x_col] if x_col is not None else y_col
+        color_value = values[color_col] if color_col is not None else None
+        slot_index = color_values.index(color_value)
+        center = categories.index(category) - 0.4 + slot * (slot_index + 0.5)
+        width = density[i] / density[i].max() * half_width if density[i].max() > 0 else density[i]
+        # Solo la parte de la rejilla con densidad apreciable
+        visible = width > half_width * 1e-3
+        y = grid[visible]
+        color = colors[slot_index % len(colors)]
+        name = str(color_value) if color_value is not None else y_col
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([center + width[visible], (center - width[visible])[::-1]]),
+            y=np.concatenate([y, y[::-1]]),
+            fill='toself', mode='lines', line=dict(color=color, width=1),
+            name=name, legendgroup=name, showlegend=name not in in_legend, hoverinfo='skip'
+        ))
+        in_legend.add(name)
+        # Caja interior: rango intercuartílico y mediana
+        fig.add_trace(go.Scatter(
+            x=[center, center], y=[values['q1'], values['q3']], mode='lines',
+            line=dict(color=color, width=6), legendgroup=name, showlegend=False,
+            hovertext=f"{category}: Q1={values['q1']:.2f}, mediana={values['median']:.2f}, Q3={values['q3']:.2f}, n={values['n']}",
+            hoverinfo='text'
+        ))
+        fig.add_trace(go.Scatter(
+            x=[center], y=[values['median']], mode='markers', marker=dict(color='white', size=6),
+            legendgroup=name, showlegend=False, hoverinfo='skip'
+        ))
+    fig.update_layout(title=title, xaxis=dict(tickmode='array', tickvals=list(range(len(categories))),
+                                              ticktext=[str(c) for c in categories]),
+                      xaxis_title=x_col, yaxis_title=y_col)
+    return fig
+
+
+# Función para ordenar una matriz de correlación agrupando variables parecidas
+def cluster_order(matrix):
+    """Orden de las hojas de un clustering jerárquico (average) con distancia 1 - |r|"""
+    if len(matrix) < 3:
+        return np.arange(len(matrix))
+    distance = 1 - np.abs(np.nan_to_num(matrix.to_numpy(dtype=np.float64), nan=0.0))
+    distance = (distance + distance.T) / 2
+    np.fill_diagonal(distance, 0.0)
+    return leaves_list(linkage(squareform(np.clip(distance, 0, None), checks=False), method='average'))
+
+
+# Función para dibujar una matriz de correlación como una sola traza
+def correlation_heatmap(matrix, title, show_values=False, cluster=False, label_threshold=0.0):
+    """Los valores van en una matriz de texto de la propia traza (``texttemplate``), no en
+    una anotación por celda; solo se etiquetan las celdas con |r| >= ``label_threshold``."""
+    if cluster:
+        order = cluster_order(matrix)
+        matrix = matrix.iloc[order, order]
+    values = matrix.to_numpy(dtype=np.float64)
+    labels = [str(col) for col in matrix.columns]
+    trace = dict(z=values, x=labels, y=labels, colorscale=HEATMAP_COLORS, zmin=-1, zmax=1,
+                 hovertemplate='%{y} · %{x}: %{z:.3f}<extra></extra>')
+    if show_values:
+        with np.errstate(invalid='ignore'):
+            labelled = np.abs(values) >= label_threshold
+        trace['text'] = np.where(labelled, np.char.mod('%.2f', np.round(values, 2)), '')
+        trace['texttemplate'] = '%{text}'
+        trace['textfont'] = dict(color='white', size=10 if len(labels) <= 30 else 7)
+    fig = go.Figure(go.Heatmap(**trace))
+    fig.update_layout(title=title)
+    fig.update_yaxes(autorange='reversed')
+    return fig
+
+
+# Función para dibujar un dendrograma como una sola traza
+def dendrogram_figure(Z, leaf_sizes=None, p=DENDROGRAM_LEAVES, title='Dendrograma del Clustering Jerárquico'):
+    """Todos los enlaces van en un único ``go.Scatter`` separados por ``None`` y el árbol se
+    trunca a las ``p`` últimas fusiones; cada hoja indica cuántas filas contiene."""
+    n_leaves = len(Z) + 1
+    tree = dendrogram(Z, truncate_mode='lastp', p=p, no_plot=True)
+    x, y = [], []
+    for xs, ys in zip(tree['icoord'], tree['dcoord']):
+        x.extend(xs + [None])
+        y.extend(ys + [None])
+
+    # Filas de cada nodo: hojas con su peso y cada fusión suma las de sus hijos
+    sizes = np.ones(2 * n_leaves - 1, dtype=np.int64)
+    if leaf_sizes is not None:
+        sizes[:n_leaves] = leaf_sizes
+    for i, (left, right) in enumerate(Z[:, :2].astype(np.intp)):
+        sizes[n_leaves + i] = sizes[left] + sizes[right]
+
+    fig = go.Figure(go.Scatter(x=x, y=y, mode='lines', line=dict(color=DEFAULT_COLORS[1], width=1.5),
+                               hoverinfo='skip'))
+    fig.update_layout(title=title, showlegend=False, yaxis_title='Distancia (Ward)',
+                      xaxis=dict(tickmode='array', tickvals=[5 + 10 * i for i in range(len(tree['leaves']))],
+                                 ticktext=[f"{sizes[leaf]:,}" for leaf in tree['leaves']], title='Filas por rama'))
+    return fig
+
 
 # Función para crear gráficos
-def create_plot(df, plot_type, x_col, y_col=None, color_col=None, marker_size=10, orientation='v', show_values=False):
+def create_plot(df, plot_type, x_col, y_col=None, color_col=None, marker_size=10, orientation='v', show_values=False,
+                max_points=DOWNSAMPLE_THRESHOLD, precomputed=False, cluster=False, label_threshold=0.0):
+    """Crea el gráfico indicado; con más de ``max_points`` filas reduce los datos enviados
+    al navegador (0 o None desactiva la reducción) y lo indica en el subtítulo.
+    Con ``precomputed``, box y violín usan siempre estadísticas calculadas en el servidor.
+    En el heatmap, ``cluster`` reordena las variables por similitud y ``label_threshold``
+    limita las etiquetas a las correlaciones con |r| mayor o igual.
+    Si los mismos datos y argumentos ya se dibujaron, la figura sale de ``FIGURE_CACHE``."""
+    if plot_type in PLOT_DESCRIPTIONS:
+        st.info(PLOT_DESCRIPTIONS[plot_type])
     try:
-        # Configuración del tema oscuro para los gráficos
-        dark_template = go.layout.Template()
-        dark_template.layout.plot_bgcolor = '#1e1e1e'
-        dark_template.layout.paper_bgcolor = '#1e1e1e'
-        dark_template.layout.font.color = '#ffffff'
-        dark_template.layout.xaxis.gridcolor = '#333333'
-        dark_template.layout.yaxis.gridcolor = '#333333'
-        dark_template.layout.xaxis.linecolor = '#444444'
-        dark_template.layout.yaxis.linecolor = '#444444'
-        
-        # Paleta de colores para tema oscuro
-        default_colors = ['#00ff00', '#00ccff', '#ff3366', '#ffcc00', '#9933ff', '#ff9933', '#33ff33', '#ff99cc']
-        if plot_type == "Gráfico de Barras":
-            st.info("🔹 El gráfico de barras muestra la comparación de valores entre diferentes categorías. "
-            "Si no se indica la columna Y, se genera un gráfico de frecuencias de la columna categórica.")
-            if y_col:
-                fig = px.bar(df, x=x_col, y=y_col, color=color_col,
-                            orientation=orientation,
-                            color_discrete_sequence=default_colors,
-                            title=f"Gráfico de Barras: {x_col} vs {y_col}")
-            else:
-                value_counts = df[x_col].value_counts()
-                if orientation == 'h':
-                    fig = px.bar(x=value_counts.values, y=value_counts.index, orientation='h',
-                                color_discrete_sequence=default_colors,
-                                title=f"Distribución de {x_col}")
-                else:
-                    fig = px.bar(x=value_counts.index, y=value_counts.values,
-                                color_discrete_sequence=default_colors,
-                                title=f"Distribución de {x_col}")
-                fig.update_xaxis(title=x_col)
-                fig.update_yaxis(title="Frecuencia")
-            
-            if show_values:
-                fig.update_traces(texttemplate='%{value}', textposition='outside')
-        
-        elif plot_type == "Gráfico Circular":
-            st.info("🔸 El gráfico circular (pie chart) muestra la proporción de cada categoría en relación al total. "
-            "Utiliza los valores de la Columna Categórica (X) para agrupar y contar frecuencias.")
+        # Solo las columnas que usa el gráfico forman parte de la huella
+        if plot_type == "Heatmap":
+            used = list(df.select_dtypes(include=[np.number]).columns)
+        else:
+            used = list(dict.fromkeys(col for col in (x_col, y_col, color_col) if col is not None))
+        key = (frame_fingerprint(df, used), plot_type, x_col, y_col, color_col, marker_size, orientation,
+               show_values, max_points, precomputed, cluster, label_threshold)
+        fig = FIGURE_CACHE.get(key)
+        if fig is None:
+            fig = _build_plot(df, plot_type, x_col, y_col, color_col, marker_size, orientation, show_values,
+                              max_points, precomputed, cluster, label_threshold)
+            if fig is not None:
+                FIGURE_CACHE.put(key, fig)
+        return fig
+    except Exception as e:
+        st.error(f"Error al crear el gráfico: {str(e)}")
+        return None
+
+
+# Función para construir la figura (sin caché)
+def _build_plot(df, plot_type, x_col, y_col, color_col, marker_size, orientation, show_values, max_points,
+                precomputed, cluster=False, label_threshold=0.0):
+    total_rows = len(df)
+    reduce_data = bool(max_points) and total_rows > max_points
+    reduction_note = None
+
+    if plot_type == "Gráfico de Barras":
+        if y_col:
+            fig = px.bar(df, x=x_col, y=y_col, color=color_col,
+                        orientation=orientation,
+                        color_discrete_sequence=DEFAULT_COLORS,
+                        title=f"Gráfico de Barras: {x_col} vs {y_col}")
+        else:
             value_counts = df[x_col].value_counts()
-            fig = px.pie(values=value_counts.values, names=value_counts.index,
-                        color_discrete_sequence=default_colors,
-                        title=f"Distribución de {x_col}")
-            if show_values:
-                fig.update_traces(textinfo='percent+label+value')
-        
-        elif plot_type == "Heatmap":
-            st.info("🟠 El heatmap muestra una matriz de correlación entre columnas numéricas. "
-            "Se requiere al menos 2 columnas numéricas en el DataFrame para generar este gráfico.")
-            numeric_df = df.select_dtypes(include=[np.number])
-            if len(numeric_df.columns) > 1:
-                correlation_matrix = numeric_df.corr()
-                color_palette = ['#053061', '#2166ac', '#4393c3', '#92c5de', '#d1e5f0', '#f7f7f7', '#fddbc7', '#f4a582', '#d6604d', '#b2182b', '#67001f']
-                fig = px.imshow(correlation_matrix,
-                        color_continuous_scale=color_palette,
-                        aspect="auto",
-                        title="Matriz de Correlación (Heatmap)")
-                if show_values:
-                    for i in range(len(correlation_matrix)):
-                        for j in range(len(correlation_matrix.columns)):
-                            fig.add_annotation(
-                                x=correlation_matrix.columns[j],
-                                y=correlation_matrix.index[i],
-                                text=str(round(correlation_matrix.iloc[i, j], 2)),
-                                showarrow=False,
-                                font=dict(color='white')
-                            )
+            if orientation == 'h':
+                fig = px.bar(x=value_counts.values, y=value_counts.index, orientation='h',
+                            color_discrete_sequence=DEFAULT_COLORS,
+                            title=f"Distribución de {x_col}")
             else:
-                st.error("Se necesitan al menos 2 columnas numéricas para crear un heatmap")
-                return None
+                fig = px.bar(x=value_counts.index, y=value_counts.values,
+                            color_discrete_sequence=DEFAULT_COLORS,
+                            title=f"Distribución de {x_col}")
+            fig.update_xaxis(title=x_col)
+            fig.update_yaxis(title="Frecuencia")
         
-        elif plot_type == "Violin Plot":
-            st.info("🟣 El gráfico violin combina un box plot y una distribución de datos. "
-            "Columna Categórica (X) define las categorías, Columna Numérica (Y) representa los valores numéricos.")
+        if show_values:
+            fig.update_traces(texttemplate='%{value}', textposition='outside')
+    
+    elif plot_type == "Gráfico Circular":
+        value_counts = df[x_col].value_counts()
+        fig = px.pie(values=value_counts.values, names=value_counts.index,
+                    color_discrete_sequence=DEFAULT_COLORS,
+                    title=f"Distribución de {x_col}")
+        if show_values:
+            fig.update_traces(textinfo='percent+label+value')
+    
+    elif plot_type == "Heatmap":
+        numeric_df = df.select_dtypes(include=[np.number])
+        if len(numeric_df.columns) > 1:
+            fig = correlation_heatmap(correlation_matrix(numeric_df), "Matriz de Correlación (Heatmap)", show_values,
+                                      cluster, label_threshold)
+        else:
+            st.error("Se necesitan al menos 2 columnas numéricas para crear un heatmap")
+            return None
+    
+    elif plot_type == "Violin Plot":
+        groups = count_summary_groups(df, x_col, y_col, color_col) if precomputed or reduce_data else None
+        if groups is not None and groups <= MAX_SUMMARY_GROUPS:
+            # Densidad y cuartiles calculados en el servidor: O(grupos) en lugar de O(filas)
+            fig = summary_violin_figure(df, x_col, y_col, color_col, DEFAULT_COLORS, f"Violin Plot: {x_col} vs {y_col}")
+            reduction_note = f"densidades precalculadas de {total_rows:,} filas en {groups} grupos"
+        else:
+            points = "all"
+            if reduce_data:
+                # Muestra estratificada por categoría: la forma de cada violín se conserva
+                df = stratified_sample(df, max_points, _strata(df, x_col, color_col))
+                points = False
+                reduction_note = f"muestra estratificada de {len(df):,} de {total_rows:,} filas"
             fig = px.violin(df, x=x_col, y=y_col, color=color_col,
-                          color_discrete_sequence=default_colors,
-                          box=True, points="all",
+                          color_discrete_sequence=DEFAULT_COLORS,
+                          box=True, points=points,
                           title=f"Violin Plot: {x_col} vs {y_col}")
-        
-        elif plot_type == "Box Plot":
-            st.info("🟢 El box plot (diagrama de caja) muestra la distribución de los datos numéricos de Columna Numérica (Y) "
-            "agrupados por categorías de Columna Categórica (X). Incluye mediana, cuartiles y posibles valores atípicos.")
+    
+    elif plot_type == "Box Plot":
+        groups = count_summary_groups(df, x_col, y_col, color_col) if precomputed or reduce_data else None
+        if groups is not None and groups <= MAX_SUMMARY_GROUPS:
+            # Solo viajan los cuartiles de cada grupo, no las filas
+            fig = summary_box_figure(df, x_col, y_col, color_col, DEFAULT_COLORS, f"Box Plot: {x_col} vs {y_col}")
+            reduction_note = f"cuartiles precalculados de {total_rows:,} filas en {groups} grupos"
+        else:
+            if reduce_data:
+                df = stratified_sample(df, max_points, _strata(df, color_col))
+                reduction_note = f"muestra de {len(df):,} de {total_rows:,} filas"
             fig = px.box(df, x=x_col, y=y_col, color=color_col,
-                        color_discrete_sequence=default_colors,
+                        color_discrete_sequence=DEFAULT_COLORS,
                         title=f"Box Plot: {x_col} vs {y_col}",
                         points="all",
                         notched=True)
-            fig.update_traces(marker=dict(size=4, opacity=0.7),
-                            line=dict(width=2),
-                            fillcolor='rgba(255,255,255,0.1)',
-                            boxmean=True)
-        
-        elif plot_type == "Área":
-            st.info("🔵 El gráfico de área es útil para visualizar tendencias acumulativas en el tiempo o por categorías. "
-            "Se requiere Columna Categórica (X) como eje base y Columna Numérica (Y) como valores numéricos.")
-            fig = px.area(df, x=x_col, y=y_col, color=color_col,
-                         color_discrete_sequence=default_colors,
-                         title=f"Gráfico de Área: {x_col} vs {y_col}")
-            if show_values:
-                fig.update_traces(texttemplate='%{y}', textposition='top')
-        
-        elif plot_type == "Burbujas":
-            st.info("🟡 El gráfico de burbujas es una variante del scatter plot. "
-            "Columna Categórica (X) y Columna Numérica (Y) definen la posición, y se define el color de las burbujas.")
+        fig.update_traces(marker=dict(size=4, opacity=0.7),
+                        line=dict(width=2),
+                        fillcolor='rgba(255,255,255,0.1)',
+                        boxmean=True)
+    
+    elif plot_type == "Área":
+        if reduce_data and y_col is not None and pd.api.types.is_numeric_dtype(df[y_col]):
+            # LTTB conserva picos y valles de cada serie
+            df = downsample_lines(df, x_col, y_col, max_points, color_col)
+            reduction_note = f"LTTB: {len(df):,} de {total_rows:,} puntos"
+        fig = px.area(df, x=x_col, y=y_col, color=color_col,
+                     color_discrete_sequence=DEFAULT_COLORS,
+                     title=f"Gráfico de Área: {x_col} vs {y_col}")
+        if show_values:
+            fig.update_traces(texttemplate='%{y}', textposition='top')
+    
+    elif plot_type == "Burbujas":
+        size_col = None
+        if reduce_data and color_col is None and y_col is not None \
+                and pd.api.types.is_numeric_dtype(df[x_col]) and pd.api.types.is_numeric_dtype(df[y_col]):
+            # Rejilla 2D: cada burbuja es una celda y su tamaño el número de filas
+            df = bin_2d(df, x_col, y_col)
+            size_col = 'count'
+            reduction_note = f"{len(df):,} celdas agregando {total_rows:,} filas (tamaño = filas por celda)"
+            marker_size = max(marker_size, 20)
+        elif reduce_data:
+            df = stratified_sample(df, max_points, _strata(df, color_col))
+            reduction_note = f"muestra estratificada de {len(df):,} de {total_rows:,} filas"
+        if size_col is None:
             size_col = color_col if color_col else [marker_size]*len(df)
-            color_palette = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-            fig = px.scatter(df, x=x_col, y=y_col,
-                            size=size_col,
-                            color=color_col,
-                            color_discrete_sequence=color_palette,
-                            size_max=marker_size,
-                            title=f"Gráfico de Burbujas: {x_col} vs {y_col}")
-            fig.update_traces(marker=dict(line=dict(width=1, color='white'),
-                                        opacity=0.7),
-                            selector=dict(mode='markers'))
-            if show_values:
-                fig.update_traces(texttemplate='(%{x}, %{y})', textposition='top center')
-        
-        # Actualizar diseño general con tema oscuro
-        fig.update_layout(
-            showlegend=True if color_col else False,
-            template=dark_template,
-            plot_bgcolor='#1e1e1e',
-            paper_bgcolor='#1e1e1e',
-            font=dict(color='#ffffff'),
-            xaxis=dict(
-                gridcolor='#333333',
-                linecolor='#444444',
-                zerolinecolor='#444444',
-                title_font=dict(color='#ffffff'),
-                tickfont=dict(color='#ffffff')
-            ),
-            yaxis=dict(
-                gridcolor='#333333',
-                linecolor='#444444',
-                zerolinecolor='#444444',
-                title_font=dict(color='#ffffff'),
-                tickfont=dict(color='#ffffff')
-            ),
-            margin=dict(t=50, l=50, r=50, b=50),
-            hoverlabel=dict(
-                bgcolor='#2b2b2b',
-                font_color='#ffffff'
-            )
-        )
-        
-        return fig
-    except Exception as e:
-        st.error(f"Error al crear el gráfico: {str(e)}")
-        return None
\ No newline at end of file
+        fig = px.scatter(df, x=x_col, y=y_col,
+                        size=size_col,
+                        color=color_col,
+                        color_discrete_sequence=BUBBLE_COLORS,
+                        size_max=marker_size,
+                        title=f"Gráfico de Burbujas: {x_col} vs {y_col}")
+        fig.update_traces(marker=dict(line=dict(width=1, color='white'),
+                                    opacity=0.7),
+                        selector=dict(mode='markers'))
+        if show_values:
+            fig.update_traces(texttemplate='(%{x}, %{y})', textposition='top center')
+    
+    # Actualizar diseño general con tema oscuro
+    fig.update_layout(showlegend=True if color_col else False, **DARK_LAYOUT)
+
+    # Indicar en el subtítulo cómo se redujeron los datos
+    if reduction_note:
+        fig.update_layout(title_text=f"{fig.layout.title.text}<br><sup>{reduction_note}</sup>", margin=dict(t=80))
+    
+    return fig
@@ -1,25 +1,291 @@
+import io
+import os
+import time
+import hashlib
+import tracemalloc
 import requests
 import pandas as pd
 
-from io import StringIO
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
-# Función para descargar archivo desde URL
-def download_csv_from_url(url, base_url=None):
+from src.cache import get_default_cache
+from src.schema import peek_header, schema_read_kwargs, is_football_data, apply_football_schema
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+REQUEST_TIMEOUT = 30
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Valores por defecto para la descarga por lotes de football-data.co.uk
+FOOTBALL_DATA_BASE_URL = 'https://www.football-data.co.uk/'
+FOOTBALL_DATA_PATTERN = 'mmz4281/{season}/{league}.csv'
+FOOTBALL_DATA_LEAGUES = ['E0', 'E1', 'E2', 'E3', 'SC0', 'SP1', 'SP2', 'D1', 'D2', 'I1', 'I2', 'F1', 'F2', 'N1', 'B1', 'P1', 'T1', 'G1']
+
+
+# Función para construir la URL completa a partir de una URL relativa
+def resolve_url(url, base_url=None):
+    if base_url and not url.startswith(('http://', 'https://')):
+        url = urljoin(base_url, url)
+    return url
+
+
+# Flujo de lectura sobre la respuesta HTTP: entrega los bytes a medida que llegan del socket
+class _ResponseStream(io.RawIOBase):
+    def __init__(self, response, chunk_size=STREAM_CHUNK_SIZE, sink=None):
+        self._chunks = response.iter_content(chunk_size=chunk_size)
+        self._pending = memoryview(b'')
+        self._sink = sink
+        self._hash = hashlib.sha256()
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            # Se calcula el hash y se copia a la caché mientras se parsea
+            self._hash.update(chunk)
+            if self._sink is not None:
+                self._sink.write(chunk)
+            self.bytes_read += len(chunk)
+            self._pending = memoryview(chunk)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+# Función para leer un CSV desde un flujo de texto, opcionalmente por bloques
+def read_csv_stream(source, chunksize=None, **read_kwargs):
+    if not chunksize:
+        return pd.read_csv(source, **read_kwargs), 1
+    chunks = list(pd.read_csv(source, chunksize=chunksize, **read_kwargs))
+    if not chunks:
+        return pd.DataFrame(), 0
+    return pd.concat(chunks, ignore_index=True), len(chunks)
+
+
+# Función para parsear un buffer binario, con el esquema de football-data si corresponde
+def _parse_buffer(buffer, encoding, chunksize=None, engine='c', use_schema=True):
+    encoding = encoding or 'utf-8'
+    columns = peek_header(buffer, encoding) if use_schema else []
+    read_kwargs = schema_read_kwargs(columns, engine)
+    if engine == 'pyarrow':
+        # pyarrow decodifica por su cuenta a partir de los bytes
+        df, chunks = read_csv_stream(buffer, None, encoding=encoding, **read_kwargs)
+    else:
+        text = io.TextIOWrapper(buffer, encoding=encoding, errors='replace', newline='')
+        df, chunks = read_csv_stream(text, chunksize, **read_kwargs)
+    if use_schema and is_football_data(df.columns):
+        df = apply_football_schema(df)
+    return df, chunks
+
+
+# Función para descargar un CSV y devolver además un informe de la carga
+def load_csv_from_url(url, base_url=None, use_cache=True, cache=None, session=None,
+                      chunksize=None, measure_memory=False, engine='c', use_schema=True):
+    """Descarga un CSV en streaming y devuelve (df, informe, error).
+
+    El cuerpo de la respuesta nunca se materializa completo en memoria: se
+    decodifica de forma incremental y se entrega directamente al parser.
+    El informe incluye origen, bytes, tiempo, throughput y memoria pico.
+    Con use_schema, los archivos de football-data se leen con tipos explícitos.
+    """
+    report = {'url': url, 'source': 'network', 'bytes': 0, 'seconds': 0.0,
+              'throughput_mb_s': None, 'peak_memory_mb': None, 'chunks': 0}
+    started = time.perf_counter()
+    tracing = measure_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    tmp_path = None
+    variant = 'schema' if use_schema else 'raw'
+    # El motor pyarrow no admite lectura por bloques
+    if chunksize:
+        engine = 'c'
     try:
         # Si la URL es relativa, construir URL completa
-        if base_url and not url.startswith(('http://', 'https://')):
-            url = urljoin(base_url, url)
-        
-        # Realizar petición
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        # Intentar leer como CSV
-        csv_content = StringIO(response.text)
-        df = pd.read_csv(csv_content)
-        return df, None
+        url = resolve_url(url, base_url)
+        report['url'] = url
+        cache = (cache or get_default_cache()) if use_cache else None
+
+        # Servir desde disco si la entrada sigue dentro del TTL
+        entry = cache.lookup(url) if cache else None
+        df = None
+        if entry and cache.is_fresh(entry):
+            df = cache.read_frame(entry, variant)
+            if df is not None:
+                cache.record_hit()
+                report['source'] = 'cache'
+
+        if df is None:
+            # Petición condicional si ya tenemos una copia local
+            headers = dict(DEFAULT_HEADERS)
+            if entry:
+                headers.update(cache.validators(entry))
+            with (session or requests).get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as response:
+                # 304: el contenido no cambió, no hace falta volver a parsear
+                if response.status_code == 304 and entry:
+                    cache.revalidate(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                    df = cache.read_frame(entry, variant)
+                    if df is None:
+                        with open(cache.content_path(entry), 'rb') as f:
+                            df, report['chunks'] = _parse_buffer(
+                                io.BufferedReader(f, STREAM_CHUNK_SIZE), entry.get('encoding'),
+                                chunksize, engine, use_schema)
+                        cache.store_file(url, None, entry['digest'], df, entry.get('etag'),
+                                         entry.get('last_modified'), entry.get('encoding'), variant)
+                    cache.record_hit()
+                    report['source'] = 'revalidated'
+                else:
+                    response.raise_for_status()
+
+                    # Intentar leer como CSV directamente desde el socket
+                    encoding = response.encoding or 'utf-8'
+                    tmp_path = cache.temp_path() if cache else None
+                    sink = open(tmp_path, 'wb') if tmp_path else None
+                    try:
+                        raw = _ResponseStream(response, sink=sink)
+                        df, report['chunks'] = _parse_buffer(io.BufferedReader(raw, STREAM_CHUNK_SIZE),
+                                                             encoding, chunksize, engine, use_schema)
+                        # Consumir lo que quede para que el hash cubra todo el cuerpo
+                        drain = bytearray(STREAM_CHUNK_SIZE)
+                        while raw.readinto(drain):
+                            pass
+                    finally:
+                        if sink:
+                            sink.close()
+                    report['bytes'] = raw.bytes_read
+
+                    if cache:
+                        cache.record_miss()
+                        cache.store_file(url, tmp_path, raw.hexdigest(), df,
+                                         etag=response.headers.get('ETag'),
+                                         last_modified=response.headers.get('Last-Modified'),
+                                         encoding=encoding, variant=variant)
+                        tmp_path = None
+
+        report['rows'] = len(df)
+        report['seconds'] = time.perf_counter() - started
+        if report['bytes'] and report['seconds'] > 0:
+            report['throughput_mb_s'] = report['bytes'] / 1024 / 1024 / report['seconds']
+        if tracing:
+            report['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        return df, report, None
     except Exception as e:
-        return None, str(e)
\ No newline at end of file
+        return None, report, str(e)
+    finally:
+        if tracing:
+            tracemalloc.stop()
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Función para descargar archivo desde URL
+def download_csv_from_url(url, base_url=None, use_cache=True, cache=None, session=None, chunksize=None,
+                          engine='c', use_schema=True):
+    df, _, error = load_csv_from_url(url, base_url, use_cache=use_cache, cache=cache, session=session,
+                                     chunksize=chunksize, engine=engine, use_schema=use_schema)
+    return df, error
+
+
+# Función para recorrer un CSV grande (ruta local o URL) por bloques sin cargarlo completo
+def iter_csv_chunks(source, base_url=None, chunksize=100_000, session=None):
+    """Genera DataFrames de como mucho ``chunksize`` filas.
+
+    Las URLs se leen en streaming desde el socket y no pasan por la caché en
+    disco: el objetivo es mantener la memoria constante con archivos de varios GB.
+    """
+    if os.path.exists(source):
+        yield from pd.read_csv(source, chunksize=chunksize, encoding_errors='replace')
+        return
+
+    url = resolve_url(source, base_url)
+    with (session or requests).get(url, headers=DEFAULT_HEADERS, timeout=REQUEST_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        raw = _ResponseStream(response)
+        text = io.TextIOWrapper(io.BufferedReader(raw, STREAM_CHUNK_SIZE), encoding=response.encoding or 'utf-8',
+                                errors='replace', newline='')
+        yield from pd.read_csv(text, chunksize=chunksize)
+
+
+# Función para obtener los códigos de temporada (ej. 2324) entre dos años de inicio
+def season_codes(first_year, last_year):
+    return [f"{year % 100:02d}{(year + 1) % 100:02d}" for year in range(int(first_year), int(last_year) + 1)]
+
+
+# Función para generar las URLs de cada combinación temporada × liga
+def build_batch_targets(seasons, leagues, pattern=FOOTBALL_DATA_PATTERN):
+    return [
+        {'Season': season, 'Div': league, 'url': pattern.format(season=season, league=league)}
+        for season in seasons
+        for league in leagues
+    ]
+
+
+# Función para crear una sesión HTTP con un pool de conexiones reutilizables
+def create_session(pool_size=8):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+# Función para descargar varios CSV en paralelo y unirlos en un solo DataFrame
+def download_many_csv(targets, base_url=FOOTBALL_DATA_BASE_URL, max_workers=8, use_cache=True,
+                      engine='c', use_schema=True):
+    """Descarga concurrentemente una lista de URLs (o de objetivos de build_batch_targets).
+
+    Devuelve (df, errores): df concatena todos los archivos descargados con las
+    columnas Season y Div; errores es una lista de (url, mensaje).
+    """
+    targets = [t if isinstance(t, dict) else {'url': t} for t in targets]
+    if not targets:
+        return None, []
+
+    workers = max(1, min(max_workers, len(targets)))
+    session = create_session(workers)
+
+    def fetch(target):
+        return target, download_csv_from_url(target['url'], base_url, use_cache=use_cache, session=session,
+                                             engine=engine, use_schema=use_schema)
+
+    frames = []
+    errors = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map conserva el orden de entrada aunque las descargas terminen desordenadas
+            for target, (df, error) in executor.map(fetch, targets):
+                if df is None:
+                    errors.append((target['url'], error))
+                    continue
+                for col in ('Season', 'Div'):
+                    if target.get(col) is not None:
+                        df[col] = target[col]
+                    elif col not in df.columns:
+                        df[col] = None
+                frames.append(df)
+    finally:
+        session.close()
+
+    if not frames:
+        return None, errors
+
+    combined = pd.concat(frames, ignore_index=True, sort=False)
+    if use_schema and is_football_data(combined.columns):
+        # Las categorías de cada archivo difieren: se unifican tras concatenar
+        combined = apply_football_schema(combined)
+    # Season y Div al inicio para identificar el origen de cada fila
+    front = ['Season', 'Div']
+    combined = combined[front + [c for c in combined.columns if c not in front]]
+    return combined, errors
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from scipy.ndimage import gaussian_filter1d
+
+# Número de filas a partir del cual se reduce lo que se envía al navegador
+DOWNSAMPLE_THRESHOLD = 5000
+# Celdas por eje en la agregación 2D de gráficos de dispersión
+SCATTER_BINS = 60
+# Puntos de la rejilla fija sobre la que se evalúa la densidad de los violines
+VIOLIN_GRID = 200
+# Solo se estratifica si cada grupo tiene de media al menos estos puntos en la muestra
+STRATUM_POINTS = 10
+
+
+# Función para convertir el eje X en números (fechas y categorías incluidas)
+def _numeric_axis(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=np.float64)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    return np.arange(len(values), dtype=np.float64)
+
+
+# Función para elegir los índices de una serie con Largest-Triangle-Three-Buckets
+def lttb_indices(x, y, n_out):
+    """Conserva picos y valles: en cada cubo elige el punto que forma el triángulo más grande"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Punto medio del cubo siguiente (el último cubo es solo el último punto)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+# Función para reducir una serie (línea o área), por grupo de color si lo hay
+def downsample_lines(df, x_col, y_col, n_out, group_col=None):
+    df = df.dropna(subset=[y_col]).sort_values(x_col)
+    groups = [df] if group_col is None else [group for _, group in df.groupby(group_col, observed=True, sort=False)]
+    per_group = max(3, n_out // max(len(groups), 1))
+    parts = []
+    for group in groups:
+        x = _numeric_axis(group[x_col])
+        y = group[y_col].to_numpy(dtype=np.float64)
+        parts.append(group.iloc[lttb_indices(x, y, per_group)])
+    return pd.concat(parts) if parts else df
+
+
+# Función para tomar una muestra que conserva la proporción de cada grupo
+def stratified_sample(df, n_out, group_col=None, seed=0):
+    """Nunca devuelve más de ``n_out`` filas. Con demasiados grupos (p. ej. una columna casi
+    única) no se puede garantizar una fila por grupo y se toma una muestra simple."""
+    if len(df) <= n_out:
+        return df
+    if group_col is not None:
+        n_groups = df.groupby(group_col, observed=True, sort=False).ngroups
+        if n_groups * STRATUM_POINTS > n_out:
+            group_col = None
+    if group_col is None:
+        return df.sample(n=n_out, random_state=seed).sort_index()
+    # Cuota por grupo redondeada hacia abajo y al menos una fila, para que ninguna categoría
+    # desaparezca del gráfico; reservar una fila por grupo mantiene el total <= n_out
+    shuffled = df.sample(frac=1, random_state=seed)
+    grouped = shuffled.groupby(group_col, observed=True, sort=False)
+    quota = np.maximum(1, np.floor(grouped.transform('size') * ((n_out - n_groups) / len(df))))
+    return shuffled[grouped.cumcount() < quota].sort_index()
+
+
+# Función para agregar un diagrama de dispersión en una rejilla 2D (centro de celda + conteo)
+def bin_2d(df, x_col, y_col, bins=SCATTER_BINS):
+    data = df[[x_col, y_col]].dropna()
+    counts, x_edges, y_edges = np.histogram2d(data[x_col].to_numpy(dtype=np.float64),
+                                              data[y_col].to_numpy(dtype=np.float64), bins=bins)
+    x_index, y_index = np.nonzero(counts)
+    return pd.DataFrame({
+        x_col: (x_edges[x_index] + x_edges[x_index + 1]) / 2,
+        y_col: (y_edges[y_index] + y_edges[y_index + 1]) / 2,
+        'count': counts[x_index, y_index].astype(np.int64)
+    })
+
+
+# Función para resumir una columna numérica por grupos (cuartiles, bigotes y media)
+def box_summary(df, y_col, by=None):
+    """Devuelve una fila por grupo con q1, median, q3, lowerfence, upperfence, mean, sd, notchspan y n"""
+    data = df.dropna(subset=[y_col])
+    keys = [col for col in (by or []) if col is not None]
+    if not keys:
+        data = data.assign(_all='')
+        keys = ['_all']
+    grouped = data.groupby(keys, observed=True)[y_col]
+    summary = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    summary.columns = ['q1', 'median', 'q3']
+    summary['mean'] = grouped.mean()
+    summary['sd'] = grouped.std()
+    summary['n'] = grouped.size()
+    # Muesca: intervalo aproximado del 95% para la mediana
+    summary['notchspan'] = 1.57 * (summary['q3'] - summary['q1']) / np.sqrt(summary['n'])
+
+    # Bigotes de Tukey: el valor más extremo dentro de 1.5·IQR de cada grupo
+    iqr = summary['q3'] - summary['q1']
+    limits = pd.DataFrame({'low': summary['q1'] - 1.5 * iqr, 'high': summary['q3'] + 1.5 * iqr})
+    bounds = data[keys].join(limits, on=keys)
+    values = data[y_col]
+    summary['lowerfence'] = values.where(values >= bounds['low']).groupby([data[k] for k in keys], observed=True).min()
+    summary['upperfence'] = values.where(values <= bounds['high']).groupby([data[k] for k in keys], observed=True).max()
+    return summary.reset_index()
+
+
+# Función para estimar la densidad de cada grupo sobre una rejilla común
+def violin_summary(df, y_col, by=None, grid_points=VIOLIN_GRID):
+    """Devuelve (resumen de box_summary, rejilla, densidades) con una fila de densidad por grupo.
+
+    Todas las filas se cuentan en un único histograma 2D (grupo × celda) y cada
+    grupo se suaviza con un núcleo gaussiano de ancho de banda de Scott.
+    """
+    summary = box_summary(df, y_col, by)
+    data = df.dropna(subset=[y_col])
+    keys = [col for col in (by or []) if col is not None]
+    codes = data.groupby(keys, observed=True).ngroup().to_numpy() if keys else np.zeros(len(data), dtype=np.intp)
+    values = data[y_col].to_numpy(dtype=np.float64)
+
+    low, high = values.min(), values.max()
+    padding = (high - low) * 0.05 or 0.5
+    edges = np.linspace(low - padding, high + padding, grid_points + 1)
+    grid = (edges[:-1] + edges[1:]) / 2
+    bin_width = edges[1] - edges[0]
+    counts, _, _ = np.histogram2d(codes, values, bins=[np.arange(len(summary) + 1) - 0.5, edges])
+
+    bandwidth = 1.06 * summary['sd'].fillna(0).to_numpy() * summary['n'].to_numpy() ** (-1 / 5)
+    density = np.empty_like(counts)
+    for i, row in enumerate(counts):
+        sigma = max(bandwidth[i] / bin_width, 1.0)
+        density[i] = gaussian_filter1d(row, sigma, mode='constant') / (row.sum() * bin_width)
+    return summary, grid, density
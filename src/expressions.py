@@ -0,0 +1,162 @@
+import re
+import ast
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Funciones permitidas en las fórmulas (todas vectorizadas con NumPy)
+ALLOWED_FUNCTIONS = {
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'log1p': np.log1p,
+    'round': np.round,
+    'floor': np.floor,
+    'ceil': np.ceil,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+    'where': np.where,
+    'clip': np.clip
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Name, ast.Load, ast.Constant, ast.Call,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Invert, ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE
+)
+
+# Los nombres de columna con caracteres especiales se escriben entre comillas invertidas: `B365>2.5`
+BACKTICK_PATTERN = re.compile(r'`([^`]+)`')
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+# Función para sustituir `columnas con espacios` por identificadores válidos
+def _replace_backticks(expression):
+    aliases = {}
+
+    def alias(match):
+        name = f"__col_{len(aliases)}__"
+        aliases[name] = match.group(1)
+        return name
+
+    return BACKTICK_PATTERN.sub(alias, expression), aliases
+
+
+# Función para saber si una subexpresión usa alguna columna (los nombres de función no cuentan)
+def _references_columns(node):
+    functions = {id(child.func) for child in ast.walk(node) if isinstance(child, ast.Call)}
+    return any(isinstance(child, ast.Name) and id(child) not in functions for child in ast.walk(node))
+
+
+# Función para validar el árbol sintáctico contra la lista blanca
+def _validate(tree):
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ExpressionError(f"Elemento no permitido en la fórmula: {type(node).__name__}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in ALLOWED_FUNCTIONS:
+                raise ExpressionError("Solo se permiten las funciones: " + ", ".join(sorted(ALLOWED_FUNCTIONS)))
+            if node.keywords:
+                raise ExpressionError("Las funciones no admiten argumentos con nombre")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str, bool)):
+            raise ExpressionError(f"Constante no permitida: {node.value!r}")
+        if isinstance(node, ast.Compare):
+            for child in [node.left] + node.comparators:
+                child.in_comparison = True
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and not getattr(node, 'in_comparison', False):
+            # Texto solo en comparaciones: evita cosas como 'a' * 10**9
+            raise ExpressionError("Los textos solo pueden usarse en comparaciones")
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+            exponent, base = node.right, node.left
+            if not _references_columns(exponent):
+                if not isinstance(exponent, ast.Constant) or abs(exponent.value) > 64:
+                    raise ExpressionError("Exponente constante demasiado grande o complejo")
+            # Con una base constante el resultado es un entero de Python sin límite: ((10**64)**64)**64...
+            if not _references_columns(base):
+                if isinstance(base, ast.UnaryOp):
+                    base = base.operand
+                if not isinstance(base, ast.Constant):
+                    raise ExpressionError("La base de una potencia constante debe ser un número")
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression):
+    """Valida y compila una fórmula; devuelve (código, columnas referenciadas)"""
+    source, aliases = _replace_backticks(expression.strip())
+    try:
+        tree = ast.parse(source, mode='eval')
+    except SyntaxError as e:
+        raise ExpressionError(f"Fórmula inválida: {e.msg}") from None
+    _validate(tree)
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            # Los nombres usados como función no son columnas
+            names.add(node.id)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            names.discard(node.func.id)
+    columns = tuple(sorted((name, aliases.get(name, name)) for name in names))
+    return compile(tree, '<fórmula>', 'eval'), columns
+
+
+# Función para ampliar columnas enteras pequeñas (int8/int16 tras optimizar memoria)
+def _widen(series):
+    """Con NumPy 2 ``HS * HST`` en int8 desborda sin avisar; se opera en int64/float64"""
+    dtype = series.dtype
+    if not pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype) or dtype.itemsize >= 8:
+        return series
+    return series.astype('Int64' if isinstance(dtype, pd.api.extensions.ExtensionDtype) else np.int64)
+
+
+# Función para evaluar una fórmula sobre las columnas de un DataFrame
+def evaluate_expression(df, expression):
+    code, columns = compile_expression(expression)
+    namespace = dict(ALLOWED_FUNCTIONS)
+    for identifier, column in columns:
+        if column not in df.columns:
+            raise ExpressionError(f"Columna no encontrada: {column}")
+        # Solo se accede a las columnas que aparecen en la fórmula
+        namespace[identifier] = _widen(df[column])
+    result = eval(code, {"__builtins__": {}}, namespace)
+    if np.isscalar(result):
+        return pd.Series(result, index=df.index)
+    return pd.Series(result, index=df.index) if not isinstance(result, pd.Series) else result
+
+
+# Función para leer varias definiciones "nombre = fórmula" (una por línea)
+def parse_assignments(text):
+    definitions = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        # Se busca un "=" que no forme parte de ==, <=, >= o !=
+        match = re.match(r'^(`[^`]+`|[^=<>!]+?)\s*=(?!=)\s*(.+)$', line)
+        if not match:
+            raise ExpressionError(f"Línea inválida (usa nombre = fórmula): {line}")
+        name = match.group(1).strip().strip('`')
+        definitions[name] = match.group(2)
+    return definitions
+
+
+# Función para calcular varias columnas en una sola pasada
+def evaluate_many(df, definitions):
+    """Evalúa {nombre: fórmula} en orden; cada fórmula puede usar las columnas anteriores"""
+    results = {}
+    view = df
+    for name, expression in definitions.items():
+        code, columns = compile_expression(expression)
+        if any(column in results for _, column in columns):
+            # Solo se crea una vista con las columnas nuevas si alguna fórmula las usa
+            view = df.assign(**results)
+        results[name] = evaluate_expression(view, expression)
+    return results
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.team_form import FORM_WINDOW, match_dates, team_form
+
+RESULTS = ['H', 'D', 'A']
+# Casas cuyas cuotas 1X2 se promedian para la probabilidad implícita del mercado
+ODDS_PREFIXES = ['Avg', 'B365', 'PS', 'BW', 'IW', 'WH', 'VC', 'Max']
+MIN_TRAIN_SEASONS = 3
+# Los códigos de temporada con año inicial >= SEASON_PIVOT son del siglo XX ('9394' es 1993)
+SEASON_PIVOT = 50
+RANDOM_STATE = 42
+
+# Clasificadores disponibles para el resultado (FTR)
+CLASSIFIERS = {
+    'Regresión logística': make_pipeline(SimpleImputer(), StandardScaler(), LogisticRegression(C=1.0, max_iter=500)),
+    'Gradient Boosting': HistGradientBoostingClassifier(max_iter=150, learning_rate=0.05, max_leaf_nodes=15,
+                                                        random_state=RANDOM_STATE)
+}
+
+
+# Función para obtener la temporada de cada partido (columna Season o, si no existe, a partir de la fecha)
+def match_seasons(df, dates=None):
+    if 'Season' in df.columns and df['Season'].notna().all():
+        return df['Season'].astype(str)
+    dates = match_dates(df) if dates is None else dates
+    # Las temporadas empiezan en julio: 2023-08 y 2024-05 son la 2324
+    start = dates.dt.year - (dates.dt.month < 7)
+    return (start % 100).map('{:02.0f}'.format) + ((start + 1) % 100).map('{:02.0f}'.format)
+
+
+# Función para convertir códigos de temporada ('9394', '0001') en su año de inicio, que sí se puede ordenar
+def season_start_year(seasons):
+    start = pd.to_numeric(pd.Series(np.asarray(seasons, dtype=str)).str[:2], errors='coerce').to_numpy()
+    return np.where(start >= SEASON_PIVOT, 1900 + start, 2000 + start)
+
+
+# Función para calcular la probabilidad implícita del mercado (promedio de casas, sin margen)
+def market_probabilities(df):
+    implied = []
+    for prefix in ODDS_PREFIXES:
+        columns = [f'{prefix}{result}' for result in RESULTS]
+        if all(col in df.columns for col in columns):
+            inverse = 1.0 / df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            with np.errstate(invalid='ignore'):
+                implied.append(inverse / inverse.sum(axis=1, keepdims=True))
+    if not implied:
+        return pd.DataFrame(np.nan, index=df.index, columns=[f'Mercado {r}' for r in RESULTS])
+    # Media de las casas disponibles en cada partido (las filas sin ninguna quedan nulas)
+    stacked = np.stack(implied)
+    available = (~np.isnan(stacked)).sum(axis=0)
+    average = np.where(available > 0, np.nansum(stacked, axis=0) / np.maximum(available, 1), np.nan)
+    return pd.DataFrame(average, index=df.index, columns=[f'Mercado {r}' for r in RESULTS])
+
+
+# Función para generar las variables de cada partido a partir de HomeTeam, AwayTeam, Date y cuotas
+def match_features(df, window=FORM_WINDOW):
+    """La forma sale de ``team_form`` (tabla larga, sin bucles por equipo); cada partido solo
+    ve partidos anteriores, así que no hay fuga de información."""
+    form = team_form(df, (window,))
+    per_team = [column for column in (f'{stat} ({window})' for stat in ('Puntos', 'GF', 'GA', 'xG', 'xGA'))
+                if column in form.columns]
+    per_team += ['Racha victorias', 'Racha sin perder', 'Racha derrotas', 'Descanso (días)']
+    home = form[form['Home']].set_index('Match')[per_team].add_prefix('Local ')
+    away = form[~form['Home']].set_index('Match')[per_team].add_prefix('Visitante ')
+    features = pd.concat([market_probabilities(df), home.reindex(df.index), away.reindex(df.index)], axis=1)
+    features['Diferencia forma'] = features[f'Local Puntos ({window})'] - features[f'Visitante Puntos ({window})']
+    features['Diferencia descanso'] = features['Local Descanso (días)'] - features['Visitante Descanso (días)']
+    return features
+
+
+# Función para calcular el log-loss multiclase con las probabilidades en el orden de ``classes``
+def log_loss_score(y_true, probabilities, classes=RESULTS, eps=1e-15):
+    positions = pd.Index(classes).get_indexer(np.asarray(y_true))
+    chosen = probabilities[np.arange(len(positions)), positions]
+    return float(-np.log(np.clip(chosen, eps, 1.0)).mean())
+
+
+# Función para calcular el Brier multiclase (suma de errores cuadráticos por partido, media)
+def brier_score(y_true, probabilities, classes=RESULTS):
+    onehot = (np.asarray(y_true)[:, None] == np.asarray(classes)[None, :]).astype(np.float64)
+    return float(((probabilities - onehot) ** 2).sum(axis=1).mean())
+
+
+# Función para entrenar con las temporadas anteriores y evaluar en una temporada
+def _evaluate_season(name, X, y, years, season, year):
+    train, test = years < year, years == year
+    model = clone(CLASSIFIERS[name]).fit(X[train], y[train])
+    return season, int(train.sum()), test, _ordered_proba(model, X[test])
+
+
+# Función para devolver probabilidades en el orden H, D, A aunque falte alguna clase
+def _ordered_proba(model, X):
+    raw = model.predict_proba(X)
+    probabilities = np.zeros((len(X), len(RESULTS)))
+    for i, label in enumerate(model.classes_):
+        probabilities[:, RESULTS.index(label)] = raw[:, i]
+    return probabilities
+
+
+# Función para validar un clasificador de FTR temporada a temporada (walk-forward)
+def walk_forward_validation(df, model='Regresión logística', min_train_seasons=MIN_TRAIN_SEASONS,
+                            window=FORM_WINDOW, n_jobs=-1):
+    """Cada temporada se predice con un modelo entrenado solo con las anteriores; las
+    temporadas se entrenan en paralelo con joblib. Devuelve métricas por temporada
+    (log-loss, Brier y acierto, junto a las del mercado) y las predicciones."""
+    features = match_features(df, window)
+    played = df['FTR'].astype(object).isin(RESULTS).to_numpy()
+    seasons = match_seasons(df).to_numpy()
+    X = features.to_numpy(dtype=np.float64)[played]
+    y = df['FTR'].astype(object).to_numpy()[played]
+    seasons = seasons[played]
+    index = df.index[played]
+    # Las temporadas se ordenan y comparan por año de inicio, no como texto ('9900' va antes que '0001')
+    years = season_start_year(seasons)
+    known = ~np.isnan(years)
+    labels = dict(zip(years[known], seasons[known]))
+    evaluated = sorted(labels)[min_train_seasons:]
+
+    results = Parallel(n_jobs=n_jobs)(delayed(_evaluate_season)(model, X, y, years, labels[year], year)
+                                      for year in evaluated)
+
+    rows, predictions = [], []
+    market_columns = [f'Mercado {r}' for r in RESULTS]
+    market = features[market_columns].to_numpy(dtype=np.float64)[played]
+    for season, train_rows, test, probabilities in results:
+        actual = y[test]
+        row = {
+            'Temporada': season,
+            'Partidos entrenamiento': train_rows,
+            'Partidos evaluados': int(test.sum()),
+            'Log-loss': log_loss_score(actual, probabilities),
+            'Brier': brier_score(actual, probabilities),
+            'Acierto (%)': float((np.asarray(RESULTS)[probabilities.argmax(axis=1)] == actual).mean() * 100)
+        }
+        baseline = market[test]
+        complete = ~np.isnan(baseline).any(axis=1)
+        if complete.any():
+            row['Log-loss mercado'] = log_loss_score(actual[complete], baseline[complete])
+            row['Brier mercado'] = brier_score(actual[complete], baseline[complete])
+        rows.append(row)
+        predictions.append(pd.DataFrame(probabilities, index=index[test], columns=[f'P({r})' for r in RESULTS])
+                           .assign(Temporada=season, FTR=actual))
+    return pd.DataFrame(rows), (pd.concat(predictions) if predictions else pd.DataFrame())
+
+
+# Función para entrenar el clasificador con todos los partidos jugados
+def train_result_model(df, model='Regresión logística', window=FORM_WINDOW):
+    features = match_features(df, window)
+    played = df['FTR'].astype(object).isin(RESULTS).to_numpy()
+    classifier = clone(CLASSIFIERS[model]).fit(features.to_numpy(dtype=np.float64)[played],
+                                   df['FTR'].astype(object).to_numpy()[played])
+    return {'model': classifier, 'features': list(features.columns), 'window': window}
+
+
+# Función para puntuar de una vez una lista de próximos partidos
+def score_fixtures(trained, history, fixtures):
+    """``fixtures`` necesita HomeTeam, AwayTeam y Date (y cuotas si las hay). Se une al
+    histórico para que la forma de cada equipo use solo partidos anteriores a cada fecha."""
+    fixtures = fixtures.reset_index(drop=True)
+    fixtures = fixtures.assign(Date=match_dates(fixtures), FTR=None)
+    history = history.assign(Date=match_dates(history), FTR=history['FTR'].astype(object))
+    combined = pd.concat([history, fixtures], ignore_index=True, sort=False)
+    features = match_features(combined, trained['window']).iloc[len(history):]
+    features = features.reindex(columns=trained['features'])
+    probabilities = _ordered_proba(trained['model'], features.to_numpy(dtype=np.float64))
+    scored = fixtures[[col for col in ('Div', 'Date', 'HomeTeam', 'AwayTeam') if col in fixtures.columns]].copy()
+    for i, result in enumerate(RESULTS):
+        scored[f'P({result})'] = probabilities[:, i]
+    scored['Predicción'] = np.asarray(RESULTS)[probabilities.argmax(axis=1)]
+    return scored
@@ -0,0 +1,77 @@
+from src.operations import apply_operation
+
+MAX_HISTORY = 30
+
+
+# Historial de operaciones con deshacer/rehacer
+class DataHistory:
+    """Registro de operaciones aplicadas sobre un DataFrame base.
+
+    Cada paso guarda la operación (nombre + parámetros) y el DataFrame
+    resultante. Con copy-on-write de pandas, los resultados comparten las
+    columnas que no cambiaron, así que la memoria crece con las columnas
+    modificadas y no con la longitud del historial. Deshacer y rehacer solo
+    mueven un puntero.
+    """
+
+    def __init__(self, base, max_steps=MAX_HISTORY):
+        self.max_steps = max_steps
+        self._frames = [base]
+        self._steps = [None]
+        self._position = 0
+
+    @property
+    def current(self):
+        return self._frames[self._position]
+
+    @property
+    def can_undo(self):
+        return self._position > 0
+
+    @property
+    def can_redo(self):
+        return self._position < len(self._frames) - 1
+
+    def steps(self):
+        """Operaciones aplicadas hasta la posición actual (sin la base)"""
+        return self._steps[1:self._position + 1]
+
+    def pending_steps(self):
+        """Operaciones deshechas que aún pueden rehacerse"""
+        return self._steps[self._position + 1:]
+
+    def apply(self, op, label=None, **params):
+        df = apply_operation(self.current, op, params)
+        return self.record(df, {'op': op, 'params': params, 'label': label or op})
+
+    def record(self, df, step):
+        """Añade un resultado ya calculado (por ejemplo, de un pipeline) como nuevo paso"""
+        # Una operación nueva descarta lo que se podía rehacer
+        del self._frames[self._position + 1:]
+        del self._steps[self._position + 1:]
+        self._frames.append(df)
+        self._steps.append(step)
+        self._position += 1
+
+        # Se olvidan los pasos más antiguos; el más antiguo conservado pasa a ser la base
+        overflow = len(self._frames) - 1 - self.max_steps
+        if overflow > 0:
+            del self._frames[:overflow]
+            del self._steps[:overflow]
+            self._steps[0] = None
+            self._position -= overflow
+        return df
+
+    def amend(self, df):
+        """Sustituye el DataFrame actual (por ejemplo, tras optimizar su memoria)"""
+        self._frames[self._position] = df
+
+    def undo(self):
+        if self.can_undo:
+            self._position -= 1
+        return self.current
+
+    def redo(self):
+        if self.can_redo:
+            self._position += 1
+        return self.current
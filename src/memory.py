@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Proporción máxima de valores únicos para convertir texto en categoría
+CATEGORY_RATIO = 0.5
+
+BOOL_STRINGS = {'true': True, 'false': False}
+INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+# Función para calcular la memoria real (incluyendo objetos Python) de un DataFrame
+def memory_usage_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Función para elegir el entero más pequeño que contiene un rango de valores
+def _smallest_int(min_value, max_value):
+    for int_type in INT_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= min_value and max_value <= info.max:
+            return int_type
+    return np.int64
+
+
+# Función para reducir el tipo de una columna numérica
+def _downcast_numeric(series):
+    values = series.to_numpy()
+    if series.dtype.kind in 'iu':
+        if len(values) == 0:
+            return None
+        target = _smallest_int(values.min(), values.max())
+        return series.astype(target) if np.dtype(target).itemsize < series.dtype.itemsize else None
+    if series.dtype == np.float64:
+        finite = values[np.isfinite(values)]
+        if len(finite) and np.abs(finite).max() > np.finfo(np.float32).max:
+            return None
+        # Solo si float32 representa exactamente todos los valores (ida y vuelta sin pérdida)
+        if np.array_equal(finite, finite.astype(np.float32)):
+            return series.astype(np.float32)
+    return None
+
+
+# Función para convertir una columna de texto en booleana o categórica
+def _compact_object(series, category_ratio):
+    non_null = series.dropna()
+    if len(non_null) == 0:
+        return None
+
+    uniques = pd.unique(non_null)
+    # Detección de booleanos: True/False como objetos o como texto
+    if len(uniques) <= 2 and not series.isna().any():
+        if all(isinstance(v, (bool, np.bool_)) for v in uniques):
+            return series.astype(bool)
+        if all(isinstance(v, str) and v.strip().lower() in BOOL_STRINGS for v in uniques):
+            return series.str.strip().str.lower().map(BOOL_STRINGS).astype(bool)
+
+    # Solo texto homogéneo: las columnas mixtas se dejan como están
+    if len(uniques) / len(series) <= category_ratio and all(isinstance(v, str) for v in uniques):
+        return series.astype('category')
+    return None
+
+
+# Función para reducir la memoria de un DataFrame
+def optimize_memory(df, category_ratio=CATEGORY_RATIO):
+    """Reduce tipos (enteros, float32, categorías y booleanos) y devuelve (df, informe).
+
+    El informe contiene la memoria antes y después y las columnas convertidas.
+    """
+    before = memory_usage_bytes(df)
+    converted = {}
+    if df.columns.has_duplicates:
+        return df, {'before_bytes': before, 'after_bytes': before, 'saved_pct': 0.0, 'converted': {}}
+    for col in df.columns:
+        series = df[col]
+        try:
+            if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+                continue
+            if pd.api.types.is_numeric_dtype(series) and isinstance(series.dtype, np.dtype):
+                result = _downcast_numeric(series)
+            elif series.dtype == object:
+                result = _compact_object(series, category_ratio)
+            else:
+                result = None
+        except (TypeError, ValueError):
+            result = None
+        if result is not None:
+            converted[col] = result
+
+    if converted and len(converted) > len(df.columns) // 2:
+        # Conversión masiva (recién cargado): reconstruir deja los bloques consolidados
+        df = pd.DataFrame({col: converted.get(col, df[col]) for col in df.columns}, index=df.index)
+    elif converted:
+        # Pocas columnas: copia superficial para compartir el resto (copy-on-write)
+        df = df.copy(deep=False)
+        for col, series in converted.items():
+            df[col] = series
+
+    after = memory_usage_bytes(df) if converted else before
+    report = {
+        'before_bytes': before,
+        'after_bytes': after,
+        'saved_pct': (1 - after / before) * 100 if before else 0.0,
+        'converted': {col: str(series.dtype) for col, series in converted.items()}
+    }
+    return df, report
@@ -0,0 +1,93 @@
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+from sklearn.model_selection import KFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+CV_FOLDS = 5
+RANDOM_STATE = 42
+
+# Modelos disponibles en el banco de pruebas (se clonan en cada fold)
+REGRESSORS = {
+    'Lineal': LinearRegression(),
+    'Ridge': make_pipeline(StandardScaler(), Ridge(alpha=1.0)),
+    'Gradient Boosting': HistGradientBoostingRegressor(random_state=RANDOM_STATE)
+}
+
+
+# Función para entrenar y evaluar un modelo en un fold, midiendo cada fase
+def _fit_fold(name, estimator, X, y, train, test, fold):
+    start = perf_counter()
+    model = clone(estimator).fit(X[train], y[train])
+    fit_seconds = perf_counter() - start
+    start = perf_counter()
+    predictions = model.predict(X[test])
+    predict_seconds = perf_counter() - start
+    metrics = {
+        'Modelo': name,
+        'Fold': fold + 1,
+        'R²': r2_score(y[test], predictions),
+        'RMSE': np.sqrt(mean_squared_error(y[test], predictions)),
+        'MAE': mean_absolute_error(y[test], predictions),
+        'Entrenamiento (s)': fit_seconds,
+        'Predicción (s)': predict_seconds,
+        'Filas de entrenamiento': len(train)
+    }
+    return metrics, test, predictions
+
+
+# Función para ajustar un modelo con todas las filas
+def _fit_full(name, estimator, X, y):
+    start = perf_counter()
+    model = clone(estimator).fit(X, y)
+    return name, model, perf_counter() - start
+
+
+# Función para comparar varios modelos con validación cruzada k-fold en paralelo
+def cross_validate_models(df, target, features, models=None, folds=CV_FOLDS, n_jobs=-1):
+    """Cada combinación (modelo, fold) es una tarea de joblib, y después cada modelo se
+    reajusta con todas las filas. Devuelve un diccionario con métricas y tiempos por fold,
+    resumen por modelo, predicciones fuera de muestra y los modelos finales."""
+    features = list(features)
+    models = list(models or REGRESSORS)
+    data = df[features + [target]].dropna()
+    if len(data) < 2:
+        raise ValueError(f"Se necesitan al menos 2 filas completas para la validación cruzada (hay {len(data)})")
+    X = data[features].to_numpy(dtype=np.float64)
+    y = data[target].to_numpy(dtype=np.float64)
+    splits = list(KFold(n_splits=min(folds, len(data)), shuffle=True, random_state=RANDOM_STATE).split(X))
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        fold_results = parallel(delayed(_fit_fold)(name, REGRESSORS[name], X, y, train, test, fold)
+                                for name in models for fold, (train, test) in enumerate(splits))
+        final = parallel(delayed(_fit_full)(name, REGRESSORS[name], X, y) for name in models)
+
+    fold_table = pd.DataFrame([metrics for metrics, _, _ in fold_results])
+    # Por posición: el índice puede tener etiquetas repetidas (varios CSV concatenados)
+    out_of_fold = {name: np.full(len(y), np.nan) for name in models}
+    for (metrics, test, values) in fold_results:
+        out_of_fold[metrics['Modelo']][test] = values
+    predictions = pd.DataFrame({'Real': y, **out_of_fold}, index=data.index)
+
+    summary = fold_table.groupby('Modelo', sort=False).agg(**{
+        'R² medio': ('R²', 'mean'),
+        'R² desv.': ('R²', 'std'),
+        'RMSE medio': ('RMSE', 'mean'),
+        'MAE medio': ('MAE', 'mean'),
+        'Entrenamiento total (s)': ('Entrenamiento (s)', 'sum')
+    })
+    summary['Ajuste final (s)'] = pd.Series({name: seconds for name, _, seconds in final})
+    return {
+        'folds': fold_table,
+        'summary': summary.sort_values('R² medio', ascending=False),
+        'predictions': predictions,
+        'models': {name: model for name, model, _ in final},
+        'rows': len(data)
+    }
@@ -0,0 +1,132 @@
+import pandas as pd
+
+from src.expressions import evaluate_expression, evaluate_many
+
+# Operaciones de manipulación de datos
+# Cada operación recibe un DataFrame y parámetros serializables, y devuelve un
+# DataFrame nuevo sin modificar el original (con copy-on-write, las columnas
+# no tocadas se comparten entre el original y el resultado).
+
+
+# ---------- Operaciones de columna ----------
+# Devuelven (nombre de columna, valores) para que el pipeline pueda
+# aplicar varias seguidas sobre una sola copia del DataFrame.
+
+def column_constant(df, name, value):
+    return name, value
+
+
+def column_computed(df, name, expression):
+    # Fórmula validada y vectorizada: solo se leen las columnas que usa
+    return name, evaluate_expression(df, expression)
+
+
+def column_sequence(df, name, start):
+    return name, range(start, start + len(df))
+
+
+def column_fill_value(df, column, value):
+    series = df[column]
+    # En columnas categóricas el valor debe existir como categoría
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return column, series.fillna(value)
+
+
+# Valor de relleno automático: media para numéricas, moda para el resto
+def column_fill_statistic(df, column):
+    series = df[column]
+    if pd.api.types.is_numeric_dtype(series):
+        value = series.mean()
+    else:
+        mode = series.mode()
+        value = mode.iloc[0] if not mode.empty else "N/A"
+    return column_fill_value(df, column, value)
+
+
+def column_format_dates(df, column, input_format, output_format, dayfirst=False):
+    if input_format == "mixed":
+        dates = pd.to_datetime(df[column], errors='coerce', dayfirst=dayfirst)
+    else:
+        # Convierte valores inválidos a NaT (Not a Time)
+        dates = pd.to_datetime(df[column], format=input_format, errors='coerce')
+    return column, dates.dt.strftime(output_format)
+
+
+def column_replace_values(df, column, search, replacement, case_sensitive=False):
+    values = df[column].astype(str).str.replace(search, replacement, case=case_sensitive, regex=False)
+    return column, values
+
+
+COLUMN_OPERATIONS = {
+    'add_constant': column_constant,
+    'add_computed': column_computed,
+    'add_sequence': column_sequence,
+    'fill_value': column_fill_value,
+    'fill_statistic': column_fill_statistic,
+    'format_dates': column_format_dates,
+    'replace_values': column_replace_values
+}
+
+
+# ---------- Operaciones de tabla ----------
+
+def drop_columns(df, columns):
+    return df.drop(columns=columns)
+
+
+def drop_rows(df, indices):
+    return df.drop(index=indices)
+
+
+def drop_duplicates(df):
+    return df.drop_duplicates()
+
+
+def reorder_columns(df, order):
+    return df[order]
+
+
+def sort_rows(df, by, ascending=True):
+    # Estable: los empates conservan el orden anterior, así dos ordenaciones seguidas se pueden fusionar
+    return df.sort_values(by, ascending=ascending, kind='stable')
+
+
+def drop_null_rows(df, column):
+    return df.dropna(subset=[column])
+
+
+def rename_column(df, column, new_name):
+    return df.rename(columns={column: new_name})
+
+
+def rename_columns(df, mapping):
+    return df.rename(columns=mapping)
+
+
+def add_computed_columns(df, definitions):
+    return df.assign(**evaluate_many(df, definitions))
+
+
+OPERATIONS = {
+    'drop_columns': drop_columns,
+    'drop_rows': drop_rows,
+    'drop_duplicates': drop_duplicates,
+    'reorder_columns': reorder_columns,
+    'sort_rows': sort_rows,
+    'drop_null_rows': drop_null_rows,
+    'rename_column': rename_column,
+    'rename_columns': rename_columns,
+    'add_computed_columns': add_computed_columns
+}
+
+
+# Función para aplicar una operación registrada a un DataFrame
+def apply_operation(df, op, params=None):
+    params = params or {}
+    if op in COLUMN_OPERATIONS:
+        column, values = COLUMN_OPERATIONS[op](df, **params)
+        return df.assign(**{column: values})
+    if op in OPERATIONS:
+        return OPERATIONS[op](df, **params)
+    raise ValueError(f"Operación desconocida: {op}")
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA, IncrementalPCA
+
+from src.download import iter_csv_chunks
+
+# Componentes calculados como máximo
+MAX_COMPONENTS = 10
+# Con al menos estas columnas se usa SVD aleatorizada (solo se piden unos pocos componentes)
+RANDOMIZED_COLUMNS = 30
+# Con más filas se ajusta IncrementalPCA por bloques, sin copiar toda la tabla estandarizada
+INCREMENTAL_ROWS = 250_000
+BATCH_ROWS = 50_000
+RANDOM_STATE = 42
+
+
+# Función para elegir el método de ajuste según la forma de los datos
+def choose_solver(rows, columns, n_components):
+    if rows > INCREMENTAL_ROWS:
+        return 'incremental'
+    if columns >= RANDOMIZED_COLUMNS and n_components < min(rows, columns):
+        return 'randomized'
+    return 'full'
+
+
+# Función para estandarizar un bloque con medias y desviaciones ya conocidas
+def _standardize(values, means, stds):
+    return (values - means) / np.where(stds > 0, stds, 1.0)
+
+
+# Función para ajustar IncrementalPCA sobre bloques de DataFrames (de memoria o de un CSV)
+def incremental_pca(chunks, columns, means, stds, n_components, batch_rows=BATCH_ROWS):
+    """Cada ``partial_fit`` necesita al menos ``n_components`` filas: los bloques pequeños
+    se acumulan hasta llegar a ``batch_rows``. Devuelve (modelo, filas usadas)."""
+    model = IncrementalPCA(n_components=n_components)
+    pending, pending_rows, rows = [], 0, 0
+
+    def flush():
+        batch = np.vstack(pending)
+        model.partial_fit(batch)
+        return len(batch)
+
+    for chunk in chunks:
+        # Una celda con texto en un CSV solo anula su fila, no toda la lectura
+        values = chunk[columns].apply(pd.to_numeric, errors='coerce').dropna().to_numpy(dtype=np.float64)
+        if len(values) == 0:
+            continue
+        pending.append(_standardize(values, means, stds))
+        pending_rows += len(values)
+        if pending_rows >= max(batch_rows, n_components):
+            rows += flush()
+            pending, pending_rows = [], 0
+    if pending_rows >= n_components:
+        rows += flush()
+    return model, rows
+
+
+# Función para resumir un modelo ajustado en tablas de cargas y varianza explicada
+def pca_tables(model, columns):
+    names = [f'PC{i + 1}' for i in range(model.n_components_)]
+    loadings = pd.DataFrame(model.components_.T, index=columns, columns=names)
+    ratio = model.explained_variance_ratio_ * 100
+    explained = pd.DataFrame({
+        'Componente': names,
+        'Varianza explicada (%)': ratio,
+        'Acumulada (%)': np.cumsum(ratio)
+    })
+    return loadings, explained
+
+
+# Función para calcular un PCA sobre un conjunto arbitrario de columnas numéricas
+def fit_pca(df, columns, n_components=None):
+    """Estandariza las columnas, elige el método (completo, aleatorizado o incremental) y
+    devuelve un diccionario con scores, cargas, varianza explicada y el método usado."""
+    columns = list(columns)
+    data = df[columns].dropna()
+    if len(data) < 2:
+        raise ValueError(f"Se necesitan al menos 2 filas completas para el PCA (hay {len(data)})")
+    n_components = min(n_components or MAX_COMPONENTS, len(columns), len(data))
+    solver = choose_solver(len(data), len(columns), n_components)
+    means = data.mean().to_numpy(dtype=np.float64)
+    stds = data.std().to_numpy(dtype=np.float64)
+
+    if solver == 'incremental':
+        blocks = (data.iloc[start:start + BATCH_ROWS] for start in range(0, len(data), BATCH_ROWS))
+        model, _ = incremental_pca(blocks, columns, means, stds, n_components)
+        scores = np.vstack([model.transform(_standardize(data.iloc[start:start + BATCH_ROWS].to_numpy(dtype=np.float64),
+                                                         means, stds))
+                            for start in range(0, len(data), BATCH_ROWS)])
+    else:
+        model = PCA(n_components=n_components, svd_solver=solver, random_state=RANDOM_STATE)
+        scores = model.fit_transform(_standardize(data.to_numpy(dtype=np.float64), means, stds))
+
+    loadings, explained = pca_tables(model, columns)
+    return {
+        'scores': pd.DataFrame(scores, index=data.index, columns=loadings.columns),
+        'loadings': loadings,
+        'explained': explained,
+        'solver': solver,
+        'rows': len(data)
+    }
+
+
+# Función para calcular un PCA de uno o varios CSV sin cargarlos en memoria
+def pca_csv_in_chunks(sources, columns, means, stds, n_components=None, base_url=None, chunksize=100_000):
+    """Usa las medias y desviaciones de un perfil por bloques (``StreamingProfile``) y una
+    segunda lectura para IncrementalPCA. Devuelve (cargas, varianza explicada, filas, errores)."""
+    columns = list(columns)
+    n_components = min(n_components or MAX_COMPONENTS, len(columns))
+    errors = []
+
+    def chunks():
+        for source in sources:
+            try:
+                for chunk in iter_csv_chunks(source, base_url, chunksize):
+                    if all(col in chunk.columns for col in columns):
+                        yield chunk
+            except Exception as e:
+                errors.append((source, str(e)))
+
+    model, rows = incremental_pca(chunks(), columns, np.asarray(means, dtype=np.float64),
+                                  np.asarray(stds, dtype=np.float64), n_components)
+    if rows == 0:
+        return None, None, 0, errors
+    loadings, explained = pca_tables(model, columns)
+    return loadings, explained, rows, errors
@@ -0,0 +1,190 @@
+import os
+import json
+import argparse
+
+import pandas as pd
+
+from src.operations import COLUMN_OPERATIONS, OPERATIONS
+from src.download import download_csv_from_url, FOOTBALL_DATA_BASE_URL
+from src.schema import read_csv_with_schema
+
+RECIPE_VERSION = 1
+
+
+# Función para fusionar dos ordenaciones estables seguidas en una sola
+def _compose_sorts(first, second):
+    """Ordenar de forma estable por A y después por B equivale a ordenar por B y, en los
+    empates, por A: las claves anteriores pasan a ser secundarias (sin repetir las de B)."""
+    def keys(params):
+        by = params['by'] if isinstance(params['by'], list) else [params['by']]
+        ascending = params.get('ascending', True)
+        ascending = list(ascending) if isinstance(ascending, (list, tuple)) else [ascending] * len(by)
+        return list(zip(by, ascending))
+
+    combined = keys(second)
+    combined += [(column, asc) for column, asc in keys(first) if column not in dict(combined)]
+    return {'by': [column for column, _ in combined], 'ascending': [asc for _, asc in combined]}
+
+
+# Pipeline perezoso de transformaciones
+class Pipeline:
+    """Secuencia de operaciones que se registra sin ejecutarse.
+
+    Al ejecutar, los pasos se fusionan (eliminaciones y renombrados
+    consecutivos se agrupan, ordenaciones seguidas se combinan en una) y las
+    operaciones de columna seguidas se aplican sobre una única copia del
+    DataFrame. La receta se puede guardar en JSON y reproducir sobre otros
+    archivos sin la interfaz.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = [dict(step) for step in (steps or [])]
+
+    def __len__(self):
+        return len(self.steps)
+
+    def add(self, op, label=None, **params):
+        if op not in COLUMN_OPERATIONS and op not in OPERATIONS:
+            raise ValueError(f"Operación desconocida: {op}")
+        self.steps.append({'op': op, 'params': params, 'label': label or op})
+        return self
+
+    def extend(self, steps):
+        for step in steps:
+            # Una receta aplicada dentro de otra se aplana
+            if step['op'] == 'recipe':
+                self.extend(step['params']['steps'])
+            else:
+                self.add(step['op'], step.get('label'), **step.get('params', {}))
+        return self
+
+    # ---------- Fusión ----------
+    def fused_steps(self):
+        fused = []
+        for step in self.steps:
+            op, params = step['op'], step['params']
+            last = fused[-1] if fused else None
+
+            if last and op == last['op'] == 'drop_columns':
+                last['params'] = {'columns': last['params']['columns'] + [c for c in params['columns'] if c not in last['params']['columns']]}
+            elif last and op == last['op'] == 'drop_rows':
+                last['params'] = {'indices': last['params']['indices'] + params['indices']}
+            elif last and op == last['op'] == 'sort_rows':
+                last['params'] = _compose_sorts(last['params'], params)
+            elif last and op == last['op'] == 'reorder_columns':
+                # Solo cuenta el último orden de columnas
+                fused[-1] = {'op': op, 'params': params}
+            elif last and op == last['op'] == 'drop_duplicates':
+                continue
+            elif op == 'rename_column' or op == 'rename_columns':
+                mapping = {params['column']: params['new_name']} if op == 'rename_column' else dict(params['mapping'])
+                if last and last['op'] == 'rename_columns':
+                    # Componer renombrados encadenados (a→b, b→c ⇒ a→c)
+                    previous = last['params']['mapping']
+                    composed = {old: mapping.get(new, new) for old, new in previous.items()}
+                    composed.update({old: new for old, new in mapping.items()
+                                     if old not in previous and old not in previous.values()})
+                    last['params'] = {'mapping': composed}
+                else:
+                    fused.append({'op': 'rename_columns', 'params': {'mapping': mapping}})
+            elif op in COLUMN_OPERATIONS:
+                if last and last['op'] == 'columns':
+                    last['params']['steps'].append({'op': op, 'params': params})
+                else:
+                    fused.append({'op': 'columns', 'params': {'steps': [{'op': op, 'params': params}]}})
+            else:
+                fused.append({'op': op, 'params': dict(params)})
+        return fused
+
+    # ---------- Ejecución ----------
+    def run(self, df):
+        for step in self.fused_steps():
+            if step['op'] == 'columns':
+                # Una sola copia superficial para todo el bloque de operaciones de columna
+                df = df.copy(deep=False)
+                for column_step in step['params']['steps']:
+                    column, values = COLUMN_OPERATIONS[column_step['op']](df, **column_step['params'])
+                    df[column] = values
+            else:
+                df = OPERATIONS[step['op']](df, **step['params'])
+        return df
+
+    # ---------- Serialización ----------
+    def to_dict(self):
+        return {'version': RECIPE_VERSION, 'steps': self.steps}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version', RECIPE_VERSION) > RECIPE_VERSION:
+            raise ValueError(f"Versión de receta no soportada: {data['version']}")
+        return cls().extend(data.get('steps', []))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_json(f.read())
+
+
+# Función para aplicar una receta a varios CSV (rutas locales o URLs)
+def run_recipe_on_files(pipeline, sources, base_url=None, use_schema=True):
+    """Devuelve una lista de (origen, df, error), un elemento por archivo"""
+    results = []
+    for source in sources:
+        try:
+            if os.path.exists(source):
+                with open(source, 'rb') as f:
+                    df = read_csv_with_schema(f, use_schema=use_schema)
+            else:
+                df, error = download_csv_from_url(source, base_url, use_schema=use_schema)
+                if df is None:
+                    results.append((source, None, error))
+                    continue
+            results.append((source, pipeline.run(df), None))
+        except Exception as e:
+            results.append((source, None, str(e)))
+    return results
+
+
+# Ejecución por lotes sin interfaz:
+#   python -m src.pipeline receta.json mmz4281/2324/E0.csv local.csv -o salida/
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aplica una receta de transformaciones a varios CSV")
+    parser.add_argument('recipe', help="Archivo JSON exportado desde la aplicación")
+    parser.add_argument('sources', nargs='+', help="Rutas locales o URLs de archivos CSV")
+    parser.add_argument('-o', '--output', default='.', help="Directorio de salida")
+    parser.add_argument('--base-url', default=FOOTBALL_DATA_BASE_URL, help="URL base para URLs relativas")
+    parser.add_argument('--combine', action='store_true', help="Unir todos los resultados en un solo CSV")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline.load(args.recipe)
+    os.makedirs(args.output, exist_ok=True)
+
+    frames = []
+    for source, df, error in run_recipe_on_files(pipeline, args.sources, args.base_url):
+        if df is None:
+            print(f"ERROR {source}: {error}")
+            continue
+        if args.combine:
+            frames.append(df)
+        else:
+            name = source.rstrip('/').replace('://', '_').replace('/', '_').strip('_')
+            df.to_csv(os.path.join(args.output, name if name.endswith('.csv') else f"{name}.csv"), index=False)
+        print(f"OK {source}: {len(df)} filas")
+
+    if args.combine and frames:
+        pd.concat(frames, ignore_index=True, sort=False).to_csv(os.path.join(args.output, 'combinado.csv'), index=False)
+
+
+if __name__ == '__main__':
+    main()
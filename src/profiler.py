@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+# Columnas numéricas procesadas a la vez (limita la memoria de las matrices intermedias)
+BLOCK_COLUMNS = 32
+
+# Umbrales de outliers: IQR (Tukey), z-score y z robusto con MAD
+OUTLIER_METHODS = ['IQR', 'Z-score', 'MAD']
+IQR_FACTOR = 1.5
+Z_THRESHOLD = 3.0
+MAD_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+
+NUMERIC_FIELDS = [
+    'Conteo', 'Nulos', 'Media', 'Mediana', 'Moda', 'Desviación Estándar', 'Varianza',
+    'Asimetría (Skewness)', 'Curtosis', 'Mínimo', 'Q1 (25%)', 'Q3 (75%)', 'Máximo', 'Rango', 'IQR', 'MAD'
+]
+CATEGORICAL_FIELDS = [
+    'Conteo', 'Nulos', 'Valores únicos', 'Valor más frecuente', 'Frecuencia del más común', 'Porcentaje nulos'
+]
+
+
+# Función para elegir las columnas numéricas (sin booleanas) de un DataFrame
+def numeric_columns(df):
+    return [col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+
+
+# Función para interpolar cuantiles en columnas ya ordenadas con distinto número de valores
+def _sorted_quantiles(sorted_block, counts, q):
+    position = q * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.intp)
+    upper = np.ceil(position).astype(np.intp)
+    columns = np.arange(sorted_block.shape[1])
+    low_values = sorted_block[lower, columns]
+    high_values = sorted_block[upper, columns]
+    result = low_values + (high_values - low_values) * (position - lower)
+    return np.where(counts > 0, result, np.nan)
+
+
+# Función para obtener la moda de cada columna de un bloque ordenado
+def _sorted_modes(sorted_block):
+    # Sin valores repetidos, pandas devuelve todos como moda y el primero es el mínimo
+    repeated = (sorted_block[1:] == sorted_block[:-1]).any(axis=0)
+    modes = sorted_block[0].copy()
+    if repeated.any():
+        modes[repeated] = _run_modes(np.asfortranarray(sorted_block[:, repeated]))
+    return modes
+
+
+# Función para obtener la moda por rachas de valores iguales (columnas con repetidos)
+def _run_modes(sorted_block):
+    n_rows, n_cols = sorted_block.shape
+    # En orden Fortran, la traspuesta aplanada recorre columna a columna sin copiar
+    flat = sorted_block.T.ravel()
+    change = np.empty(flat.size, dtype=bool)
+    change[0] = True
+    np.not_equal(flat[1:], flat[:-1], out=change[1:])
+    change[::n_rows] = True
+
+    starts = np.flatnonzero(change)
+    lengths = np.diff(np.append(starts, flat.size))
+    columns = starts // n_rows
+    valid = ~np.isnan(flat[starts])
+    starts, lengths, columns = starts[valid], lengths[valid], columns[valid]
+
+    modes = np.full(n_cols, np.nan)
+    if len(starts):
+        # Las rachas ya están agrupadas por columna: racha máxima de cada grupo en O(n)
+        boundaries = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+        longest = np.maximum.reduceat(lengths, boundaries)
+        group_sizes = np.diff(np.append(boundaries, len(lengths)))
+        candidates = np.flatnonzero(lengths == np.repeat(longest, group_sizes))
+        # En empate, la primera racha (el valor más pequeño, como pandas)
+        candidate_columns = columns[candidates]
+        first = candidates[np.r_[True, candidate_columns[1:] != candidate_columns[:-1]]]
+        modes[columns[first]] = flat[starts[first]]
+    return modes
+
+
+# Función para perfilar un bloque de columnas numéricas en una sola ordenación
+def _profile_block(values):
+    n_rows, n_cols = values.shape
+    if n_rows == 0:
+        # Sin filas no hay nada que ordenar ni indexar: conteos a cero y el resto nulo
+        empty = {field: np.full(n_cols, np.nan) for field in NUMERIC_FIELDS}
+        empty['Conteo'] = empty['Nulos'] = np.zeros(n_cols, dtype=np.int64)
+        return empty
+    # Una ordenación por columna da mínimos, máximos, cuantiles y moda; los NaN quedan al final
+    sorted_block = np.sort(np.asfortranarray(values, dtype=np.float64), axis=0)
+    missing = np.isnan(sorted_block)
+    counts = n_rows - missing.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(missing, 0.0, sorted_block).sum(axis=0) / counts
+        deviations = sorted_block - mean
+        deviations[missing] = 0.0
+        squared = deviations * deviations
+        m2 = squared.sum(axis=0)
+        m3 = (squared * deviations).sum(axis=0)
+        m4 = (squared * squared).sum(axis=0)
+
+        variance = np.where(counts > 1, m2 / (counts - 1), np.nan)
+        # Mismos estimadores corregidos que pandas (skew y kurtosis)
+        skew = np.where(m2 > 0, counts * np.sqrt(counts - 1) / (counts - 2) * m3 / m2 ** 1.5, 0.0)
+        skew = np.where(counts > 2, skew, np.nan)
+        kurtosis = np.where(
+            m2 > 0,
+            counts * (counts + 1) * (counts - 1) * m4 / ((counts - 2) * (counts - 3) * m2 ** 2)
+            - 3 * (counts - 1) ** 2 / ((counts - 2) * (counts - 3)),
+            0.0
+        )
+        kurtosis = np.where(counts > 3, kurtosis, np.nan)
+
+    q1, median, q3 = (_sorted_quantiles(sorted_block, counts, q) for q in (0.25, 0.5, 0.75))
+    minimum = np.where(counts > 0, sorted_block[0], np.nan)
+    maximum = _sorted_quantiles(sorted_block, counts, 1.0)
+    # Desviación absoluta mediana: mediana de |x - mediana| (segunda ordenación del bloque)
+    mad = _sorted_quantiles(np.sort(np.abs(sorted_block - median), axis=0), counts, 0.5)
+
+    return {
+        'Conteo': counts,
+        'Nulos': n_rows - counts,
+        'Media': mean,
+        'Mediana': median,
+        'Moda': _sorted_modes(sorted_block),
+        'Desviación Estándar': np.sqrt(variance),
+        'Varianza': variance,
+        'Asimetría (Skewness)': skew,
+        'Curtosis': kurtosis,
+        'Mínimo': minimum,
+        'Q1 (25%)': q1,
+        'Q3 (75%)': q3,
+        'Máximo': maximum,
+        'Rango': maximum - minimum,
+        'IQR': q3 - q1,
+        'MAD': mad
+    }
+
+
+# Función para perfilar todas las columnas numéricas a la vez
+def profile_numeric(df, columns=None):
+    """Devuelve una tabla con una fila por columna y las estadísticas en columnas"""
+    columns = numeric_columns(df) if columns is None else list(columns)
+    blocks = []
+    for start in range(0, len(columns), BLOCK_COLUMNS):
+        block_columns = columns[start:start + BLOCK_COLUMNS]
+        values = df[block_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        blocks.append(pd.DataFrame(_profile_block(values), index=block_columns))
+    if not blocks:
+        return pd.DataFrame(columns=NUMERIC_FIELDS)
+    profile = pd.concat(blocks)
+    profile['Conteo'] = profile['Conteo'].astype(int)
+    profile['Nulos'] = profile['Nulos'].astype(int)
+    return profile
+
+
+# Función para obtener los límites de outliers de una columna a partir del perfil
+def outlier_bounds(profile, column, method='IQR', iqr_factor=IQR_FACTOR, z_threshold=Z_THRESHOLD,
+                   mad_threshold=MAD_THRESHOLD):
+    row = profile.loc[column]
+    if method == 'IQR':
+        return row['Q1 (25%)'] - iqr_factor * row['IQR'], row['Q3 (75%)'] + iqr_factor * row['IQR']
+    if method == 'Z-score':
+        return row['Media'] - z_threshold * row['Desviación Estándar'], row['Media'] + z_threshold * row['Desviación Estándar']
+    # Z robusto (Iglewicz-Hoaglin): 0.6745·|x - mediana| / MAD > umbral
+    if row['MAD'] == 0:
+        # Sin dispersión robusta no se marca ningún valor
+        return -np.inf, np.inf
+    spread = mad_threshold * row['MAD'] / MAD_SCALE
+    return row['Mediana'] - spread, row['Mediana'] + spread
+
+
+# Función para contar outliers de todas las columnas numéricas por IQR, z-score y MAD
+def outlier_summary(df, profile=None, iqr_factor=IQR_FACTOR, z_threshold=Z_THRESHOLD, mad_threshold=MAD_THRESHOLD):
+    """Cuenta con máscaras booleanas sobre bloques de columnas, sin materializar filas"""
+    profile = profile_numeric(df) if profile is None else profile
+    columns = list(profile.index)
+    bounds = {method: np.array([outlier_bounds(profile, col, method, iqr_factor, z_threshold, mad_threshold)
+                                for col in columns]).reshape(-1, 2)
+              for method in OUTLIER_METHODS}
+    counts = {method: np.zeros(len(columns), dtype=np.int64) for method in OUTLIER_METHODS}
+
+    for start in range(0, len(columns), BLOCK_COLUMNS):
+        block = slice(start, start + BLOCK_COLUMNS)
+        values = df[columns[block]].to_numpy(dtype=np.float64, na_value=np.nan)
+        for method in OUTLIER_METHODS:
+            lower, upper = bounds[method][block, 0], bounds[method][block, 1]
+            with np.errstate(invalid='ignore'):
+                mask = (values < lower) | (values > upper)
+            counts[method][block] = mask.sum(axis=0)
+
+    n_rows = max(len(df), 1)
+    return pd.DataFrame({
+        'Columna': columns,
+        'Outliers': counts['IQR'],
+        'Porcentaje': [f"{count / n_rows * 100:.2f}%" for count in counts['IQR']],
+        'Límite inferior': bounds['IQR'][:, 0],
+        'Límite superior': bounds['IQR'][:, 1],
+        'Outliers (z-score)': counts['Z-score'],
+        'Outliers (MAD)': counts['MAD']
+    })
+
+
+# Función para perfilar columnas categóricas o de texto
+def profile_categorical(df, columns):
+    rows = {}
+    for col in columns:
+        # Un único value_counts da únicos, moda y frecuencia
+        counts = df[col].value_counts()
+        nulls = int(df[col].isna().sum())
+        rows[col] = {
+            'Conteo': len(df) - nulls,
+            'Nulos': nulls,
+            'Valores únicos': int((counts > 0).sum()),
+            'Valor más frecuente': counts.index[0] if len(counts) and counts.iloc[0] > 0 else 'N/A',
+            'Frecuencia del más común': int(counts.iloc[0]) if len(counts) else 0,
+            'Porcentaje nulos': f"{nulls / len(df) * 100:.2f}%" if len(df) else "0.00%"
+        }
+    return pd.DataFrame.from_dict(rows, orient='index', columns=CATEGORICAL_FIELDS)
+
+
+# Función para perfilar todo el DataFrame: (tabla numérica, tabla categórica)
+def profile_frame(df):
+    numeric = numeric_columns(df)
+    others = [col for col in df.columns if col not in set(numeric)]
+    return profile_numeric(df, numeric), profile_categorical(df, others)
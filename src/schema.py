@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# Registro de esquemas conocidos de football-data.co.uk
+# Los enteros se leen como float32 (los archivos suelen terminar con filas vacías
+# y los enteros nulables son lentos de parsear); tras limpiar se convierten a int8/int16.
+FOOTBALL_DATA_INT8 = [
+    'FTHG', 'FTAG', 'HTHG', 'HTAG', 'HG', 'AG',
+    'HS', 'AS', 'HST', 'AST', 'HHW', 'AHW', 'HC', 'AC', 'HF', 'AF',
+    'HFKC', 'AFKC', 'HO', 'AO', 'HY', 'AY', 'HR', 'AR'
+]
+FOOTBALL_DATA_INT16 = ['HBP', 'ABP']
+FOOTBALL_DATA_INT32 = ['Attendance']
+FOOTBALL_DATA_CATEGORICAL = [
+    'Div', 'Season', 'Country', 'League', 'HomeTeam', 'AwayTeam', 'Home', 'Away',
+    'FTR', 'HTR', 'Res', 'Referee'
+]
+FOOTBALL_DATA_DATE_FORMATS = ['%d/%m/%Y', '%d/%m/%y']
+
+# Columnas que identifican un archivo de football-data.co.uk
+FOOTBALL_DATA_MARKERS = [{'HomeTeam', 'AwayTeam'}, {'Home', 'Away'}]
+
+CSV_ENGINES = ['c', 'pyarrow']
+
+
+# Función para saber si unas columnas corresponden a un archivo de football-data
+def is_football_data(columns):
+    columns = set(columns)
+    return any(marker <= columns for marker in FOOTBALL_DATA_MARKERS)
+
+
+# Función para construir el mapa de tipos que se pasa a pd.read_csv
+def football_data_dtypes():
+    dtypes = {}
+    dtypes.update({col: 'float32' for col in FOOTBALL_DATA_INT8 + FOOTBALL_DATA_INT16})
+    dtypes.update({col: 'float64' for col in FOOTBALL_DATA_INT32})
+    dtypes.update({col: 'category' for col in FOOTBALL_DATA_CATEGORICAL})
+    # Date se lee como categoría para parsear cada fecha distinta una sola vez
+    dtypes['Date'] = 'category'
+    return dtypes
+
+
+# Función para convertir la columna Date con los formatos exactos de football-data
+def parse_football_dates(values):
+    """Convierte fechas en texto parseando solo los valores únicos (pocos por temporada)"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), pd.Series(values.cat.categories.astype(str))
+    else:
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype=object)
+
+    parsed = pd.to_datetime(uniques, format=FOOTBALL_DATA_DATE_FORMATS[0], errors='coerce')
+    for fmt in FOOTBALL_DATA_DATE_FORMATS[1:]:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed = parsed.where(~missing, pd.to_datetime(uniques.where(missing), format=fmt, errors='coerce'))
+
+    # Los códigos -1 corresponden a valores nulos
+    dates = np.append(parsed.to_numpy(), np.datetime64('NaT', 'ns'))[codes]
+    return pd.Series(dates, index=values.index, name=values.name)
+
+
+# Función para aplicar el esquema football-data a un DataFrame ya leído
+def apply_football_schema(df):
+    """Normaliza tipos: enteros compactos, categorías, cuotas en float32 y fechas.
+
+    Es idempotente, así que puede aplicarse también a archivos subidos o a
+    DataFrames recuperados de la caché.
+    """
+    # Las filas completamente vacías del final del archivo impiden usar enteros
+    empty_rows = df.isna().all(axis=1)
+    if empty_rows.any():
+        df = df[~empty_rows].reset_index(drop=True)
+
+    int_targets = {}
+    int_targets.update({col: np.int8 for col in FOOTBALL_DATA_INT8})
+    int_targets.update({col: np.int16 for col in FOOTBALL_DATA_INT16})
+    int_targets.update({col: np.int32 for col in FOOTBALL_DATA_INT32})
+
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        try:
+            if col in int_targets:
+                if series.dtype == int_targets[col]:
+                    continue
+                numeric = pd.to_numeric(series)
+                # Con nulos reales no hay entero de NumPy posible: float32
+                converted[col] = numeric.astype(np.float32) if numeric.isna().any() else numeric.astype(int_targets[col])
+            elif col in FOOTBALL_DATA_CATEGORICAL:
+                if not isinstance(series.dtype, pd.CategoricalDtype):
+                    converted[col] = series.astype('category')
+            elif col == 'Date':
+                if not pd.api.types.is_datetime64_any_dtype(series):
+                    converted[col] = parse_football_dates(series)
+            elif series.dtype == np.float64:
+                # El resto de columnas numéricas son cuotas: float32 basta
+                converted[col] = series.astype(np.float32)
+        except (ValueError, TypeError):
+            # Columna con contenido inesperado: se deja con el tipo inferido
+            continue
+
+    if converted:
+        # Reconstruir de una vez evita un DataFrame fragmentado en cientos de bloques
+        df = pd.DataFrame({col: converted.get(col, df[col]) for col in df.columns})
+    return df
+
+
+# Función para obtener los argumentos de lectura de un CSV según su cabecera
+def schema_read_kwargs(columns, engine='c'):
+    kwargs = {'engine': engine}
+    if engine != 'pyarrow':
+        # Con el motor C, pasar dtype desactiva su ruta rápida: es más barato
+        # leer sin tipos y convertir después con apply_football_schema
+        return kwargs
+    # pyarrow no tolera las filas cortas del final de algunos archivos
+    kwargs['on_bad_lines'] = 'skip'
+    if is_football_data(columns):
+        dtypes = football_data_dtypes()
+        kwargs['dtype'] = {col: dtype for col, dtype in dtypes.items() if col in set(columns)}
+    return kwargs
+
+
+# Función para leer la cabecera de un archivo sin consumirlo
+def peek_header(buffer, encoding='utf-8'):
+    head = buffer.peek(64 * 1024) if hasattr(buffer, 'peek') else b''
+    if not head and hasattr(buffer, 'seek'):
+        position = buffer.tell()
+        head = buffer.read(64 * 1024)
+        buffer.seek(position)
+    if isinstance(head, bytes):
+        head = head.decode(encoding, errors='replace')
+    first_line = head.lstrip('\ufeff').splitlines()[0] if head else ''
+    return [col.strip() for col in first_line.split(',')]
+
+
+# Función para leer un CSV local (por ejemplo, desde st.file_uploader) con esquema
+def read_csv_with_schema(source, engine='c', use_schema=True):
+    columns = peek_header(source) if use_schema else []
+    df = pd.read_csv(source, **schema_read_kwargs(columns, engine))
+    if use_schema and is_football_data(df.columns):
+        df = apply_football_schema(df)
+    return df
@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from src.stats import StatsCache
+
+# Filas a partir de las cuales se usa MiniBatchKMeans
+MINIBATCH_ROWS = 50_000
+MINIBATCH_SIZE = 4096
+# Filas de la muestra con la que se calcula la silueta (es O(n²))
+SILHOUETTE_SAMPLE = 4000
+# Valores de k evaluados en el barrido del codo y la silueta
+SWEEP_KS = list(range(2, 11))
+RANDOM_STATE = 42
+# Micro-clusters sobre los que se construye el clustering jerárquico
+MICRO_CLUSTERS = 300
+
+
+# Función para preparar las variables: filas completas y valores estandarizados
+def prepare_features(df, features):
+    data = df[list(features)].dropna()
+    scaled = StandardScaler().fit_transform(data.to_numpy(dtype=np.float64))
+    return data, scaled
+
+
+# Función para ajustar K-means (MiniBatchKMeans con muchas filas)
+def fit_kmeans(scaled, k, random_state=RANDOM_STATE):
+    if len(scaled) > MINIBATCH_ROWS:
+        model = MiniBatchKMeans(n_clusters=k, random_state=random_state, batch_size=MINIBATCH_SIZE, n_init=3)
+    else:
+        model = KMeans(n_clusters=k, random_state=random_state)
+    return model.fit(scaled)
+
+
+# Estado de cada proceso del barrido: datos compartidos una vez por proceso
+_SWEEP_DATA = None
+
+
+def _init_sweep_worker(scaled, sample):
+    global _SWEEP_DATA
+    _SWEEP_DATA = (scaled, sample)
+
+
+def _evaluate_k(k):
+    scaled, sample = _SWEEP_DATA
+    model = fit_kmeans(scaled, k)
+    silhouette = silhouette_score(scaled[sample], model.labels_[sample]) \
+        if len(np.unique(model.labels_[sample])) > 1 else np.nan
+    return {'k': k, 'Inercia': model.inertia_, 'Silueta': silhouette}
+
+
+# Función para evaluar varios k de una vez (inercia para el codo y silueta)
+def kmeans_sweep(scaled, ks=SWEEP_KS, workers=None):
+    """Cada k se ajusta en un proceso del pool; la silueta usa una muestra fija de filas"""
+    ks = [k for k in ks if k < len(scaled)]
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample = np.sort(rng.choice(len(scaled), min(len(scaled), SILHOUETTE_SAMPLE), replace=False))
+    workers = min((os.cpu_count() or 1) if workers is None else workers, len(ks))
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_sweep_worker, initargs=(scaled, sample)) as pool:
+            results = list(pool.map(_evaluate_k, ks))
+    else:
+        _init_sweep_worker(scaled, sample)
+        results = [_evaluate_k(k) for k in ks]
+    return pd.DataFrame(results, columns=['k', 'Inercia', 'Silueta'])
+
+
+# Función para construir un clustering jerárquico (Ward) de tamaño acotado
+def hierarchical_clustering(scaled, micro_clusters=MICRO_CLUSTERS):
+    """Resume las filas en ``micro_clusters`` centros con MiniBatchKMeans y aplica Ward
+    sobre ellos, así que la memoria no depende del número de filas (Ward directo es O(n²)).
+
+    Devuelve (matriz de enlace, filas de cada hoja, micro-cluster de cada fila).
+    """
+    if len(scaled) <= micro_clusters:
+        return linkage(scaled, method='ward'), np.ones(len(scaled), dtype=np.int64), np.arange(len(scaled))
+    model = MiniBatchKMeans(n_clusters=micro_clusters, random_state=RANDOM_STATE, batch_size=MINIBATCH_SIZE,
+                            n_init=1).fit(scaled)
+    weights = np.bincount(model.labels_, minlength=micro_clusters)
+    # Los centros sin filas asignadas no aportan nada al árbol
+    used = np.flatnonzero(weights)
+    remap = np.full(micro_clusters, -1)
+    remap[used] = np.arange(len(used))
+    return linkage(model.cluster_centers_[used], method='ward'), weights[used], remap[model.labels_]
+
+
+# Servicio de segmentación de la sesión
+class SegmentationService:
+    """Variables preparadas, modelos y barridos memorizados por (versión de los datos, variables, k)"""
+
+    def __init__(self):
+        self.cache = StatsCache()
+
+    def features(self, df, version, features):
+        return self.cache.get(version, 'segmentation_features', lambda: prepare_features(df, features), features)
+
+    def segment(self, df, version, features, k):
+        def compute():
+            data, scaled = self.features(df, version, features)
+            model = fit_kmeans(scaled, k)
+            labels = model.labels_
+            sizes = np.bincount(labels, minlength=k)
+            # Centros en las unidades originales (medias de cada segmento)
+            centers = data.groupby(labels).mean().reindex(range(k))
+            centers.insert(0, 'Tamaño', sizes)
+            centers.insert(1, 'Porcentaje', sizes / max(len(labels), 1) * 100)
+            centers.index = [f"Segmento {i + 1}" for i in range(k)]
+            return {'labels': labels, 'centers': centers, 'inertia': model.inertia_,
+                    'minibatch': isinstance(model, MiniBatchKMeans)}
+        return self.cache.get(version, 'kmeans', compute, features, k)
+
+    def sweep(self, df, version, features, ks=SWEEP_KS):
+        return self.cache.get(version, 'kmeans_sweep',
+                              lambda: kmeans_sweep(self.features(df, version, features)[1], ks), features, ks)
+
+    def hierarchy(self, df, version, features):
+        return self.cache.get(version, 'hierarchy',
+                              lambda: hierarchical_clustering(self.features(df, version, features)[1]), features)
+
+    def stats(self):
+        return self.cache.stats()
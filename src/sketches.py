@@ -0,0 +1,449 @@
+import numpy as np
+import pandas as pd
+
+from src.download import iter_csv_chunks
+
+# Parámetros por defecto de los sketches (memoria constante por columna)
+KLL_K = 400
+HLL_PRECISION = 12
+CMS_WIDTH = 2048
+CMS_DEPTH = 5
+HEAVY_HITTERS = 50
+
+UINT32_MASK = np.uint64(0xFFFFFFFF)
+
+
+# Función para obtener un hash de 64 bits por valor (mismo valor ⇒ mismo hash en cualquier archivo)
+def hash_values(values):
+    return pd.util.hash_array(np.asarray(values), categorize=False)
+
+
+# Momentos (media, M2, M3, M4) actualizables por bloques y combinables (Welford/Chan/Pébay)
+class MomentSketch:
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Añade un bloque de valores sin NaN"""
+        if len(values) == 0:
+            return self
+        batch = MomentSketch()
+        batch.n = len(values)
+        batch.mean = float(values.mean())
+        deviations = values - batch.mean
+        squared = deviations * deviations
+        batch.m2 = float(squared.sum())
+        batch.m3 = float((squared * deviations).sum())
+        batch.m4 = float((squared * squared).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        return self.merge(batch)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+        m2 = self.m2 + other.m2 + delta2 * na * nb / n
+        m3 = (self.m3 + other.m3 + delta * delta2 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+              + 6 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / n ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.mean += delta * nb / n
+        self.n, self.m2, self.m3, self.m4 = n, m2, m3, m4
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def skew(self):
+        # Mismo estimador corregido que pandas
+        n = self.n
+        if n < 3:
+            return np.nan
+        return n * np.sqrt(n - 1) / (n - 2) * self.m3 / self.m2 ** 1.5 if self.m2 > 0 else 0.0
+
+    @property
+    def kurtosis(self):
+        n = self.n
+        if n < 4:
+            return np.nan
+        if self.m2 <= 0:
+            return 0.0
+        return (n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2)
+                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+
+
+# Sketch KLL de cuantiles: compactadores por niveles, el nivel h pesa 2^h
+class KLLSketch:
+    def __init__(self, k=KLL_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def n(self):
+        return int(sum(len(level) << h for h, level in enumerate(self.levels)))
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Si hay un número impar, el sobrante se queda en este nivel
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=np.float64)])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << h, dtype=np.int64) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        items, cumulative = self._weighted()
+        if len(items) == 0:
+            return np.full(len(qs), np.nan)
+        targets = np.asarray(qs, dtype=np.float64) * cumulative[-1]
+        positions = np.searchsorted(cumulative, targets, side='left')
+        return items[np.minimum(positions, len(items) - 1)]
+
+    def rank(self, values, inclusive=True):
+        """Número aproximado de valores <= x (o < x con inclusive=False)"""
+        items, cumulative = self._weighted()
+        if len(items) == 0:
+            return np.zeros(len(values), dtype=np.int64)
+        positions = np.searchsorted(items, values, side='right' if inclusive else 'left')
+        return np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0)
+
+
+# HyperLogLog: número aproximado de valores distintos
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes):
+        if len(hashes) == 0:
+            return self
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # Longitud en bits exacta a partir de las dos mitades de 32 bits (frexp no redondea)
+        high = np.frexp((rest >> np.uint64(32)).astype(np.float64))[1]
+        low = np.frexp((rest & UINT32_MASK).astype(np.float64))[1]
+        bit_length = np.where(high > 0, high + 32, low)
+        rho = (64 - p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rho)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and zeros:
+            # Corrección para cardinalidades pequeñas (linear counting)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+# Count-min con lista de candidatos: valores más frecuentes aproximados
+class CountMinSketch:
+    def __init__(self, numeric=False, width=CMS_WIDTH, depth=CMS_DEPTH, capacity=HEAVY_HITTERS):
+        self.numeric = numeric
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.candidates = {}
+
+    def _indices(self, hashes):
+        # Doble hashing (h1 + i·h2) a partir de un único hash de 64 bits
+        h1 = hashes & UINT32_MASK
+        h2 = hashes >> np.uint64(32)
+        return [((h1 + np.uint64(i) * h2) % np.uint64(self.width)).astype(np.intp) for i in range(self.depth)]
+
+    def _array(self, values):
+        # El mismo tipo al actualizar y al consultar, para que los hashes coincidan
+        return np.asarray(values, dtype=np.float64 if self.numeric else object)
+
+    def estimate(self, values):
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int64)
+        indices = self._indices(hash_values(self._array(values)))
+        return np.min([self.table[i, idx] for i, idx in enumerate(indices)], axis=0)
+
+    def _refresh(self, values):
+        values = list(dict.fromkeys(list(self.candidates) + list(values)))
+        estimates = self.estimate(values)
+        top = np.argsort(-estimates, kind='stable')[:self.capacity]
+        self.candidates = {values[i]: int(estimates[i]) for i in top}
+
+    def update(self, values):
+        """Añade un bloque de valores (sin nulos)"""
+        if len(values) == 0:
+            return self
+        for i, idx in enumerate(self._indices(hash_values(self._array(values)))):
+            self.table[i] += np.bincount(idx, minlength=self.width)
+        # Los más frecuentes del bloque son los únicos que pueden entrar como candidatos
+        self._refresh(pd.Series(values).value_counts().index[:self.capacity])
+        return self
+
+    def merge(self, other):
+        self.table += other.table
+        self._refresh(list(other.candidates))
+        return self
+
+    def add_counts(self, values, counts):
+        """Añade valores con su frecuencia ya conocida"""
+        counts = np.asarray(counts, dtype=np.int64)
+        for i, idx in enumerate(self._indices(hash_values(self._array(values)))):
+            np.add.at(self.table[i], idx, counts)
+        self._refresh(values)
+        return self
+
+    def top(self, n=10):
+        return sorted(self.candidates.items(), key=lambda item: -item[1])[:n]
+
+
+# Resumen en memoria constante de una columna
+class ColumnSketch:
+    """El tipo (numérica o categórica) se decide con el primer bloque que tiene valores: una
+    columna vacía en un archivo (se lee como float64) no fija el tipo. Si una columna numérica
+    recibe después texto, pasa a categórica (``numeric=None`` mientras solo haya nulos)."""
+
+    def __init__(self, numeric=None):
+        self.numeric = None
+        self.count = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.frequent = None
+        self.moments = None
+        self.quantiles = None
+        if numeric is not None:
+            self._set_kind(numeric)
+
+    def _set_kind(self, numeric):
+        self.numeric = numeric
+        self.frequent = CountMinSketch(numeric)
+        self.moments = MomentSketch() if numeric else None
+        self.quantiles = KLLSketch() if numeric else None
+
+    def _promote(self):
+        """Numérica → categórica. Los sketches de frecuencia y distintos se rehacen como texto a
+        partir de los candidatos más frecuentes (el resto de valores anteriores se pierde)."""
+        candidates = self.frequent.candidates
+        self._set_kind(False)
+        self.distinct = HyperLogLog()
+        if candidates:
+            # Como en el CSV: 3.0 se lee como '3'
+            values = np.array([str(int(v)) if float(v).is_integer() else str(v) for v in candidates], dtype=object)
+            self.distinct.update_hashes(hash_values(values))
+            self.frequent.add_counts(values, list(candidates.values()))
+
+    def update(self, series):
+        if self.numeric is None:
+            if not series.notna().any():
+                self.nulls += len(series)
+                return self
+            self._set_kind(pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series))
+        if self.numeric:
+            coerced = pd.to_numeric(series, errors='coerce')
+            if not pd.api.types.is_numeric_dtype(series) and (coerced.isna() & series.notna()).any():
+                # Aparece texto en una columna numérica: no se cuenta como nulo en silencio
+                self._promote()
+        if self.numeric:
+            values = coerced.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            self.moments.update(values)
+            self.quantiles.update(values)
+        else:
+            # Como texto, para que el mismo valor tenga el mismo hash en todos los archivos
+            values = series.dropna().astype(str).to_numpy(dtype=object)
+        self.nulls += len(series) - len(values)
+        self.count += len(values)
+        self.distinct.update_hashes(hash_values(values))
+        self.frequent.update(values)
+        return self
+
+    def merge(self, other):
+        if other.numeric is None:
+            self.nulls += other.nulls
+            return self
+        if self.numeric is None:
+            other.nulls += self.nulls
+            self.__dict__.update(other.__dict__)
+            return self
+        if self.numeric != other.numeric:
+            # Los hashes de una numérica y una categórica no son comparables: ambas como texto
+            if self.numeric:
+                self._promote()
+            else:
+                other._promote()
+        self.count += other.count
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        if self.numeric:
+            self.moments.merge(other.moments)
+            self.quantiles.merge(other.quantiles)
+        return self
+
+
+# Perfil de un CSV leído por bloques; combinable entre bloques y entre archivos
+class StreamingProfile:
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+        self.chunks = 0
+        self.files = 0
+
+    def update(self, chunk):
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnSketch()
+                # Filas anteriores en las que la columna no existía
+                self.columns[col].nulls += self.rows
+            self.columns[col].update(chunk[col])
+        for col in set(self.columns) - set(chunk.columns):
+            self.columns[col].nulls += len(chunk)
+        self.rows += len(chunk)
+        self.chunks += 1
+        return self
+
+    def merge(self, other):
+        for col, sketch in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(sketch)
+            else:
+                sketch.nulls += self.rows
+                self.columns[col] = sketch
+        for col in set(self.columns) - set(other.columns):
+            self.columns[col].nulls += other.rows
+        self.rows += other.rows
+        self.chunks += other.chunks
+        self.files += other.files
+        return self
+
+    def numeric_columns(self):
+        return [col for col, sketch in self.columns.items() if sketch.numeric]
+
+    def describe(self):
+        """Equivalente aproximado de df.describe() para las columnas numéricas"""
+        summary = {}
+        for col in self.numeric_columns():
+            sketch = self.columns[col]
+            q1, median, q3 = sketch.quantiles.quantiles([0.25, 0.5, 0.75])
+            moments = sketch.moments
+            summary[col] = {
+                'count': moments.n,
+                'mean': moments.mean if moments.n else np.nan,
+                'std': np.sqrt(moments.variance),
+                'min': moments.min if moments.n else np.nan,
+                '25%': q1,
+                '50%': median,
+                '75%': q3,
+                'max': moments.max if moments.n else np.nan,
+                'skew': moments.skew,
+                'kurtosis': moments.kurtosis,
+                'distinct (aprox.)': sketch.distinct.count(),
+                'nulos': sketch.nulls
+            }
+        return pd.DataFrame(summary)
+
+    def outliers(self, factor=1.5):
+        """Outliers por IQR estimados con los rangos del sketch de cuantiles"""
+        rows = []
+        for col in self.numeric_columns():
+            sketch = self.columns[col]
+            if sketch.count == 0:
+                continue
+            q1, q3 = sketch.quantiles.quantiles([0.25, 0.75])
+            iqr = q3 - q1
+            below = sketch.quantiles.rank([q1 - factor * iqr], inclusive=False)[0]
+            above = sketch.count - sketch.quantiles.rank([q3 + factor * iqr])[0]
+            count = int(below + above)
+            rows.append({
+                'Columna': col,
+                'Outliers (aprox.)': count,
+                'Porcentaje': f"{count / max(self.rows, 1) * 100:.2f}%"
+            })
+        return pd.DataFrame(rows)
+
+    def value_counts(self, column, n=10):
+        sketch = self.columns[column]
+        top = sketch.frequent.top(n) if sketch.frequent is not None else []
+        return pd.DataFrame(top, columns=[column, 'Frecuencia (aprox.)'])
+
+    def summary(self):
+        """Tabla con nulos y distintos aproximados de todas las columnas"""
+        return pd.DataFrame({
+            'Columna': list(self.columns),
+            'Tipo': [{True: 'numérica', False: 'categórica', None: 'vacía'}[s.numeric] for s in self.columns.values()],
+            'Valores únicos (aprox.)': [s.distinct.count() for s in self.columns.values()],
+            'Nulos': [s.nulls for s in self.columns.values()]
+        })
+
+
+# Función para perfilar uno o varios CSV por bloques con memoria constante
+def profile_csv_in_chunks(sources, base_url=None, chunksize=100_000):
+    """Devuelve (perfil combinado, errores); cada archivo se perfila por separado y se combina"""
+    total = StreamingProfile()
+    errors = []
+    for source in sources:
+        profile = StreamingProfile()
+        try:
+            for chunk in iter_csv_chunks(source, base_url, chunksize):
+                profile.update(chunk)
+        except Exception as e:
+            errors.append((source, str(e)))
+            continue
+        profile.files = 1
+        total.merge(profile)
+    return total, errors
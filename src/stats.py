@@ -0,0 +1,92 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.memory import memory_usage_bytes
+
+# Número máximo de resultados guardados por sesión
+MAX_ENTRIES = 64
+
+
+# Caché de resultados calculados sobre el DataFrame de la sesión
+class StatsCache:
+    """Memoriza resúmenes por (versión de los datos, nombre, argumentos).
+
+    La versión la incrementa la aplicación cada vez que cambia el DataFrame,
+    así que una clave nunca devuelve resultados de datos anteriores. Cuando se
+    supera el máximo de entradas se descartan las menos usadas (LRU).
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, name, compute, *args):
+        key = (version, name) + tuple(_hashable(arg) for arg in args)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total * 100 if total else 0.0
+        }
+
+
+# Función para convertir argumentos (listas de columnas, etc.) en parte de una clave
+def _hashable(value):
+    if isinstance(value, (list, tuple, pd.Index)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+# Función para calcular una huella del contenido de unas columnas del DataFrame
+def frame_fingerprint(df, columns=None):
+    """Resume nombres, tipos, índice y valores en un hash corto; no depende de la sesión"""
+    columns = list(df.columns) if columns is None else list(columns)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(col), str(df[col].dtype)) for col in columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df[columns], index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# Función para calcular la información general de un DataFrame
+def general_info(df):
+    return {
+        'rows': df.shape[0],
+        'columns': df.shape[1],
+        'memory_bytes': memory_usage_bytes(df),
+        'duplicates': int(df.duplicated().sum()),
+        'dtype_counts': df.dtypes.astype(str).value_counts()
+    }
+
+
+# Función para obtener las estadísticas descriptivas de las columnas numéricas
+def describe_numeric(df):
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    if len(numeric_cols) == 0:
+        return None
+    return df[numeric_cols].describe()
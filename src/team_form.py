@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+from src.schema import parse_football_dates
+
+FORM_WINDOW = 5
+# Ventanas (en partidos) que se ofrecen por defecto
+FORM_WINDOWS = [3, 5, 10]
+# Goles esperados por tiro a puerta y por tiro fuera (aproximación de xG sin datos de cada tiro)
+XG_ON_TARGET = 0.30
+XG_OFF_TARGET = 0.03
+# Días de descanso como máximo (el primer partido tras el verano no dice nada más)
+MAX_REST_DAYS = 30
+
+# Columnas de football-data.co.uk para cada equipo: (columna del local, columna del visitante)
+SIDE_COLUMNS = {
+    'GF': ('FTHG', 'FTAG'),
+    'Tiros': ('HS', 'AS'),
+    'Tiros a puerta': ('HST', 'AST'),
+    'Córners': ('HC', 'AC')
+}
+# Estadísticas de la tabla larga y su nombre en contra (lo que hace el rival)
+AGAINST = {'GF': 'GA', 'Tiros': 'Tiros en contra', 'Tiros a puerta': 'Tiros a puerta en contra',
+           'Córners': 'Córners en contra', 'xG': 'xGA'}
+# Rachas: nombre, estadística del partido y condición que la mantiene
+STREAKS = {
+    'Racha victorias': ('Puntos', lambda values: values == 3),
+    'Racha sin perder': ('Puntos', lambda values: values >= 1),
+    'Racha derrotas': ('Puntos', lambda values: values == 0),
+    'Racha sin marcar': ('GF', lambda values: values == 0)
+}
+
+
+# Función para obtener las fechas de los partidos como datetime
+def match_dates(df):
+    if pd.api.types.is_datetime64_any_dtype(df['Date']):
+        return df['Date']
+    return parse_football_dates(df['Date'])
+
+
+# Función para leer una columna de partidos como float (nula si no existe)
+def _numeric(df, column):
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+
+
+# Función para pasar de un partido por fila a una fila por equipo y partido
+def team_matches(df, dates=None):
+    """Tabla larga ordenada por equipo y fecha: Match (índice original), Team, Opponent, Date,
+    Home, Puntos y cada estadística a favor y en contra (GF/GA, tiros, tiros a puerta, córners
+    y xG aproximado). Los partidos sin resultado tienen las estadísticas nulas."""
+    dates = match_dates(df) if dates is None else dates
+    result = df['FTR'].astype(object) if 'FTR' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    home_points = result.map({'H': 3, 'D': 1, 'A': 0}).to_numpy(dtype=np.float64)
+    away_points = result.map({'H': 0, 'D': 1, 'A': 3}).to_numpy(dtype=np.float64)
+    home_team = df['HomeTeam'].astype(str).to_numpy()
+    away_team = df['AwayTeam'].astype(str).to_numpy()
+
+    long = pd.DataFrame({
+        'Match': np.concatenate([df.index.to_numpy(), df.index.to_numpy()]),
+        'Team': np.concatenate([home_team, away_team]),
+        'Opponent': np.concatenate([away_team, home_team]),
+        'Date': np.concatenate([dates.to_numpy(), dates.to_numpy()]),
+        'Home': np.repeat([True, False], len(df)),
+        'Puntos': np.concatenate([home_points, away_points])
+    })
+    for stat, (home_column, away_column) in SIDE_COLUMNS.items():
+        home, away = _numeric(df, home_column), _numeric(df, away_column)
+        long[stat] = np.concatenate([home, away])
+        long[AGAINST[stat]] = np.concatenate([away, home])
+    long['xG'] = expected_goals(long['Tiros'], long['Tiros a puerta'])
+    long['xGA'] = expected_goals(long['Tiros en contra'], long['Tiros a puerta en contra'])
+    return long.sort_values(['Team', 'Date', 'Match'], kind='stable', na_position='last').reset_index(drop=True)
+
+
+# Función para aproximar los goles esperados a partir de tiros y tiros a puerta
+def expected_goals(shots, shots_on_target):
+    return XG_ON_TARGET * shots_on_target + XG_OFF_TARGET * (shots - shots_on_target).clip(lower=0)
+
+
+# Función para obtener la posición de cada fila dentro de su equipo (la tabla está ordenada por equipo)
+def group_positions(teams):
+    teams = np.asarray(teams)
+    rows = np.arange(len(teams))
+    new_group = np.ones(len(teams), dtype=bool)
+    new_group[1:] = teams[1:] != teams[:-1]
+    starts = np.maximum.accumulate(np.where(new_group, rows, 0))
+    return rows - starts
+
+
+# Función para calcular medias de los partidos anteriores de cada equipo (sin el partido actual)
+def prior_rolling_mean(long, columns, window=FORM_WINDOW, positions=None):
+    """Con sumas prefijas globales la ventana de la fila i es [max(i - window, inicio del equipo), i),
+    así que todas las columnas y equipos salen de unas pocas operaciones de numpy. Los valores
+    nulos (partidos sin jugar o sin la estadística) no cuentan en la media."""
+    columns = list(columns)
+    positions = group_positions(long['Team']) if positions is None else positions
+    values = long[columns].to_numpy(dtype=np.float64)
+    observed = ~np.isnan(values)
+    totals = np.zeros((len(values) + 1, len(columns)))
+    counts = np.zeros((len(values) + 1, len(columns)))
+    np.cumsum(np.where(observed, values, 0.0), axis=0, out=totals[1:])
+    np.cumsum(observed, axis=0, out=counts[1:])
+    rows = np.arange(len(values))
+    first = rows - np.minimum(positions, window)
+    window_count = counts[rows] - counts[first]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(window_count > 0, (totals[rows] - totals[first]) / window_count, np.nan)
+    return pd.DataFrame(means, index=long.index, columns=columns)
+
+
+# Función para calcular la racha previa de cada equipo (partidos seguidos cumpliendo una condición)
+def prior_streak(condition, played, positions):
+    """Solo cuentan los partidos jugados: uno sin resultado (un partido futuro) ni corta ni alarga
+    la racha. Devuelve, para cada fila, la racha con la que el equipo llega al partido."""
+    condition = np.asarray(condition, dtype=bool) & played
+    rows = np.arange(len(condition))
+    cumulative = np.cumsum(condition)
+    # Último partido jugado que rompió la racha (o el inicio del equipo)
+    breaks = np.where(played & ~condition, rows, -1)
+    starts = rows - positions
+    last_break = np.maximum(np.maximum.accumulate(breaks), starts - 1)
+    including = cumulative - np.where(last_break >= 0, cumulative[np.maximum(last_break, 0)], 0)
+    # Racha antes del partido: la de la fila anterior del mismo equipo
+    previous = np.zeros(len(condition), dtype=np.int64)
+    has_previous = positions > 0
+    previous[has_previous] = including[rows[has_previous] - 1]
+    return previous
+
+
+# Función para calcular todas las variables de forma de los equipos
+def team_form(df, windows=(FORM_WINDOW,), stats=None):
+    """Tabla larga con, para cada ventana, la media de cada estadística en los partidos previos
+    (columnas ``'<estadística> (<ventana>)'``), las rachas con las que cada equipo llega al
+    partido y los días de descanso. Nada usa el partido de la propia fila, así que las
+    columnas se pueden usar como variables predictoras sin fuga de información."""
+    long = team_matches(df)
+    positions = group_positions(long['Team'])
+    if stats is None:
+        stats = ['Puntos'] + [column for stat in list(SIDE_COLUMNS) + ['xG'] for column in (stat, AGAINST[stat])]
+    stats = [stat for stat in stats if long[stat].notna().any()]
+
+    form = [long]
+    for window in windows:
+        means = prior_rolling_mean(long, stats, window, positions)
+        form.append(means.rename(columns=lambda stat: f'{stat} ({window})'))
+
+    streaks = {}
+    for name, (stat, condition) in STREAKS.items():
+        values = long[stat].to_numpy()
+        streaks[name] = prior_streak(condition(values), ~np.isnan(values), positions)
+    form.append(pd.DataFrame(streaks, index=long.index))
+
+    rest = np.where(positions > 0, long['Date'].diff().dt.days.to_numpy(dtype=np.float64), np.nan)
+    form.append(pd.DataFrame({'Descanso (días)': np.minimum(rest, MAX_REST_DAYS)}, index=long.index))
+    return pd.concat(form, axis=1)
+
+
+# Función para resumir la forma actual de cada equipo (su último partido jugado, incluido)
+def current_form(df, window=FORM_WINDOW, stats=('Puntos', 'GF', 'GA', 'xG', 'xGA')):
+    """Para la forma "de hoy" el último partido sí cuenta: se añade una fila ficticia por equipo
+    después de su último partido y se leen sus variables previas."""
+    long = team_matches(df)
+    played = long[long[['Puntos', 'GF']].notna().any(axis=1)]
+    latest = played.groupby('Team', sort=False)['Date'].max()
+    future = pd.DataFrame({'HomeTeam': latest.index, 'AwayTeam': '', 'Date': latest.to_numpy() + np.timedelta64(1, 'D')})
+    columns = [col for col in ['HomeTeam', 'AwayTeam', 'FTR'] + [col for pair in SIDE_COLUMNS.values() for col in pair]
+               if col in df.columns]
+    history = df[columns].assign(Date=match_dates(df))
+    if 'FTR' in history.columns:
+        history['FTR'] = history['FTR'].astype(object)
+    combined = pd.concat([history, future], ignore_index=True, sort=False)
+    form = team_form(combined, (window,), [stat for stat in stats if stat in long.columns])
+    form = form[(form['Match'] >= len(df)) & form['Home']].set_index('Team')
+    summary = form[[col for col in form.columns if col.endswith(f' ({window})')] + list(STREAKS)]
+    summary = summary.assign(**{'Último partido': latest})
+    return summary.sort_values(summary.columns[0], ascending=False) if len(summary.columns) > 1 else summary
@@ -0,0 +1,103 @@
+import glob
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.cache import DiskCache
+from src.download import load_csv_from_url
+
+
+# Servidor HTTP local que sirve un CSV con ETag y responde 304 si no cambió
+class _CsvHandler(BaseHTTPRequestHandler):
+    body = b'a,b\n1,2\n'
+    requests = []
+
+    def do_GET(self):
+        etag = '"' + hashlib.md5(self.body).hexdigest() + '"'
+        type(self).requests.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _CsvHandler.body = b'a,b\n1,2\n'
+    _CsvHandler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _CsvHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/data.csv'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _csv_objects(cache):
+    return glob.glob(os.path.join(cache.directory, 'objects', '*.csv'))
+
+
+def test_fresh_entry_is_served_from_disk(server, tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=3600)
+    df, report, error = load_csv_from_url(server, cache=cache)
+    assert error is None and report['source'] == 'network'
+    df, report, error = load_csv_from_url(server, cache=cache)
+    assert error is None and report['source'] == 'cache'
+    assert list(df['a']) == [1]
+    assert len(_CsvHandler.requests) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_stale_entry_is_revalidated_with_etag(server, tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=0)
+    load_csv_from_url(server, cache=cache)
+    df, report, error = load_csv_from_url(server, cache=cache)
+    assert error is None and report['source'] == 'revalidated'
+    assert _CsvHandler.requests[-1] is not None
+    assert cache.stats()['revalidations'] == 1
+
+
+def test_changed_content_replaces_previous_objects(server, tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=0)
+    load_csv_from_url(server, cache=cache)
+    _CsvHandler.body = b'a,b\n3,4\n5,6\n'
+    df, report, error = load_csv_from_url(server, cache=cache)
+    assert error is None and report['source'] == 'network'
+    assert list(df['a']) == [3, 5]
+    assert len(_csv_objects(cache)) == 1
+    stats = cache.stats()
+    assert stats['entries'] == 1
+    on_disk = sum(os.path.getsize(path) for path in glob.glob(os.path.join(cache.directory, 'objects', '*')))
+    assert stats['bytes'] == on_disk
+
+
+def test_shared_content_is_kept_while_referenced(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=0)
+    cache.store('http://a/x.csv', b'a\n1\n')
+    cache.store('http://b/x.csv', b'a\n1\n')
+    cache.store('http://a/x.csv', b'a\n2\n')
+    assert len(_csv_objects(cache)) == 2
+    assert cache.lookup('http://b/x.csv') is not None
+
+
+def test_counters_are_thread_safe(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    threads = [threading.Thread(target=lambda: [cache.record_hit() for _ in range(10_000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()['hits'] == 80_000
@@ -0,0 +1,37 @@
+import threading
+
+import plotly.graph_objects as go
+
+from src.create_plot import FigureCache
+
+
+def test_figure_cache_round_trip_and_eviction():
+    cache = FigureCache(max_entries=2)
+    for key in 'abc':
+        cache.put(key, go.Figure(go.Scatter(x=[1, 2], y=[3, 4], name=key)))
+    assert cache.get('a') is None
+    assert cache.get('c').data[0].name == 'c'
+    assert cache.stats()['entries'] == 2
+
+
+def test_figure_cache_is_safe_across_threads():
+    cache = FigureCache(max_entries=4)
+    figure = go.Figure(go.Scatter(x=[1], y=[1]))
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(300):
+                cache.put((offset + i) % 8, figure)
+                cache.get((offset + i + 1) % 8)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    stats = cache.stats()
+    assert stats['entries'] <= 4 and stats['hits'] + stats['misses'] == 8 * 300
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from src.downsample import stratified_sample
+
+
+def test_keeps_every_group_within_budget():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'g': rng.choice(['a', 'b', 'c'], 10_000, p=[0.98, 0.0195, 0.0005]), 'y': rng.normal(size=10_000)})
+    sample = stratified_sample(df, 500, 'g')
+    assert len(sample) <= 500
+    assert set(sample['g']) == set(df['g'])
+    assert sample.index.is_monotonic_increasing
+
+
+def test_many_distinct_values_respect_n_out():
+    df = pd.DataFrame({'id': np.arange(10_000), 'team': np.arange(10_000) % 2_000, 'y': np.arange(10_000.0)})
+    for column in ('id', 'team', ['team', 'id']):
+        assert len(stratified_sample(df, 500, column)) <= 500
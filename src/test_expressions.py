@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.expressions import ExpressionError, compile_expression, evaluate_expression, evaluate_many, parse_assignments
+
+
+@pytest.fixture
+def matches():
+    return pd.DataFrame({'FTHG': [1, 3], 'FTAG': [0, 2], 'B365>2.5': [1.8, 2.1]})
+
+
+def test_vectorized_arithmetic_and_backticks(matches):
+    result = evaluate_expression(matches, 'FTHG + FTAG + `B365>2.5`')
+    assert np.allclose(result, [2.8, 7.1])
+
+
+def test_later_definitions_use_earlier_ones(matches):
+    results = evaluate_many(matches, parse_assignments("Goles = FTHG + FTAG\nDoble = Goles * 2"))
+    assert list(results['Doble']) == [2, 10]
+
+
+@pytest.mark.parametrize('expression', [
+    '__import__("os")', 'FTHG.__class__', 'open("x")', '[1, 2]', 'lambda: 1', "'a' * 10",
+    'FTHG ** 1000', 'FTHG ** (2 ** 6)'
+])
+def test_rejects_unsafe_expressions(expression):
+    with pytest.raises(ExpressionError):
+        compile_expression(expression)
+
+
+@pytest.mark.parametrize('expression', [
+    '((10 ** 64) ** 64) ** 64', '(10 ** 64) ** 64', '(2 * 10) ** 64', 'abs(10 ** 64) ** 64', 'FTHG ** abs(100)'
+])
+def test_rejects_nested_constant_powers(expression):
+    with pytest.raises(ExpressionError):
+        compile_expression(expression)
+
+
+@pytest.mark.parametrize('expression', ['FTHG ** 2', '(FTHG ** 2) ** 2', '10 ** 6', '(-2) ** 3', '2 ** FTAG'])
+def test_accepts_bounded_powers(expression):
+    compile_expression(expression)
+
+
+def test_small_integer_columns_do_not_overflow():
+    df = pd.DataFrame({'HS': np.array([20, 30], dtype=np.int8), 'HST': np.array([10, 12], dtype=np.int8),
+                       'FTHG': pd.array([3, None], dtype='Int8')})
+    assert list(evaluate_expression(df, 'HS * HST')) == [200, 360]
+    assert evaluate_expression(df, 'FTHG * 100').iloc[0] == 300
+    assert df['HS'].dtype == np.int8
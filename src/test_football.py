@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from src.football import season_start_year, walk_forward_validation, match_seasons
+
+
+# Función para generar temporadas sintéticas (todos contra todos, ida y vuelta)
+def _league(first_year, last_year, teams=6, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for year in range(first_year, last_year + 1):
+        pairs = [(h, a) for h in range(teams) for a in range(teams) if h != a]
+        dates = pd.Timestamp(f'{year}-08-15') + pd.to_timedelta(np.arange(len(pairs)) * 7, 'D')
+        home_goals = rng.poisson(1.5, len(pairs))
+        away_goals = rng.poisson(1.1, len(pairs))
+        frames.append(pd.DataFrame({
+            'Season': f'{year % 100:02d}{(year + 1) % 100:02d}',
+            'Date': dates,
+            'HomeTeam': [f'T{h}' for h, _ in pairs],
+            'AwayTeam': [f'T{a}' for _, a in pairs],
+            'FTHG': home_goals,
+            'FTAG': away_goals,
+            'FTR': np.where(home_goals > away_goals, 'H', np.where(home_goals < away_goals, 'A', 'D'))
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_season_start_year_crosses_century():
+    assert list(season_start_year(['9394', '9900', '0001', '2324'])) == [1993, 1999, 2000, 2023]
+
+
+def test_match_seasons_from_dates():
+    df = pd.DataFrame({'Date': pd.to_datetime(['1999-08-01', '2000-05-01', '2000-08-01'])})
+    assert list(match_seasons(df)) == ['9900', '9900', '0001']
+
+
+def test_walk_forward_across_century_trains_only_on_past():
+    df = _league(1995, 2004)
+    table, _ = walk_forward_validation(df, min_train_seasons=2, n_jobs=1)
+    matches_per_season = len(df) // 10
+    assert list(table['Temporada']) == ['9798', '9899', '9900', '0001', '0102', '0203', '0304', '0405']
+    expected = [matches_per_season * seasons for seasons in range(2, 10)]
+    assert list(table['Partidos entrenamiento']) == expected
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from src.memory import optimize_memory
+
+
+def test_float_columns_are_only_downcast_when_exact():
+    df = pd.DataFrame({'goles': [1.0, 2.0, np.nan, 0.5], 'cuota': [2.1, 1.85, 3.3, 4.0]})
+    optimized, report = optimize_memory(df)
+    assert optimized['goles'].dtype == np.float32
+    assert optimized['cuota'].dtype == np.float64
+    assert optimized['cuota'].equals(df['cuota'])
+
+
+def test_repeated_optimization_keeps_values():
+    df = pd.DataFrame({'xG': np.random.default_rng(0).random(1000) * 3})
+    once, _ = optimize_memory(df)
+    twice, _ = optimize_memory(once)
+    assert twice['xG'].equals(df['xG'])
+
+
+def test_integers_use_smallest_type():
+    optimized, report = optimize_memory(pd.DataFrame({'HS': [10, 25, 3], 'Attendance': [40000, 52000, 61000]}))
+    assert optimized['HS'].dtype == np.int8 and optimized['Attendance'].dtype == np.int32
+    assert set(report['converted']) == {'HS', 'Attendance'}
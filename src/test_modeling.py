@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modeling import cross_validate_models
+
+
+def _frame(rows=60, duplicated_index=False):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=rows)
+    df = pd.DataFrame({'x': x, 'y': 2 * x + 1 + rng.normal(scale=0.01, size=rows)})
+    if duplicated_index:
+        # Como tras concatenar dos CSV sin ignore_index
+        df.index = np.tile(np.arange(rows // 2), 2)
+    return df
+
+
+def test_out_of_fold_predictions_align_with_duplicate_index():
+    df = _frame(duplicated_index=True)
+    results = cross_validate_models(df, 'y', ['x'], models=['Lineal'], n_jobs=1)
+    predictions = results['predictions']
+    assert len(predictions) == len(df)
+    assert predictions['Lineal'].notna().all()
+    assert np.allclose(predictions['Real'], predictions['Lineal'], atol=0.1)
+    assert results['summary'].loc['Lineal', 'R² medio'] > 0.99
+
+
+def test_too_few_complete_rows_raises_clear_error():
+    df = pd.DataFrame({'x': [1.0, np.nan, 3.0], 'y': [1.0, 2.0, np.nan]})
+    with pytest.raises(ValueError, match='al menos 2 filas'):
+        cross_validate_models(df, 'y', ['x'], n_jobs=1)
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pca import fit_pca, incremental_pca
+
+
+def test_matches_explained_variance_of_standardized_data():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(100, 3)), columns=['a', 'b', 'c'])
+    df['c'] += df['a']
+    result = fit_pca(df, ['a', 'b', 'c'])
+    assert result['rows'] == 100 and result['solver'] == 'full'
+    assert np.isclose(result['explained']['Varianza explicada (%)'].sum(), 100)
+
+
+def test_too_few_complete_rows_raises():
+    df = pd.DataFrame({'a': [1.0, np.nan, 3.0], 'b': [np.nan, 2.0, np.nan]})
+    with pytest.raises(ValueError, match='al menos 2 filas'):
+        fit_pca(df, ['a', 'b'])
+
+
+def test_incremental_skips_non_numeric_cells():
+    rng = np.random.default_rng(1)
+    clean = pd.DataFrame(rng.normal(size=(50, 2)), columns=['a', 'b'])
+    dirty = clean.astype(object)
+    dirty.loc[3, 'a'] = 'n/a'
+    model, rows = incremental_pca([clean, dirty], ['a', 'b'], np.zeros(2), np.ones(2), 2, batch_rows=10)
+    assert rows == 99
+    assert model.n_components_ == 2
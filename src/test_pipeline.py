@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.operations import OPERATIONS
+from src.pipeline import Pipeline
+
+
+def _matches(rows=200):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'Div': rng.choice(['E0', 'E1', 'SP1'], rows),
+        'FTHG': rng.integers(0, 4, rows),
+        'FTAG': rng.integers(0, 3, rows).astype(float),
+        'Orden': np.arange(rows)
+    })
+    df.loc[rng.choice(rows, 15, replace=False), 'FTAG'] = np.nan
+    return df
+
+
+# Función para aplicar los pasos uno a uno, sin fusión
+def _run_unfused(pipeline, df):
+    for step in pipeline.steps:
+        df = OPERATIONS[step['op']](df, **step['params'])
+    return df
+
+
+@pytest.mark.parametrize('sorts', [
+    [('FTHG', True), ('Div', True)],
+    [('FTAG', False), ('FTHG', True)],
+    [(['Div', 'FTHG'], [True, False]), ('FTAG', True), ('Div', False)],
+])
+def test_consecutive_sorts_fuse_without_changing_ties(sorts):
+    pipeline = Pipeline()
+    for by, ascending in sorts:
+        pipeline.add('sort_rows', by=by, ascending=ascending)
+    df = _matches()
+    assert len(pipeline.fused_steps()) == 1
+    pd.testing.assert_frame_equal(pipeline.run(df), _run_unfused(pipeline, df))
+
+
+def test_consecutive_drops_are_grouped():
+    pipeline = Pipeline().add('drop_columns', columns=['Orden']).add('drop_columns', columns=['FTAG'])
+    assert pipeline.fused_steps() == [{'op': 'drop_columns', 'params': {'columns': ['Orden', 'FTAG']}}]
+    assert list(pipeline.run(_matches()).columns) == ['Div', 'FTHG']
+
+
+def test_recipe_round_trip():
+    pipeline = Pipeline().add('sort_rows', by='FTHG').add('rename_column', column='Div', new_name='Liga')
+    restored = Pipeline.from_json(pipeline.to_json())
+    pd.testing.assert_frame_equal(restored.run(_matches()), pipeline.run(_matches()))
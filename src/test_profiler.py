@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from src.profiler import profile_numeric, NUMERIC_FIELDS
+
+
+def test_matches_pandas_statistics():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'a': rng.normal(size=200), 'b': rng.integers(0, 5, 200).astype(float)})
+    df.loc[::7, 'a'] = np.nan
+    profile = profile_numeric(df)
+    for col in df.columns:
+        assert np.isclose(profile.loc[col, 'Media'], df[col].mean())
+        assert np.isclose(profile.loc[col, 'Mediana'], df[col].median())
+        assert np.isclose(profile.loc[col, 'Desviación Estándar'], df[col].std())
+        assert np.isclose(profile.loc[col, 'Asimetría (Skewness)'], df[col].skew())
+        assert profile.loc[col, 'Moda'] == df[col].mode().iloc[0]
+    assert profile.loc['a', 'Nulos'] == df['a'].isna().sum()
+
+
+def test_empty_frame_returns_null_statistics():
+    profile = profile_numeric(pd.DataFrame({'a': pd.Series([], dtype=float), 'b': pd.Series([], dtype='int8')}))
+    assert list(profile.index) == ['a', 'b']
+    assert (profile['Conteo'] == 0).all() and (profile['Nulos'] == 0).all()
+    stats = [field for field in NUMERIC_FIELDS if field not in ('Conteo', 'Nulos')]
+    assert profile[stats].isna().all().all()
+
+
+def test_all_null_column():
+    profile = profile_numeric(pd.DataFrame({'a': [np.nan, np.nan, np.nan], 'b': [1.0, 2.0, 2.0]}))
+    assert profile.loc['a', 'Conteo'] == 0 and profile.loc['a', 'Nulos'] == 3
+    assert np.isnan(profile.loc['a', ['Media', 'Mediana', 'Moda', 'Mínimo', 'Máximo', 'MAD']].astype(float)).all()
+    assert profile.loc['b', 'Moda'] == 2.0
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from src.sketches import ColumnSketch, StreamingProfile
+
+
+def test_empty_first_chunk_does_not_fix_kind():
+    profile = StreamingProfile()
+    profile.update(pd.DataFrame({'Referee': [np.nan, np.nan], 'FTHG': [1, 2]}))
+    profile.update(pd.DataFrame({'Referee': ['M Dean', 'M Oliver', 'M Dean'], 'FTHG': [0, 3, 1]}))
+    referee = profile.columns['Referee']
+    assert referee.numeric is False
+    assert referee.count == 3 and referee.nulls == 2
+    assert profile.value_counts('Referee', 1).iloc[0].tolist() == ['M Dean', 2]
+    assert profile.numeric_columns() == ['FTHG']
+
+
+def test_text_after_numbers_promotes_to_categorical():
+    sketch = ColumnSketch()
+    sketch.update(pd.Series([1.0, 2.0, 2.0]))
+    sketch.update(pd.Series(['2', 'x', None], dtype=object))
+    assert sketch.numeric is False and sketch.moments is None
+    assert sketch.count == 5 and sketch.nulls == 1
+    assert dict(sketch.frequent.top(1)) == {'2': 3}
+
+
+def test_merge_with_different_kinds():
+    numeric = ColumnSketch().update(pd.Series([1.0, 1.0, 4.0]))
+    text = ColumnSketch().update(pd.Series(['a', 'b', None]))
+    merged = numeric.merge(text)
+    assert merged.numeric is False
+    assert merged.count == 5 and merged.nulls == 1
+    assert merged.distinct.count() == 4
+
+    empty = ColumnSketch().update(pd.Series([np.nan, np.nan]))
+    adopted = empty.merge(ColumnSketch().update(pd.Series([3.0, 5.0])))
+    assert adopted.numeric is True
+    assert adopted.count == adopted.moments.n == 2 and adopted.nulls == 2